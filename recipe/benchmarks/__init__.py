@@ -0,0 +1,31 @@
+"""
+Benchmarks for the recipe API.
+
+Each module can be run from the project directory, e.g.
+
+    python -m benchmarks.bench_serializers
+
+`python -m benchmarks.run` runs the whole suite and stores the results
+as JSON, `python -m benchmarks.compare` compares two such files.
+"""
+
+import os
+
+import django
+
+
+def setup():
+    """Configure Django for a standalone benchmark run."""
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe.settings')
+    django.setup()
+
+
+def setup_database():
+    """Create and migrate a throwaway test database."""
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
@@ -0,0 +1,103 @@
+"""
+Load test of the sync and ASGI native recipe views under ASGI.
+
+Seeds a test database, then drives the recipe list and detail endpoints
+of both implementations through Django's ASGI handler. The response
+cache and rate limits are disabled so every request reaches the
+database.
+
+    python -m benchmarks.bench_async --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+from types import ModuleType
+
+from . import setup, setup_database
+from .seed import seed
+
+
+def urlconf(name, urlpatterns):
+    """Return a url configuration module holding urlpatterns."""
+
+    module = ModuleType(name)
+    module.urlpatterns = urlpatterns
+
+    return module
+
+
+def urlconfs():
+    """Return url configurations for the sync and async views."""
+
+    from django.urls import path
+
+    from recipes.async_views import AsyncRecipeDetailView, AsyncRecipeListView
+    from recipes.views import RecipesViewSet
+
+    return {
+        'sync': urlconf('sync_urls', [
+            path('recipes/', RecipesViewSet.as_view({'get': 'list'})),
+            path(
+                'recipes/<int:pk>/',
+                RecipesViewSet.as_view({'get': 'retrieve'})
+            ),
+        ]),
+        'async': urlconf('async_urls', [
+            path('recipes/', AsyncRecipeListView.as_view()),
+            path('recipes/<int:pk>/', AsyncRecipeDetailView.as_view()),
+        ]),
+    }
+
+
+def run(requests, concurrency, recipes):
+    """Load test both implementations and return their statistics."""
+
+    from django.core.asgi import get_asgi_application
+    from django.test import override_settings
+
+    from .loadtest import run_load
+
+    from recipes.models import Recipes
+
+    (user, key), = seed(1, recipes)
+    recipe_id = Recipes.objects.filter(user=user).values_list(
+        'id', flat=True
+    ).first()
+    headers = [('authorization', f'Token {key}')]
+    app = get_asgi_application()
+
+    results = {}
+    for mode, urlconf in urlconfs().items():
+        with override_settings(
+            ROOT_URLCONF=urlconf, RECIPES_CACHE_TTL=0, THROTTLE_ENABLED=False
+        ):
+            for name, url in [
+                ('list', '/recipes/?page_size=20'),
+                ('detail', f'/recipes/{recipe_id}/'),
+            ]:
+                results[f'{mode}:{name}'] = asyncio.run(run_load(
+                    app, url, requests, concurrency, headers=headers
+                ))
+
+    return results
+
+
+def main():
+    """Run the load test and print the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--recipes', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+    setup_database()
+    results = run(args.requests, args.concurrency, args.recipes)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
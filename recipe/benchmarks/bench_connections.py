@@ -0,0 +1,88 @@
+"""
+Benchmark of the database connection overhead per request.
+
+Runs a one query request cycle, with the request_started and
+request_finished signals Django sends around every request, while
+closing the connection after each request, while keeping it open and
+with the configured settings, which use the pool when `DB_POOL` is set.
+Pooled connections count as opened when checked out of the pool.
+Point the database settings at the server to measure, connection setup
+costs far more over the network than with SQLite.
+
+    python -m benchmarks.bench_connections --requests 500
+"""
+
+import argparse
+import time
+
+from . import setup
+
+
+def run(requests, modes):
+    """Time the request cycle for each mode and return the results."""
+
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    opened = []
+
+    def count(sender, **kwargs):
+        opened.append(1)
+
+    connection_created.connect(count)
+    configured = connection.settings_dict['CONN_MAX_AGE']
+    results = {}
+    try:
+        for name, max_age in modes:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            opened.clear()
+
+            start = time.perf_counter()
+            for _ in range(requests):
+                request_started.send(sender=None)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                request_finished.send(sender=None)
+            elapsed = time.perf_counter() - start
+
+            results[name] = {
+                'ms_per_request': elapsed / requests * 1e3,
+                'connections': len(opened),
+            }
+    finally:
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = configured
+        connection_created.disconnect(count)
+
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--max-age', type=int, default=60)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+
+    print(f'database: {connection.vendor}')
+    results = run(args.requests, [
+        ('per-request', 0),
+        ('persistent', args.max_age),
+        ('configured', connection.settings_dict['CONN_MAX_AGE']),
+    ])
+    for name, result in results.items():
+        print(
+            f'{name:>12}: {result["ms_per_request"]:8.3f} ms per request, '
+            f'{result["connections"]:5d} connections opened'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+In-process HTTP load test of the main API endpoints.
+
+Drives `recipes-list`, `recipes-detail`, `user:me` and `user:token`
+through Django's ASGI handler with `loadtest.run_load`. Rate limits are
+disabled; the response cache can be disabled too.
+
+    python -m benchmarks.bench_http --requests 2000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+
+from . import setup, setup_database
+from .seed import PASSWORD, seed
+
+
+def endpoints(user, key, recipe_id):
+    """Return the load test of each endpoint as keyword arguments."""
+
+    from django.urls import reverse
+
+    auth = [('authorization', f'Token {key}')]
+
+    return {
+        'recipes-list': {
+            'url': reverse('recipes:recipes-list') + '?page_size=20',
+            'headers': auth,
+        },
+        'recipes-detail': {
+            'url': reverse('recipes:recipes-detail', args=[recipe_id]),
+            'headers': auth,
+        },
+        'user:me': {'url': reverse('user:me'), 'headers': auth},
+        'user:token': {
+            'url': reverse('user:token'),
+            'method': 'POST',
+            'headers': [('content-type', 'application/json')],
+            'body': json.dumps(
+                {'email': user.email, 'password': PASSWORD}
+            ).encode(),
+        },
+    }
+
+
+def run(user, key, requests, concurrency, login_requests, cache=True):
+    """Load test each endpoint and return its statistics."""
+
+    from django.core.asgi import get_asgi_application
+    from django.test import override_settings
+
+    from recipes.models import Recipes
+
+    from .loadtest import run_load
+
+    recipe_id = Recipes.objects.filter(user=user).values_list(
+        'id', flat=True
+    ).first()
+    app = get_asgi_application()
+    overrides = {'THROTTLE_ENABLED': False}
+    if not cache:
+        overrides['RECIPES_CACHE_TTL'] = 0
+
+    results = {}
+    with override_settings(**overrides):
+        for name, options in endpoints(user, key, recipe_id).items():
+            total = login_requests if name == 'user:token' else requests
+            results[name] = asyncio.run(run_load(
+                app, total=total, concurrency=concurrency, **options
+            ))
+
+    return results
+
+
+def main():
+    """Seed a test database, run the load test and print the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--login-requests', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    setup_database()
+    (user, key), = seed(1, args.recipes)
+
+    results = run(
+        user, key, args.requests, args.concurrency, args.login_requests,
+        cache=not args.no_cache,
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of password verification cost for each hasher profile.
+
+Reports the time of one verification, the logins per second a single
+core sustains, and the throughput of the bounded hashing pool under
+concurrent logins.
+
+    python -m benchmarks.bench_logins --logins 20 --threads 8
+"""
+
+import argparse
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+from . import setup
+
+PASSWORD = 'benchmark-password-123'
+
+
+def run(profiles, logins, threads):
+    """Time verification for each profile and return the results."""
+
+    from django.conf import settings
+    from django.contrib.auth.hashers import check_password, make_password
+    from django.test.utils import override_settings
+
+    results = {}
+    for profile in profiles:
+        path = settings.PASSWORD_HASHER_PROFILES[profile]
+        with override_settings(PASSWORD_HASHERS=[path]):
+            try:
+                encoded = make_password(PASSWORD)
+            except ValueError as exc:
+                print(f'{profile:>8}: skipped, {exc}')
+                continue
+
+            single = min(timeit.repeat(
+                lambda: check_password(PASSWORD, encoded),
+                number=1, repeat=logins,
+            ))
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as callers:
+                list(callers.map(
+                    lambda _: check_password(PASSWORD, encoded),
+                    range(logins),
+                ))
+            elapsed = time.perf_counter() - start
+
+        results[profile] = {
+            'verify_ms': single * 1e3,
+            'logins_per_core': 1 / single,
+            'pool_logins_per_sec': logins / elapsed,
+        }
+
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--profile', action='append', dest='profiles',
+        help='hasher profile to time, repeat for several (default: all)',
+    )
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+
+    profiles = args.profiles or list(settings.PASSWORD_HASHER_PROFILES)
+    print(f'hashing workers: {settings.PASSWORD_HASHING_WORKERS}')
+    for profile, result in run(profiles, args.logins, args.threads).items():
+        print(
+            f'{profile:>8}: {result["verify_ms"]:8.1f} ms per verify, '
+            f'{result["logins_per_core"]:7.1f} logins/s per core, '
+            f'{result["pool_logins_per_sec"]:7.1f} logins/s pooled'
+        )
+
+
+if __name__ == '__main__':
+    main()
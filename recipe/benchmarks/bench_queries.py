@@ -0,0 +1,81 @@
+"""
+Benchmark of the database cost of the recipe querysets.
+
+Times the queries behind the recipe endpoints for one seeded user.
+
+    python -m benchmarks.bench_queries --recipes 10000
+"""
+
+import argparse
+import json
+import timeit
+
+from . import setup, setup_database
+from .seed import seed
+
+
+def querysets(user):
+    """Return the named callables running each recipe query."""
+
+    from recipes.models import Recipes
+    from recipes.search import search_recipes
+    from recipes.serializers import RecipesSerializer
+
+    recipes = Recipes.objects.filter(user=user).order_by('-id')
+    columns = RecipesSerializer().values_columns()
+    ids = list(recipes.values_list('id', flat=True))
+    middle = ids[len(ids) // 2]
+    page = 51
+
+    return {
+        'list_values': lambda: list(recipes.values(*columns)[:page]),
+        'list_instances': lambda: list(recipes[:page]),
+        'list_deep_page': lambda: list(
+            recipes.filter(id__lt=middle).values(*columns)[:page]
+        ),
+        'filter_price': lambda: list(
+            recipes.filter(price__gte=10, price__lte=20)
+            .order_by('price', 'id').values(*columns)[:page]
+        ),
+        'search': lambda: list(
+            search_recipes(recipes, 'tomato soup').values(*columns)[:page]
+        ),
+        'detail': lambda: recipes.filter(pk=middle).first(),
+    }
+
+
+def run(user, repeat):
+    """Time each query and return ms per call and queries per call."""
+
+    from recipe.queries import QueryRecorder
+
+    results = {}
+    for name, func in querysets(user).items():
+        with QueryRecorder() as recorder:
+            func()
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        results[name] = {
+            'ms': round(best * 1e3, 3),
+            'queries': len(recorder.queries),
+        }
+
+    return results
+
+
+def main():
+    """Seed a test database, run the benchmark and print the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    setup_database()
+    (user, _key), = seed(1, args.recipes)
+
+    print(json.dumps(run(user, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
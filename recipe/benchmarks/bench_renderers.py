@@ -0,0 +1,62 @@
+"""
+Benchmark of rendering a recipe list with each JSON renderer.
+
+    python -m benchmarks.bench_renderers --count 1000
+"""
+
+import argparse
+import timeit
+
+from . import setup
+from .bench_serializers import make_rows
+
+
+def run(count, repeat):
+    """Time both renderers and return milliseconds per render."""
+
+    from rest_framework.renderers import JSONRenderer
+
+    from recipe.renderers import ORJSONRenderer
+    from recipes.serializers import RecipeDetailSerializer
+
+    serializer = RecipeDetailSerializer(fields=[
+        name for name in RecipeDetailSerializer.Meta.fields
+        if name != 'image'
+    ])
+    data = {
+        'next': None,
+        'previous': None,
+        'results': serializer.represent_values(make_rows(count)),
+    }
+
+    results = {}
+    for name, renderer in [
+        ('json', JSONRenderer()),
+        ('orjson', ORJSONRenderer()),
+    ]:
+        best = min(timeit.repeat(
+            lambda: renderer.render(data), number=1, repeat=repeat
+        ))
+        results[name] = best * 1e3
+
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    results = run(args.count, args.repeat)
+
+    for name, elapsed in results.items():
+        print(f'{name:>8}: {elapsed:8.3f} ms per {args.count} recipes')
+    print(f'{"speedup":>8}: {results["json"] / results["orjson"]:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark of recipe serialization cost per object.
+
+Compares the `ModelSerializer` path over model instances with the
+`values()` path used by the recipes list. No database is needed.
+
+    python -m benchmarks.bench_serializers --count 1000
+"""
+
+import argparse
+import timeit
+from decimal import Decimal
+
+from . import setup
+
+
+def make_rows(count):
+    """Return count recipe rows as `values()` and `fetch_relations` would."""
+
+    return [
+        {
+            'id': i,
+            'title': f'Recipe {i}',
+            'description': 'A tasty recipe.',
+            'time_minutes': i % 120,
+            'price': Decimal('5.25'),
+            'link': 'http://example.com/recipe.pdf',
+            'tags': [{'id': 1, 'name': 'quick'}],
+            'ingredients': [
+                {'id': 1, 'name': 'flour'}, {'id': 2, 'name': 'salt'},
+            ],
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def run(count, repeat):
+    """Time both serialization paths and return µs per object."""
+
+    from recipes.models import RELATION_MODELS, Recipes
+    from recipes.serializers import RecipesSerializer
+
+    # unsaved recipes have no relations, compare the columns only.
+    fields = [
+        name for name in RecipesSerializer.Meta.fields
+        if name not in RELATION_MODELS
+    ]
+    rows = make_rows(count)
+    recipes = [
+        Recipes(user_id=1, **{name: row[name] for name in fields})
+        for row in rows
+    ]
+
+    def model_serializer():
+        return RecipesSerializer(recipes, many=True, fields=fields).data
+
+    def values_path():
+        return RecipesSerializer(fields=fields).represent_values(rows)
+
+    assert model_serializer() == values_path()
+
+    results = {}
+    for name, func in [
+        ('model_serializer', model_serializer),
+        ('values', values_path),
+    ]:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        results[name] = best / count * 1e6
+
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    results = run(args.count, args.repeat)
+
+    for name, per_object in results.items():
+        print(f'{name:>18}: {per_object:8.2f} µs/object')
+    speedup = results['model_serializer'] / results['values']
+    print(f'{"speedup":>18}: {speedup:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
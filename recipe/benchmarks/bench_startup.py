@@ -0,0 +1,154 @@
+"""
+Benchmark of the cold start of the app in each settings profile.
+
+Times `python -X importtime manage.py check` and the time from starting
+a fresh interpreter to the response of its first request, for the full
+and the API only profile. Every run is a new process, so nothing
+imported by the caller is reused.
+
+    python -m benchmarks.bench_startup --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    'full': {'API_ONLY': 'false'},
+    'api_only': {'API_ONLY': 'true'},
+}
+
+# Serves one unauthenticated request, which needs no database, and
+# prints its status as soon as the response is complete.
+FIRST_REQUEST = '''
+from wsgiref.util import setup_testing_defaults
+from recipe.wsgi import application
+environ = {'PATH_INFO': '/api/user/me/'}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers: statuses.append(status)))
+print(statuses[0], flush=True)
+'''
+
+
+def profile_env(profile):
+    """Return the environment of a process running in profile."""
+
+    return {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'recipe.settings',
+        **PROFILES[profile],
+    }
+
+
+def parse_importtime(stderr):
+    """Return the imported modules with their cumulative microseconds.
+
+    Also returns the total of their own import times.
+    """
+
+    modules = []
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        total += int(own)
+        modules.append((name.rstrip(), int(cumulative)))
+
+    return modules, total
+
+
+def time_check(profile):
+    """Run `manage.py check` with -X importtime once.
+
+    Returns the wall time and import time in milliseconds, the number
+    of modules imported and the slowest top level imports.
+    """
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', 'manage.py', 'check'],
+        cwd=PROJECT_DIR, env=profile_env(profile),
+        capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - started
+
+    modules, total = parse_importtime(result.stderr)
+    # top level imports are not indented.
+    slowest = sorted(
+        (item for item in modules if not item[0].startswith('  ')),
+        key=lambda item: item[1], reverse=True,
+    )[:5]
+
+    return elapsed * 1e3, total / 1e3, len(modules), slowest
+
+
+def time_first_request(profile):
+    """Return the milliseconds from process start to the first response."""
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-c', FIRST_REQUEST],
+        cwd=PROJECT_DIR, env=profile_env(profile),
+        stdout=subprocess.PIPE, text=True,
+    )
+    status = process.stdout.readline()
+    elapsed = time.perf_counter() - started
+    process.communicate()
+    if process.returncode or not status:
+        raise RuntimeError(f'first request failed in profile {profile}')
+
+    return elapsed * 1e3
+
+
+def run(repeat, profiles=None):
+    """Time every profile repeat times and return the medians."""
+
+    results = {}
+    slowest = {}
+    for profile in profiles or PROFILES:
+        checks = [time_check(profile) for _ in range(repeat)]
+        first_requests = [time_first_request(profile) for _ in range(repeat)]
+        results[profile] = {
+            'check_ms': statistics.median(item[0] for item in checks),
+            'import_ms': statistics.median(item[1] for item in checks),
+            'modules': checks[-1][2],
+            'first_request_ms': statistics.median(first_requests),
+        }
+        slowest[profile] = checks[-1][3]
+
+    return results, slowest
+
+
+def main():
+    """Run the benchmark and print the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--profile', action='append', dest='profiles', choices=PROFILES,
+        help='settings profile to time, repeat for several (default: all)',
+    )
+    args = parser.parse_args()
+
+    results, slowest = run(args.repeat, args.profiles)
+    for profile, result in results.items():
+        print(
+            f'{profile:>8}: check {result["check_ms"]:7.1f} ms, '
+            f'imports {result["import_ms"]:7.1f} ms '
+            f'({result["modules"]} modules), '
+            f'first request {result["first_request_ms"]:7.1f} ms'
+        )
+        for name, cumulative in slowest[profile]:
+            print(f'{"":>10}{cumulative / 1e3:7.1f} ms  {name.strip()}')
+
+
+if __name__ == '__main__':
+    main()
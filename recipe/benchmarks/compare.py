@@ -0,0 +1,59 @@
+"""
+Compare two benchmark result files written by `benchmarks.run`.
+
+    python -m benchmarks.compare old.json new.json
+
+Prints every metric of both runs with the relative change.
+"""
+
+import argparse
+import json
+
+
+def metrics(results, prefix=''):
+    """Yield the dotted name and value of every numeric result."""
+
+    for name, value in results.items():
+        path = f'{prefix}{name}'
+        if isinstance(value, dict):
+            yield from metrics(value, f'{path}.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def compare(old, new):
+    """Return rows of metric name, old value, new value and change."""
+
+    old_metrics = dict(metrics(old['results']))
+    rows = []
+    for name, value in metrics(new['results']):
+        before = old_metrics.get(name)
+        if before:
+            change = (value - before) / before * 100
+        else:
+            change = None
+        rows.append((name, before, value, change))
+
+    return rows
+
+
+def main():
+    """Print the comparison of two result files."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('old')
+    parser.add_argument('new')
+    args = parser.parse_args()
+
+    with open(args.old) as old, open(args.new) as new:
+        rows = compare(json.load(old), json.load(new))
+
+    width = max(len(name) for name, *_ in rows)
+    for name, before, after, change in rows:
+        before = '-' if before is None else f'{before:.3f}'
+        change = '' if change is None else f'{change:+.1f}%'
+        print(f'{name:<{width}}  {before:>12}  {after:>12.3f}  {change:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+In-process load generator for ASGI applications.
+
+Requests are sent straight to the ASGI callable, so the numbers measure
+the Django stack and the database, not the network.
+"""
+
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def asgi_request(app, method, url, headers=(), body=b''):
+    """Send one request to app and return the response status."""
+
+    parts = urlsplit(url)
+    if body:
+        headers = [*headers, ('content-length', str(len(body)))]
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': [
+            (name.lower().encode(), value.encode())
+            for name, value in [('host', 'testserver'), *headers]
+        ],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 50000),
+    }
+    request_sent = False
+    disconnect = asyncio.Event()
+    response = {}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif not message.get('more_body', False):
+            disconnect.set()
+
+    await app(scope, receive, send)
+
+    return response.get('status')
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Return throughput and latency percentiles in milliseconds."""
+
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(quantiles[49] * 1e3, 3),
+        'p95_ms': round(quantiles[94] * 1e3, 3),
+        'p99_ms': round(quantiles[98] * 1e3, 3),
+    }
+
+
+async def run_load(app, url, total, concurrency, method='GET', headers=(),
+                   body=b'', expected_status=200):
+    """Send total requests from concurrency workers and summarize them."""
+
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            status = await asgi_request(app, method, url, headers, body)
+            latencies.append(time.perf_counter() - start)
+            if status != expected_status:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return summarize(latencies, time.perf_counter() - start, errors)
@@ -0,0 +1,110 @@
+"""
+Run the benchmark suite and store the results as JSON.
+
+Seeds a throwaway test database with `--users` users of `--recipes`
+recipes each, then runs the serializer, renderer and queryset
+microbenchmarks, the HTTP load test and the startup benchmark. Results
+are written with the run parameters and environment so runs can be
+compared with `benchmarks.compare`.
+
+    python -m benchmarks.run --output benchmarks/results/baseline.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import (
+    bench_http,
+    bench_queries,
+    bench_renderers,
+    bench_serializers,
+    bench_startup,
+    setup,
+    setup_database,
+)
+from .seed import seed
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def environment():
+    """Return the details of the environment the suite runs in."""
+
+    import django
+    from django.db import connection
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+    }
+
+
+def main():
+    """Run every benchmark and write the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--login-requests', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--startup-repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path)
+    args = parser.parse_args()
+
+    setup()
+    setup_database()
+    seeded = seed(args.users, args.recipes, seed_value=args.seed)
+    user, key = seeded[0]
+
+    started = datetime.now(timezone.utc)
+    results = {
+        'serializers_us_per_object': bench_serializers.run(
+            args.count, args.repeat
+        ),
+        'renderers_ms': bench_renderers.run(args.count, args.repeat),
+        'queries': bench_queries.run(user, args.repeat),
+        'http': bench_http.run(
+            user, key, args.requests, args.concurrency, args.login_requests
+        ),
+        'startup_ms': bench_startup.run(args.startup_repeat)[0],
+    }
+
+    report = {
+        'started': started.isoformat(),
+        'parameters': {
+            name: value for name, value in vars(args).items()
+            if name != 'output'
+        },
+        'environment': environment(),
+        'results': results,
+    }
+
+    output = args.output or RESULTS_DIR / (
+        started.strftime('%Y%m%dT%H%M%SZ') + '.json'
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + '\n')
+    print(f'results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
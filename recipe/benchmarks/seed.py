@@ -0,0 +1,105 @@
+"""
+Reproducible benchmark data.
+
+Seeds users, each with a token and recipes, using `bulk_create`. The
+same seed always produces the same data.
+
+    python -m benchmarks.seed --users 10 --recipes 1000
+
+Run standalone it writes to the configured database.
+"""
+
+import argparse
+import random
+from decimal import Decimal
+
+from . import setup
+
+PASSWORD = 'benchpass123'
+
+WORDS = [
+    'tomato', 'basil', 'garlic', 'lemon', 'chicken', 'rice', 'noodle',
+    'curry', 'mushroom', 'onion', 'pepper', 'ginger', 'spinach', 'bean',
+    'cheese', 'potato', 'salmon', 'honey', 'chili', 'coconut',
+]
+DISHES = ['soup', 'salad', 'stew', 'pie', 'roast', 'bake', 'stir fry']
+
+
+def make_recipe(user, rng):
+    """Return an unsaved recipe for user with generated values."""
+
+    from recipes.models import Recipes
+
+    words = rng.sample(WORDS, 2)
+
+    return Recipes(
+        user=user,
+        title=f'{words[0].title()} {words[1]} {rng.choice(DISHES)}',
+        description=' '.join(rng.choices(WORDS, k=12)),
+        time_minutes=rng.randint(5, 180),
+        price=Decimal(rng.randint(100, 5000)) / 100,
+        link='http://example.com/recipe.pdf',
+    )
+
+
+def seed(users, recipes, batch_size=1000, seed_value=0):
+    """Create users with a token and recipes each.
+
+    Returns the users and their token keys, as `(user, key)` pairs.
+    """
+
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from rest_framework.authtoken.models import Token
+
+    from recipes.models import Recipes
+
+    rng = random.Random(seed_value)
+    user_model = get_user_model()
+    # Hashing is slow by design, every user shares one hash.
+    password = make_password(PASSWORD)
+
+    emails = [f'bench{index}@example.com' for index in range(users)]
+    user_model.objects.bulk_create(
+        [
+            user_model(email=email, name=f'Bench {index}', password=password)
+            for index, email in enumerate(emails)
+        ],
+        batch_size=batch_size,
+    )
+    seeded = list(user_model.objects.filter(email__in=emails).order_by('id'))
+
+    tokens = [
+        Token(user=user, key=Token.generate_key()) for user in seeded
+    ]
+    Token.objects.bulk_create(tokens, batch_size=batch_size)
+
+    batch = []
+    for user in seeded:
+        for _ in range(recipes):
+            batch.append(make_recipe(user, rng))
+            if len(batch) >= batch_size:
+                Recipes.objects.bulk_create(batch)
+                batch = []
+    if batch:
+        Recipes.objects.bulk_create(batch)
+
+    return [(token.user, token.key) for token in tokens]
+
+
+def main():
+    """Seed the configured database."""
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup()
+    seeded = seed(args.users, args.recipes, seed_value=args.seed)
+    print(f'seeded {len(seeded)} users with {args.recipes} recipes each')
+
+
+if __name__ == '__main__':
+    main()
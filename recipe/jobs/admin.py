@@ -0,0 +1,10 @@
+"""
+Registers the models to admin.
+"""
+
+from django.contrib import admin
+
+from .models import Job
+
+
+admin.site.register(Job)
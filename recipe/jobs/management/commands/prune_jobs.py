@@ -0,0 +1,25 @@
+"""
+Deletes old finished jobs and the files they produced.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import prune
+
+
+class Command(BaseCommand):
+    """Keeps the jobs table and the job files from growing forever."""
+
+    help = 'Deletes finished jobs and their files after the retention.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.JOBS_RETENTION_DAYS,
+            help='Days finished jobs are kept.',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune(max(options['days'], 0))
+
+        self.stdout.write(f'Deleted {deleted} job(s).')
@@ -0,0 +1,89 @@
+"""
+Runs queued background jobs.
+"""
+
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import Worker
+
+
+def run_worker(threads, poll_interval, burst):
+    """Run a worker in the current process until it is stopped."""
+
+    worker = Worker(threads, poll_interval, burst)
+    handlers = {
+        signum: signal.signal(signum, worker.stop)
+        for signum in (signal.SIGTERM, signal.SIGINT)
+    }
+    try:
+        worker.run()
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+
+class Command(BaseCommand):
+    """Runs workers claiming jobs from the queue table."""
+
+    help = 'Runs queued background jobs on a pool of processes and threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOBS_WORKER_PROCESSES,
+            help='Worker processes to start.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=settings.JOBS_WORKER_THREADS,
+            help='Threads running jobs in each process.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Seconds to wait before polling an empty queue again.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is due instead of polling.',
+        )
+
+    def handle(self, *args, **options):
+        worker_args = (
+            max(options['threads'], 1),
+            options['poll_interval'],
+            options['burst'],
+        )
+        processes = max(options['processes'], 1)
+        self.stdout.write(
+            f'Running jobs on {processes} process(es) of '
+            f'{worker_args[0]} thread(s).'
+        )
+
+        if processes == 1:
+            run_worker(*worker_args)
+            return
+
+        # children must not share the parent's database connections.
+        # They are forked so they inherit the configured Django.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=run_worker, args=worker_args)
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+
+        def stop(*args):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for child in children:
+            child.join()
@@ -0,0 +1,75 @@
+"""
+Contains model for jobs app.
+"""
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Background work queued by a request and run by a worker."""
+
+    class Status(models.TextChoices):
+        """States of a job."""
+
+        QUEUED = 'queued'
+        RUNNING = 'running'
+        SUCCEEDED = 'succeeded'
+        FAILED = 'failed'
+
+    # Kept when the user is deleted, so the job deleting them can finish.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.QUEUED
+    )
+    progress = models.JSONField(
+        null=True, blank=True, encoder=DjangoJSONEncoder
+    )
+    result = models.JSONField(
+        null=True, blank=True, encoder=DjangoJSONEncoder
+    )
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    # A queued job is not claimed before run_at, retries are delayed
+    # by moving it forward.
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+    def report(self, progress):
+        """Save the progress of the running job.
+
+        Also refreshes its lock, like a heartbeat.
+        """
+
+        self.progress = progress
+        Job.objects.filter(pk=self.pk).update(
+            progress=progress, locked_at=timezone.now()
+        )
+
+    class Meta:
+        """Additional settings for model"""
+        db_table = 'jobs'
+        indexes = [
+            # workers claim the oldest due job through this index only.
+            models.Index(
+                fields=['run_at', 'id'],
+                name='jobs_queued_run_at_idx',
+                condition=models.Q(status='queued'),
+            ),
+        ]
@@ -0,0 +1,324 @@
+"""
+Database backed job queue.
+
+Tasks are registered with `task` in the `tasks` module of an app and
+queued with `enqueue`. Workers claim due jobs with
+`SELECT ... FOR UPDATE SKIP LOCKED` where the database supports it,
+so any number of them can poll the same table without blocking each
+other. Other databases, such as SQLite, claim a job with a conditional
+`UPDATE` instead, which only one worker can win. While a job runs its
+worker refreshes `locked_at` as a heartbeat, jobs whose heartbeat
+stopped are released by `release_stale`.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import (
+    DatabaseError,
+    OperationalError,
+    connections,
+    router,
+    transaction,
+)
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+Task = namedtuple('Task', ['name', 'func', 'max_attempts'])
+
+TASKS = {}
+
+# Due jobs a worker tries to claim per poll when it cannot skip locks.
+CLAIM_CANDIDATES = 10
+
+# Jobs deleted per query by `prune`.
+PRUNE_BATCH_SIZE = 1000
+
+# Tries at saving the state of a job that ran, e.g. while SQLite is busy
+# with a write of another worker.
+FINISH_ATTEMPTS = 5
+
+
+def task(name, max_attempts=None):
+    """Register the decorated function as the task name.
+
+    The function is called with the claimed `Job`; its return value is
+    stored as the job result. max_attempts defaults to
+    `JOBS_MAX_ATTEMPTS`, use 1 for tasks that are not safe to repeat.
+    """
+
+    def register(func):
+        TASKS[name] = Task(name, func, max_attempts)
+        return func
+
+    return register
+
+
+def enqueue(name, user=None, **payload):
+    """Queue the task name with a JSON serializable payload."""
+
+    return Job.objects.create(
+        name=name,
+        user=user,
+        payload=payload,
+        max_attempts=(
+            TASKS[name].max_attempts or settings.JOBS_MAX_ATTEMPTS
+        ),
+    )
+
+
+def worker_name():
+    """Return the name identifying the calling worker thread."""
+
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def retry_delay(attempts):
+    """Return how long to wait before retrying after attempts."""
+
+    return timedelta(seconds=min(
+        settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_BACKOFF_MAX,
+    ))
+
+
+def _claim_locking(queryset, worker):
+    """Claim the first due job, skipping rows locked by other workers."""
+
+    with transaction.atomic(using=queryset.db):
+        job = queryset.select_for_update(skip_locked=True).first()
+        if job is None:
+            return None
+
+        job.status = Job.Status.RUNNING
+        job.attempts += 1
+        job.locked_by = worker
+        job.locked_at = timezone.now()
+        job.save(update_fields=[
+            'status', 'attempts', 'locked_by', 'locked_at'
+        ])
+
+    return job
+
+
+def _claim_conditional(queryset, worker):
+    """Claim a due job with an `UPDATE` only one worker can win."""
+
+    candidates = list(
+        queryset.values_list('id', flat=True)[:CLAIM_CANDIDATES]
+    )
+    for job_id in candidates:
+        claimed = Job.objects.filter(
+            id=job_id, status=Job.Status.QUEUED
+        ).update(
+            status=Job.Status.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_by=worker,
+            locked_at=timezone.now(),
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+
+    return None
+
+
+def claim(worker=None):
+    """Return the oldest due job marked as running, or None."""
+
+    worker = worker or worker_name()
+    using = router.db_for_write(Job)
+    queryset = Job.objects.using(using).filter(
+        status=Job.Status.QUEUED, run_at__lte=timezone.now()
+    ).order_by('run_at', 'id')
+
+    if connections[using].features.has_select_for_update_skip_locked:
+        return _claim_locking(queryset, worker)
+
+    return _claim_conditional(queryset, worker)
+
+
+def heartbeat(job):
+    """Refresh the lock of a running job, showing its worker is alive.
+
+    Returns whether the job is still locked by its worker.
+    """
+
+    return bool(Job.objects.filter(
+        pk=job.pk, status=Job.Status.RUNNING, locked_by=job.locked_by
+    ).update(locked_at=timezone.now()))
+
+
+@contextmanager
+def beating(job):
+    """Send the heartbeat of job from a thread while the block runs.
+
+    Beats every `JOBS_HEARTBEAT_INTERVAL` seconds, none with 0.
+    """
+
+    interval = settings.JOBS_HEARTBEAT_INTERVAL
+    if interval <= 0:
+        yield
+        return
+
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                try:
+                    heartbeat(job)
+                except DatabaseError as exc:
+                    logger.info('Could not refresh job %s: %s', job, exc)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(
+        target=beat, name=f'jobs-heartbeat-{job.pk}', daemon=True
+    )
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def finish(job, status, **fields):
+    """Save the final or retry state of a running job.
+
+    The work is done by then, so saving is retried briefly on
+    operational errors rather than leaving the job to run again.
+    """
+
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.status = status
+    job.locked_by = ''
+    job.locked_at = None
+    for attempt in range(1, FINISH_ATTEMPTS + 1):
+        try:
+            job.save(update_fields=[
+                'status', 'locked_by', 'locked_at', *fields
+            ])
+            return
+        except OperationalError:
+            if attempt == FINISH_ATTEMPTS:
+                raise
+            time.sleep(0.05 * attempt)
+
+
+def run_job(job):
+    """Run a claimed job and record its result.
+
+    A failed job is queued again after `retry_delay` until it has used
+    its attempts.
+    """
+
+    try:
+        func = TASKS[job.name].func
+        with beating(job):
+            result = func(job)
+    except Exception:
+        logger.exception('Job %s failed on attempt %d.', job, job.attempts)
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            finish(
+                job, Job.Status.QUEUED,
+                error=error,
+                run_at=timezone.now() + retry_delay(job.attempts),
+            )
+        else:
+            finish(
+                job, Job.Status.FAILED,
+                error=error, finished_at=timezone.now(),
+            )
+    else:
+        finish(
+            job, Job.Status.SUCCEEDED,
+            result=result, error='', finished_at=timezone.now(),
+        )
+
+    return job
+
+
+def release_stale():
+    """Queue again the jobs of workers that stopped while running them.
+
+    A job is stale once its heartbeat is older than `JOBS_LOCK_TIMEOUT`.
+    Returns the number of jobs released.
+    """
+
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT),
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.Status.FAILED,
+        error='Worker stopped while running the job.',
+        locked_by='',
+        locked_at=None,
+        finished_at=now,
+    )
+    queued = stale.update(
+        status=Job.Status.QUEUED, locked_by='', locked_at=None, run_at=now
+    )
+
+    return failed + queued
+
+
+def prune(days=None):
+    """Delete the jobs finished more than days ago, with their files.
+
+    days defaults to `JOBS_RETENTION_DAYS`. A file a job left in
+    `default_storage`, named by the `file` key of its result, is deleted
+    with it. Returns the number of jobs deleted.
+    """
+
+    days = settings.JOBS_RETENTION_DAYS if days is None else days
+    finished = Job.objects.filter(
+        status__in=[Job.Status.SUCCEEDED, Job.Status.FAILED],
+        finished_at__lt=timezone.now() - timedelta(days=days),
+    ).order_by('pk')
+
+    deleted = 0
+    while True:
+        batch = list(finished.values_list('pk', 'result')[:PRUNE_BATCH_SIZE])
+        if not batch:
+            return deleted
+        for _, result in batch:
+            if isinstance(result, dict) and result.get('file'):
+                default_storage.delete(result['file'])
+        deleted += Job.objects.filter(
+            pk__in=[pk for pk, _ in batch]
+        ).delete()[0]
+
+
+def run_pending(limit=None):
+    """Run due jobs in the calling thread until none is left.
+
+    Returns the number of jobs run.
+    """
+
+    count = 0
+    while limit is None or count < limit:
+        job = claim()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+
+    return count
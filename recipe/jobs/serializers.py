@@ -0,0 +1,21 @@
+"""
+Serializers for jobs objects.
+"""
+
+from rest_framework import serializers
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializes the state of a job."""
+
+    class Meta:
+        """Contains settings for serializer class"""
+
+        model = Job
+        fields = [
+            'id', 'name', 'status', 'progress', 'result', 'attempts',
+            'max_attempts', 'created_at', 'finished_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,285 @@
+"""
+Tests the job queue, worker and status API.
+"""
+
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import Job
+from ..queue import (
+    claim,
+    enqueue,
+    heartbeat,
+    prune,
+    release_stale,
+    run_job,
+    run_pending,
+    task,
+)
+from ..worker import Worker
+
+
+@task('tests.echo')
+def echo(job):
+    """Return the payload of the job."""
+
+    return job.payload
+
+
+@task('tests.fail', max_attempts=2)
+def fail(job):
+    """Raise on every attempt."""
+
+    raise RuntimeError('boom')
+
+
+def job_detail_url(job_id):
+    """Return the status url of a job."""
+
+    return reverse('jobs:job-detail', args=[job_id])
+
+
+class JobQueueTests(TestCase):
+    """Test claiming and running jobs."""
+
+    def test_enqueue_uses_task_attempts(self):
+        """Test jobs take the attempts of their task or the setting."""
+
+        with self.settings(JOBS_MAX_ATTEMPTS=5):
+            self.assertEqual(enqueue('tests.echo').max_attempts, 5)
+        self.assertEqual(enqueue('tests.fail').max_attempts, 2)
+
+    def test_claim_marks_job_running(self):
+        """Test a claimed job is not claimed again."""
+
+        job = enqueue('tests.echo', value=1)
+
+        claimed = claim('worker-1')
+
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, Job.Status.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(claimed.locked_by, 'worker-1')
+        self.assertIsNone(claim('worker-2'))
+
+    def test_claim_oldest_due_job(self):
+        """Test jobs are claimed in order and not before they are due."""
+
+        later = enqueue('tests.echo')
+        later.run_at = timezone.now() + timedelta(minutes=1)
+        later.save()
+        first = enqueue('tests.echo')
+        second = enqueue('tests.echo')
+
+        self.assertEqual(claim().id, first.id)
+        self.assertEqual(claim().id, second.id)
+        self.assertIsNone(claim())
+
+    def test_run_job_stores_result(self):
+        """Test a succeeded job holds the task return value."""
+
+        enqueue('tests.echo', value=1)
+
+        job = run_job(claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result, {'value': 1})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_retried_with_backoff(self):
+        """Test a failing job is delayed, then failed after its attempts."""
+
+        enqueue('tests.fail')
+
+        with self.settings(JOBS_RETRY_BACKOFF=30):
+            job = run_job(claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=20))
+        self.assertIn('boom', job.error)
+        self.assertIsNone(claim())
+
+        Job.objects.update(run_at=timezone.now())
+        job = run_job(claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_release_stale(self):
+        """Test jobs of lost workers are queued again or failed."""
+
+        retried = enqueue('tests.echo')
+        exhausted = enqueue('tests.fail')
+        Job.objects.update(
+            status=Job.Status.RUNNING,
+            attempts=2,
+            locked_at=timezone.now() - timedelta(hours=2),
+        )
+
+        with self.settings(JOBS_MAX_ATTEMPTS=3, JOBS_LOCK_TIMEOUT=3600):
+            self.assertEqual(release_stale(), 2)
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retried.status, Job.Status.QUEUED)
+        self.assertEqual(exhausted.status, Job.Status.FAILED)
+
+    def test_heartbeat_keeps_job_running(self):
+        """Test running jobs with a recent heartbeat are not released."""
+
+        enqueue('tests.echo')
+        job = claim('worker-1')
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=2))
+
+        self.assertTrue(heartbeat(job))
+        with self.settings(JOBS_LOCK_TIMEOUT=3600):
+            self.assertEqual(release_stale(), 0)
+
+        Job.objects.update(locked_by='worker-2')
+        self.assertFalse(heartbeat(job))
+
+    def test_report_refreshes_lock(self):
+        """Test reporting progress counts as a heartbeat."""
+
+        enqueue('tests.echo')
+        job = claim('worker-1')
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=2))
+
+        job.report({'done': 1})
+
+        with self.settings(JOBS_LOCK_TIMEOUT=3600):
+            self.assertEqual(release_stale(), 0)
+
+    def test_prune_deletes_old_jobs_and_files(self):
+        """Test finished jobs past the retention go with their files."""
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = self.settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+        name = default_storage.save('jobs/1/out.csv', ContentFile(b'x'))
+        old = enqueue('tests.echo')
+        recent = enqueue('tests.echo')
+        running = enqueue('tests.echo')
+        Job.objects.filter(pk=old.pk).update(
+            status=Job.Status.SUCCEEDED, result={'file': name},
+            finished_at=timezone.now() - timedelta(days=10),
+        )
+        Job.objects.filter(pk=recent.pk).update(
+            status=Job.Status.FAILED, finished_at=timezone.now(),
+        )
+
+        out = StringIO()
+        with self.settings(JOBS_RETENTION_DAYS=7):
+            call_command('prune_jobs', stdout=out)
+
+        self.assertIn('Deleted 1 job(s).', out.getvalue())
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(
+            set(Job.objects.values_list('pk', flat=True)),
+            {recent.pk, running.pk},
+        )
+        self.assertEqual(prune(days=0), 1)
+
+    def test_run_pending(self):
+        """Test every due job is run."""
+
+        for value in range(3):
+            enqueue('tests.echo', value=value)
+
+        self.assertEqual(run_pending(), 3)
+        self.assertEqual(
+            Job.objects.filter(status=Job.Status.SUCCEEDED).count(), 3
+        )
+
+
+class JobWorkerTests(TransactionTestCase):
+    """Test workers running jobs on threads."""
+
+    def test_worker_threads_run_each_job_once(self):
+        """Test concurrent worker threads never run a job twice."""
+
+        for value in range(20):
+            enqueue('tests.echo', value=value)
+
+        Worker(threads=4, poll_interval=0.01, burst=True).run()
+
+        jobs = Job.objects.all()
+        self.assertTrue(all(
+            job.status == Job.Status.SUCCEEDED and job.attempts == 1
+            for job in jobs
+        ))
+
+    def test_run_jobs_command(self):
+        """Test the command runs due jobs and exits with burst."""
+
+        enqueue('tests.echo', value=1)
+        out = StringIO()
+
+        call_command('run_jobs', '--burst', '--threads=2', stdout=out)
+
+        self.assertIn('2 thread(s)', out.getvalue())
+        self.assertEqual(Job.objects.get().status, Job.Status.SUCCEEDED)
+
+
+class JobApiTests(TestCase):
+    """Test the job status API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_job_status(self):
+        """Test the owner sees the state of a job."""
+
+        job = enqueue('tests.echo', user=self.user, value=1)
+        run_pending()
+
+        res = self.client.get(job_detail_url(job.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Job.Status.SUCCEEDED)
+        self.assertEqual(res.data['result'], {'value': 1})
+
+    def test_job_limited_to_user(self):
+        """Test the jobs of other users are not found."""
+
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass@123'
+        )
+        job = enqueue('tests.echo', user=other)
+
+        res = self.client.get(job_detail_url(job.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_file_of_unfinished_job_not_found(self):
+        """Test no file is served before the job succeeded."""
+
+        job = enqueue('tests.echo', user=self.user)
+
+        res = self.client.get(reverse('jobs:job-file', args=[job.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
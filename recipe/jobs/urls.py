@@ -0,0 +1,14 @@
+"""
+Contains urls for the jobs API.
+"""
+
+from django.urls import path
+
+from .views import JobFileView, JobView
+
+app_name = 'jobs'
+
+urlpatterns = [
+    path('<int:pk>/', JobView.as_view(), name='job-detail'),
+    path('<int:pk>/file/', JobFileView.as_view(), name='job-file'),
+]
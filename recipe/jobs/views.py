@@ -0,0 +1,94 @@
+"""
+Contains views for the jobs API.
+"""
+
+import os
+
+from django.core.files.storage import default_storage
+from django.http import FileResponse
+from django.urls import reverse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiResponse, extend_schema
+
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from recipe.throttling import AccountRateThrottle
+from user.authentication import CachedTokenAuthentication
+
+from .models import Job
+from .serializers import JobSerializer
+
+
+def job_accepted(request, job, pollable=True):
+    """Return a 202 response pointing at the status of a queued job.
+
+    Jobs are only served to their active user, see `UserJobMixin`. Jobs
+    its user cannot poll, such as the purge of a deactivated account,
+    pass pollable=False and get neither a `url` nor a `Location`.
+    """
+
+    if not pollable:
+        return Response(
+            JobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+    url = request.build_absolute_uri(
+        reverse('jobs:job-detail', args=[job.id])
+    )
+
+    return Response(
+        {**JobSerializer(job).data, 'url': url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': url},
+    )
+
+
+class UserJobMixin:
+    """Restricts jobs to those of the authenticated user.
+
+    Deactivated users cannot authenticate, so their jobs, including
+    exports queued before the deactivation, can no longer be polled.
+    """
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AccountRateThrottle]
+
+    def get_queryset(self):
+        """Return the jobs of the authenticated user."""
+
+        return Job.objects.filter(user=self.request.user)
+
+
+class JobView(UserJobMixin, generics.RetrieveAPIView):
+    """Report the status of a job."""
+
+    serializer_class = JobSerializer
+
+
+class JobFileView(UserJobMixin, generics.GenericAPIView):
+    """Download the file produced by a job."""
+
+    @extend_schema(responses={
+        (200, '*/*'): OpenApiResponse(
+            OpenApiTypes.BINARY,
+            description='The file, as an attachment of its content type.',
+        ),
+        404: OpenApiResponse(description='The job has no file yet.'),
+    })
+    def get(self, request, pk):
+        """Stream the result file of a succeeded job."""
+
+        job = self.get_object()
+        name = (job.result or {}).get('file')
+        if job.status != Job.Status.SUCCEEDED or not name:
+            raise NotFound()
+
+        return FileResponse(
+            default_storage.open(name, 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(name),
+            content_type=job.result.get('content_type'),
+        )
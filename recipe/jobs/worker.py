@@ -0,0 +1,96 @@
+"""
+Job worker running a pool of threads in one process.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+
+from .queue import claim, release_stale, run_job, worker_name
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Claims and runs jobs on threads until stopped.
+
+    Each thread polls the queue every poll_interval seconds while it is
+    empty. With burst, threads return once no job is due instead.
+    """
+
+    def __init__(self, threads=1, poll_interval=1.0, burst=False):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.release_lock = threading.Lock()
+        self.next_release = 0
+
+    def stop(self, *args):
+        """Let running jobs finish, then return from `run`."""
+
+        self.stopping.set()
+
+    def release_stale(self):
+        """Release stale jobs, once per heartbeat interval at most.
+
+        Idle threads all call this, only the first one due releases.
+        """
+
+        with self.release_lock:
+            now = time.monotonic()
+            if now < self.next_release:
+                return
+            self.next_release = now + max(
+                settings.JOBS_HEARTBEAT_INTERVAL, self.poll_interval
+            )
+
+        try:
+            release_stale()
+        except DatabaseError as exc:
+            logger.info('Could not release stale jobs: %s', exc)
+
+    def run(self):
+        """Run the worker threads and wait for them to return."""
+
+        threads = [
+            threading.Thread(target=self.loop, name=f'jobs-worker-{index}')
+            for index in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def loop(self):
+        """Run due jobs one at a time, the body of each thread."""
+
+        name = worker_name()
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    job = claim(name)
+                except DatabaseError as exc:
+                    # e.g. SQLite busy with a write of another worker.
+                    logger.info('Could not claim a job: %s', exc)
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                if job is None:
+                    if self.burst:
+                        return
+                    self.release_stale()
+                    self.stopping.wait(self.poll_interval)
+                    continue
+
+                logger.info('Running job %s.', job)
+                try:
+                    run_job(job)
+                except DatabaseError:
+                    # the job is run again once released as stale.
+                    logger.exception('Could not save job %s.', job)
+        finally:
+            connections.close_all()
@@ -0,0 +1,49 @@
+"""
+Executors built on first use from settings.
+
+Starting worker threads or processes at import would cost every
+process, including those that never use them, and fix their size
+before tests can override it. `LazyExecutor` builds its executor on
+first use and shuts it down when one of its settings changes, so the
+next use builds it again from the new values.
+"""
+
+import threading
+
+from django.core.signals import setting_changed
+
+
+class LazyExecutor:
+    """Holds the executor made by factory, built on first use.
+
+    setting_names are the settings factory reads, a change to any of
+    them, e.g. with `override_settings`, resets the executor.
+    """
+
+    def __init__(self, setting_names, factory):
+        self.setting_names = frozenset(setting_names)
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._executor = None
+        setting_changed.connect(self._setting_changed)
+
+    def get(self):
+        """Return the executor, building it if needed."""
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = self.factory()
+
+            return self._executor
+
+    def reset(self):
+        """Shut the executor down, without waiting for running work."""
+
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _setting_changed(self, setting, **kwargs):
+        if setting in self.setting_names:
+            self.reset()
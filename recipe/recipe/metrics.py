@@ -0,0 +1,308 @@
+"""
+Per-request performance instrumentation.
+
+`metrics_middleware` times each request and collects, through a query
+wrapper on every database connection, the number of queries and the
+time spent in the database. Serializers and renderers add their own
+time with `timed`. The timings are sent back in a `Server-Timing` header
+and recorded in histograms per route name, served in the Prometheus text
+format by `metrics_view` to the clients allowed by the `METRICS_*`
+settings.
+
+Histograms live in process memory, so each worker process exposes its
+own; scrape every worker or aggregate them upstream.
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import sync_and_async_middleware
+
+TIME_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+_current = ContextVar('request_timings', default=None)
+
+
+def _escape(value):
+    """Return value escaped for a Prometheus label."""
+
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n'
+    )
+
+
+class Histogram:
+    """Thread safe histogram with fixed buckets, keyed by label values."""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """Record value for the series of label_values."""
+
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self):
+        """Drop every recorded series."""
+
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        """Yield the lines of the histogram in the text format."""
+
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+
+        with self._lock:
+            series = [
+                (labels, list(counts), total)
+                for labels, (counts, total) in self._series.items()
+            ]
+
+        for label_values, counts, total in sorted(series):
+            labels = ','.join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.labels, label_values)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                bucket = f'{labels},le="{bound}"'
+                yield f'{self.name}_bucket{{{bucket}}} {cumulative}'
+            yield f'{self.name}_sum{{{labels}}} {total}'
+            yield f'{self.name}_count{{{labels}}} {cumulative}'
+
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Request wall time.',
+    ('route', 'method'), TIME_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    'http_request_db_duration_seconds', 'Time spent in database queries.',
+    ('route', 'method'), TIME_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries per request.',
+    ('route', 'method'), QUERY_BUCKETS,
+)
+SERIALIZE_SECONDS = Histogram(
+    'http_request_serialize_duration_seconds', 'Time spent serializing.',
+    ('route', 'method'), TIME_BUCKETS,
+)
+RENDER_SECONDS = Histogram(
+    'http_request_render_duration_seconds', 'Time spent rendering.',
+    ('route', 'method'), TIME_BUCKETS,
+)
+RESPONSE_BYTES = Histogram(
+    'http_response_size_bytes', 'Response body size.',
+    ('route', 'method'), SIZE_BUCKETS,
+)
+HISTOGRAMS = [
+    REQUEST_SECONDS,
+    DB_SECONDS,
+    DB_QUERIES,
+    SERIALIZE_SECONDS,
+    RENDER_SECONDS,
+    RESPONSE_BYTES,
+]
+
+
+class RequestTimings:
+    """Timings collected while handling one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.durations = defaultdict(float)
+        self.active = set()
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's timings.
+
+    Nested blocks of the same name are counted once.
+    """
+
+    timings = _current.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+
+    timings.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[name] += time.perf_counter() - start
+        timings.active.discard(name)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper counting and timing queries of the request."""
+
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.durations['db'] += time.perf_counter() - start
+        timings.queries += 1
+
+
+@receiver(connection_created)
+def install_query_recorder(connection, **kwargs):
+    """Add `record_query` to the execute wrappers of connection."""
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(request_started)
+def install_query_recorders(**kwargs):
+    """Add `record_query` to connections opened before it was loaded.
+
+    Runs in the thread that will run the request's queries, also under
+    ASGI where the signal is sent from the thread sensitive executor.
+    """
+
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+def route_name(request):
+    """Return the name of the route that handled request."""
+
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+
+    return match.view_name or match._func_path
+
+
+def server_timing(timings, total):
+    """Return the `Server-Timing` header value for timings."""
+
+    metrics = [f'total;dur={total * 1e3:.2f}']
+    metrics.append(
+        f'db;dur={timings.durations["db"] * 1e3:.2f};'
+        f'desc="{timings.queries} queries"'
+    )
+    for name in ('serialize', 'render'):
+        if name in timings.durations:
+            metrics.append(f'{name};dur={timings.durations[name] * 1e3:.2f}')
+
+    return ', '.join(metrics)
+
+
+def finish(request, response, timings):
+    """Record the timings of request and add them to response."""
+
+    total = time.perf_counter() - timings.start
+    labels = (route_name(request), request.method)
+
+    REQUEST_SECONDS.observe(total, *labels)
+    DB_SECONDS.observe(timings.durations['db'], *labels)
+    DB_QUERIES.observe(timings.queries, *labels)
+    if 'serialize' in timings.durations:
+        SERIALIZE_SECONDS.observe(timings.durations['serialize'], *labels)
+    if 'render' in timings.durations:
+        RENDER_SECONDS.observe(timings.durations['render'], *labels)
+    if not response.streaming:
+        RESPONSE_BYTES.observe(len(response.content), *labels)
+
+    response['Server-Timing'] = server_timing(timings, total)
+
+    return response
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Time requests and record their metrics."""
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            timings = RequestTimings()
+            token = _current.set(timings)
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            return finish(request, response, timings)
+    else:
+        def middleware(request):
+            timings = RequestTimings()
+            token = _current.set(timings)
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            return finish(request, response, timings)
+
+    return middleware
+
+
+def metrics_allowed(request):
+    """Return whether request may read the metrics.
+
+    Clients are let in by address with `METRICS_ALLOWED_IPS` or by the
+    bearer token `METRICS_TOKEN`.
+    """
+
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+
+    return bool(token) and constant_time_compare(
+        authorization, f'Bearer {token}'
+    )
+
+
+def metrics_view(request):
+    """Serve the request histograms in the Prometheus text format."""
+
+    if not metrics_allowed(request):
+        raise PermissionDenied()
+
+    lines = [line for histogram in HISTOGRAMS for line in histogram.expose()]
+
+    return HttpResponse(
+        '\n'.join(lines) + '\n',
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,142 @@
+"""
+Query budgets and N+1 detection.
+
+`query_budget` fails a block running more queries than allowed or
+repeating one query shape too often, the signature of a per-row query.
+`NPlusOneMiddleware` applies the repeat check to every request while
+`DEBUG` is on and logs the offending queries.
+"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)', re.IGNORECASE)
+_NUMBER = re.compile(r'\b\d+\b')
+_SPACE = re.compile(r'\s+')
+_TRANSACTION = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block runs more queries than its budget."""
+
+
+def sql_shape(sql):
+    """Return sql with literals and `IN` lists collapsed."""
+
+    shape = _SPACE.sub(' ', sql).strip()
+    shape = _IN_LIST.sub('IN (...)', shape)
+
+    return _NUMBER.sub('?', shape)
+
+
+class QueryRecorder:
+    """Records the SQL run on every connection while it is active."""
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self)
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def repeated(self, threshold):
+        """Return the shapes run at least threshold times, with counts."""
+
+        shapes = Counter(
+            sql_shape(sql) for sql in self.queries
+            if not sql.lstrip().upper().startswith(_TRANSACTION)
+        )
+
+        return {
+            shape: count for shape, count in shapes.items()
+            if count >= threshold
+        }
+
+
+class query_budget(ContextDecorator):
+    """Fail when a block exceeds a query budget.
+
+    max_queries caps the number of queries; max_repeats, when set, caps
+    how often one query shape may run, so per-row queries are caught
+    even within the budget. Usable as a context manager or decorator.
+    """
+
+    def __init__(self, max_queries, max_repeats=None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+
+    def __enter__(self):
+        self.recorder = QueryRecorder().__enter__()
+        return self.recorder
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+
+        queries = self.recorder.queries
+        if len(queries) > self.max_queries:
+            raise QueryBudgetExceeded(
+                f'{len(queries)} queries run, budget is '
+                f'{self.max_queries}:\n' + '\n'.join(queries)
+            )
+
+        if self.max_repeats is not None:
+            repeated = self.recorder.repeated(self.max_repeats + 1)
+            if repeated:
+                raise QueryBudgetExceeded(
+                    f'Query shapes repeated more than {self.max_repeats} '
+                    'times:\n' + '\n'.join(
+                        f'{count}x {shape}'
+                        for shape, count in repeated.items()
+                    )
+                )
+
+        return False
+
+
+class NPlusOneMiddleware:
+    """Log requests repeating one query shape, while `DEBUG` is on.
+
+    Opt in by adding it to `MIDDLEWARE`, see `QUERY_NPLUSONE_DETECTION`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        repeated = recorder.repeated(settings.QUERY_NPLUSONE_THRESHOLD)
+        for shape, count in repeated.items():
+            logger.warning(
+                'Possible N+1 query on %s %s, run %d times: %s',
+                request.method, request.path, count, shape,
+            )
+        if repeated:
+            response['X-Query-Repeats'] = max(repeated.values())
+
+        return response
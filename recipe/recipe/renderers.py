@@ -0,0 +1,79 @@
+"""
+Fast JSON renderer and parser for the API.
+
+Uses orjson when it is installed and falls back to the standard
+library based classes of REST framework otherwise.
+"""
+
+import codecs
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Renders JSON with orjson.
+
+    UUIDs are handled natively by orjson. Datetimes, whose precision
+    orjson and REST framework versions disagree on, and anything else
+    orjson does not know, such as `Decimal` or lazy strings, are
+    converted by REST framework's encoder so the output matches
+    `JSONRenderer`.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON, returning a bytestring."""
+
+        with timed('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        """Render data for `render`."""
+
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(
+                data, default=self.encoder_class().default, option=option
+            )
+        except TypeError:
+            # e.g. integers beyond 64 bits, which orjson rejects.
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class ORJSONParser(JSONParser):
+    """Parses JSON with orjson."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON."""
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,146 @@
+"""
+Read replica database routing.
+
+Reads go to the primary unless a view opts in with `ReplicaReadMixin`,
+which sends the reads of safe requests to a replica from
+`DATABASE_REPLICAS`. Writes always go to the primary. After a user
+writes, their reads stay on the primary for
+`DATABASE_REPLICA_STICKY_SECONDS` so they read their own writes despite
+replication lag. Background jobs start the window too, through
+`recipes.cache.bump_user_version`.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from rest_framework.permissions import SAFE_METHODS
+
+_use_replicas = ContextVar('use_replicas', default=False)
+
+
+@contextmanager
+def use_replicas():
+    """Send the reads of the enclosed block to a replica."""
+
+    token = _use_replicas.set(True)
+    try:
+        yield
+    finally:
+        _use_replicas.reset(token)
+
+
+def _sticky_key(user_id):
+    """Return the cache key pinning a user's reads to the primary."""
+
+    return f'db:primary:{user_id}'
+
+
+def pin_primary(user_id):
+    """Keep a user's reads on the primary for the sticky window."""
+
+    cache.set(
+        _sticky_key(user_id), True, settings.DATABASE_REPLICA_STICKY_SECONDS
+    )
+
+
+async def apin_primary(user_id):
+    """Async counterpart of `pin_primary`."""
+
+    await cache.aset(
+        _sticky_key(user_id), True, settings.DATABASE_REPLICA_STICKY_SECONDS
+    )
+
+
+def is_pinned(user_id):
+    """Return whether a user's reads must go to the primary."""
+
+    return cache.get(_sticky_key(user_id), False)
+
+
+async def ais_pinned(user_id):
+    """Async counterpart of `is_pinned`."""
+
+    return await cache.aget(_sticky_key(user_id), False)
+
+
+def may_use_replicas(method, user_id):
+    """Return whether a request may read from a replica."""
+
+    return bool(
+        settings.DATABASE_REPLICAS
+        and method in SAFE_METHODS
+        and user_id is not None
+        and not is_pinned(user_id)
+    )
+
+
+class ReplicaRouter:
+    """Routes reads to replicas inside `use_replicas`, else to primary."""
+
+    def choose_replica(self):
+        """Return the alias of the replica to read from."""
+
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_read(self, model, **hints):
+        if _use_replicas.get() and settings.DATABASE_REPLICAS:
+            return self.choose_replica()
+
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema through replication.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+
+        return None
+
+
+class ReplicaReadMixin:
+    """Serve the reads of safe requests from a replica.
+
+    Authentication runs on the primary; the rest of the request reads
+    from a replica unless the user wrote within the sticky window.
+    Successful writes start that window.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        """Handle the request, resetting the replica choice afterwards."""
+
+        token = _use_replicas.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _use_replicas.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        """Switch reads to a replica once the user is known."""
+
+        super().initial(request, *args, **kwargs)
+        if may_use_replicas(request.method, request.user.pk):
+            _use_replicas.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Pin the user's reads to the primary after a write."""
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            user_id = request.user.pk
+            if user_id is not None:
+                pin_primary(user_id)
+
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,75 @@
+"""
+OpenAPI schema and docs views, importing drf-spectacular on first use.
+
+With `API_SCHEMA_FILE` set the schema is not generated on requests. It
+is built ahead, e.g. when the image is built, with
+
+    python manage.py spectacular --format openapi-json --file openapi.json
+
+then read once and served from memory with an ETag.
+"""
+
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+
+SCHEMA_CONTENT_TYPE = 'application/vnd.oai.openapi+json'
+
+
+@functools.lru_cache(maxsize=None)
+def read_schema(path):
+    """Return the content and ETag of the prebuilt schema at path."""
+
+    try:
+        with open(path, 'rb') as schema:
+            content = schema.read()
+    except FileNotFoundError as exc:
+        raise ImproperlyConfigured(
+            f'API_SCHEMA_FILE {path} does not exist, build it with the '
+            f'spectacular command.'
+        ) from exc
+
+    digest = hashlib.md5(content, usedforsecurity=False).hexdigest()
+
+    return content, quote_etag(digest)
+
+
+@functools.lru_cache(maxsize=None)
+def spectacular_view(name, **initkwargs):
+    """Return the drf-spectacular view class name as a view function."""
+
+    if 'drf_spectacular' not in settings.INSTALLED_APPS:
+        raise Http404()
+
+    from drf_spectacular import views
+
+    return getattr(views, name).as_view(**initkwargs)
+
+
+def schema_view(request, *args, **kwargs):
+    """Serve the prebuilt schema, or generate it without one."""
+
+    path = settings.API_SCHEMA_FILE
+    if not path:
+        view = spectacular_view('SpectacularAPIView')
+        return view(request, *args, **kwargs)
+
+    content, etag = read_schema(path)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=SCHEMA_CONTENT_TYPE)
+    response['ETag'] = etag
+
+    return response
+
+
+def docs_view(request, *args, **kwargs):
+    """Serve the Swagger UI of the schema."""
+
+    view = spectacular_view('SpectacularSwaggerView', url_name='api-schema')
+
+    return view(request, *args, **kwargs)
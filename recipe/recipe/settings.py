@@ -14,6 +14,8 @@ import os
 from pathlib import Path
 
 import environ
+from django.conf import global_settings
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -54,9 +56,11 @@ INSTALLED_APPS = [
     # created apps
     'user',
     'recipes',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'recipe.metrics.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +68,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'recipe.throttling.rate_limit_headers_middleware',
 ]
 
 ROOT_URLCONF = 'recipe.urls'
@@ -97,9 +102,33 @@ DATABASES = {
         'NAME': env('NAME'),
         'USER': env('USER'),
         'PASSWORD': env('PASSWORD'),
+        # Seconds to keep a connection open between requests, 0 closes
+        # it after every request. Under ASGI prefer the pool below.
+        'CONN_MAX_AGE': env.int('CONN_MAX_AGE', default=60),
+        # Check a reused connection still works before the first query
+        # of each request.
+        'CONN_HEALTH_CHECKS': env.bool('CONN_HEALTH_CHECKS', default=True),
     }
 }
 
+# Optional psycopg connection pool, PostgreSQL only. Needs Django 5.1+
+# and psycopg[pool]; the pool replaces persistent connections.
+if env.bool('DB_POOL', default=False):
+    # any name of the PostgreSQL backend, e.g. postgresql_psycopg2.
+    if not DATABASES['default']['ENGINE'].startswith(
+        'django.db.backends.postgresql'
+    ):
+        raise ImproperlyConfigured('DB_POOL needs a PostgreSQL database.')
+    DATABASES['default']['ENGINE'] = 'django.db.backends.postgresql'
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+            'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+            'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),
+        },
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -129,6 +158,11 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded and generated files, such as imports and exports
+
+MEDIA_URL = 'media/'
+MEDIA_ROOT = env('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -140,8 +174,257 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'user.User'
 
+# Password hashing settings
+
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': 'user.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'user.hashers.ScryptPasswordHasher',
+    'argon2': 'user.hashers.Argon2PasswordHasher',
+}
+# New and rehashed passwords use the profile's hasher, the others are
+# kept so existing hashes still verify and get upgraded on login.
+PASSWORD_HASHER = env('PASSWORD_HASHER', default='pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_PROFILES[PASSWORD_HASHER]] + [
+    hasher for profile, hasher in PASSWORD_HASHER_PROFILES.items()
+    if profile != PASSWORD_HASHER
+] + [
+    # Django's other hashers, e.g. PBKDF2SHA1 and BCryptSHA256, verify
+    # the hashes they made. Those the profiles extend are left out, as
+    # a later hasher of the same algorithm would replace the pooled one.
+    hasher for hasher in global_settings.PASSWORD_HASHERS
+    if hasher.rsplit('.', 1)[1] not in {
+        profile.rsplit('.', 1)[1]
+        for profile in PASSWORD_HASHER_PROFILES.values()
+    }
+]
+# 0 keeps the Django default cost of each parameter.
+PASSWORD_PBKDF2_ITERATIONS = env.int('PASSWORD_PBKDF2_ITERATIONS', default=0)
+PASSWORD_SCRYPT_WORK_FACTOR = env.int('PASSWORD_SCRYPT_WORK_FACTOR', default=0)
+PASSWORD_SCRYPT_BLOCK_SIZE = env.int('PASSWORD_SCRYPT_BLOCK_SIZE', default=0)
+PASSWORD_SCRYPT_PARALLELISM = env.int('PASSWORD_SCRYPT_PARALLELISM', default=0)
+PASSWORD_ARGON2_TIME_COST = env.int('PASSWORD_ARGON2_TIME_COST', default=0)
+PASSWORD_ARGON2_MEMORY_COST = env.int('PASSWORD_ARGON2_MEMORY_COST', default=0)
+PASSWORD_ARGON2_PARALLELISM = env.int('PASSWORD_ARGON2_PARALLELISM', default=0)
+# Hashes computed at once, 0 hashes in the calling thread.
+PASSWORD_HASHING_WORKERS = env.int(
+    'PASSWORD_HASHING_WORKERS', default=os.cpu_count() or 1
+)
+PASSWORD_HASHING_BACKLOG = env.int('PASSWORD_HASHING_BACKLOG', default=64)
+PASSWORD_HASHING_TIMEOUT = env.float('PASSWORD_HASHING_TIMEOUT', default=5.0)
+
+# User deletion settings
+
+# Rows deleted per transaction when purging a deleted user's data.
+USER_PURGE_BATCH_SIZE = env.int('USER_PURGE_BATCH_SIZE', default=1000)
+
+# Read replica settings
+
+# Database urls of read replicas, e.g. sqlite:////tmp/replica.sqlite3.
+DATABASES.update({
+    f'replica{index}': {
+        **env.db_url_config(url),
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': DATABASES['default']['CONN_HEALTH_CHECKS'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    for index, url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[]))
+})
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['recipe.routers.ReplicaRouter']
+# Seconds a user's reads stay on the primary after they write.
+DATABASE_REPLICA_STICKY_SECONDS = env.int(
+    'DATABASE_REPLICA_STICKY_SECONDS', default=5
+)
+
+# Cache settings
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Token authentication cache settings
+
+TOKEN_AUTH_CACHE_ALIAS = 'default'
+TOKEN_AUTH_CACHE_TTL = env.int('TOKEN_AUTH_CACHE_TTL', default=300)
+TOKEN_AUTH_LOCAL_CACHE_SIZE = env.int(
+    'TOKEN_AUTH_LOCAL_CACHE_SIZE', default=1024
+)
+TOKEN_AUTH_LOCAL_CACHE_TTL = env.int('TOKEN_AUTH_LOCAL_CACHE_TTL', default=5)
+
+# Token issuance settings
+
+# 'db' issues database tokens, 'signed' issues stateless signed tokens.
+# Both kinds are accepted whatever the mode.
+TOKEN_AUTH_MODE = env('TOKEN_AUTH_MODE', default='db')
+TOKEN_AUTH_SIGNED_TTL = env.int('TOKEN_AUTH_SIGNED_TTL', default=3600)
+# Lifetime of database tokens in seconds, 0 never expires them.
+TOKEN_AUTH_DB_TTL = env.int('TOKEN_AUTH_DB_TTL', default=0)
+TOKEN_AUTH_SIGNING_KEY = env('TOKEN_AUTH_SIGNING_KEY', default=SECRET_KEY)
+# Previous signing keys, still accepted while tokens signed with them
+# expire.
+TOKEN_AUTH_SIGNING_FALLBACK_KEYS = env.list(
+    'TOKEN_AUTH_SIGNING_FALLBACK_KEYS', default=[]
+)
+
+# Recipes bulk endpoint settings
+
+RECIPES_BULK_MAX_ITEMS = env.int('RECIPES_BULK_MAX_ITEMS', default=1000)
+RECIPES_BULK_BATCH_SIZE = env.int('RECIPES_BULK_BATCH_SIZE', default=500)
+
+# Recipes export settings
+
+RECIPES_EXPORT_CHUNK_SIZE = env.int('RECIPES_EXPORT_CHUNK_SIZE', default=2000)
+
+# Recipes import settings
+
+RECIPES_IMPORT_BATCH_SIZE = env.int('RECIPES_IMPORT_BATCH_SIZE', default=1000)
+RECIPES_IMPORT_MAX_ERRORS = env.int('RECIPES_IMPORT_MAX_ERRORS', default=1000)
+
+# Recipe image settings
+
+RECIPES_IMAGE_STORAGE = env(
+    'RECIPES_IMAGE_STORAGE',
+    default='django.core.files.storage.FileSystemStorage',
+)
+RECIPES_IMAGE_STORAGE_OPTIONS = {}
+RECIPES_IMAGE_MAX_SIZE = env.int(
+    'RECIPES_IMAGE_MAX_SIZE', default=5 * 1024 * 1024
+)
+# Longest side of thumbnails in pixels.
+RECIPES_THUMBNAIL_SIZE = env.int('RECIPES_THUMBNAIL_SIZE', default=320)
+RECIPES_THUMBNAIL_QUALITY = env.int('RECIPES_THUMBNAIL_QUALITY', default=85)
+# Processes rendering thumbnails, 0 renders in the worker thread.
+RECIPES_THUMBNAIL_WORKERS = env.int('RECIPES_THUMBNAIL_WORKERS', default=2)
+# '' streams images from Python, 'x-sendfile' (Apache, lighttpd) or
+# 'x-accel-redirect' (nginx) hands local files to the web server.
+RECIPES_IMAGE_SENDFILE = env('RECIPES_IMAGE_SENDFILE', default='')
+# Internal nginx location serving the storage root.
+RECIPES_IMAGE_ACCEL_PREFIX = env(
+    'RECIPES_IMAGE_ACCEL_PREFIX', default='/protected/'
+)
+
+# Recipe stats settings
+
+# Users whose stats are recomputed per transaction by
+# reconcile_recipe_stats, meant to run periodically, e.g. from cron.
+RECIPES_STATS_BATCH_SIZE = env.int('RECIPES_STATS_BATCH_SIZE', default=500)
+
+# Serve recipe list, detail and create with ASGI native views
+
+RECIPES_ASYNC_VIEWS = env.bool('RECIPES_ASYNC_VIEWS', default=False)
+
+# Recipes response cache settings
+
+RECIPES_CACHE_ALIAS = 'default'
+RECIPES_CACHE_TTL = env.int('RECIPES_CACHE_TTL', default=300)
+
 # REST Framework settings
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipe.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'recipe.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'recipes': env('THROTTLE_RATE_RECIPES', default='600/min'),
+        'user': env('THROTTLE_RATE_USER', default='120/min'),
+        'login': env('THROTTLE_RATE_LOGIN', default='20/min'),
+        'login_email': env('THROTTLE_RATE_LOGIN_EMAIL', default='5/min'),
+    },
 }
+
+# API only profile settings
+
+# Serve the API alone, e.g. in API worker containers: drops the admin,
+# sessions, messages, static files, the browsable API and the schema
+# generator with their middleware. Every endpoint authenticates with
+# tokens, so no CSRF check is needed. drf-spectacular stays a runtime
+# dependency: the views import its schema decorators and types from
+# `drf_spectacular.utils` and `drf_spectacular.types`, a few
+# milliseconds that leave the generator in `drf_spectacular.openapi`
+# unimported.
+API_ONLY = env.bool('API_ONLY', default=False)
+# Prebuilt OpenAPI schema served instead of generating it on requests,
+# needed by the API only profile, see recipe/schema.py.
+API_SCHEMA_FILE = env('API_SCHEMA_FILE', default='')
+if API_ONLY:
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS if app not in [
+            'django.contrib.admin',
+            'django.contrib.sessions',
+            'django.contrib.messages',
+            'django.contrib.staticfiles',
+            'drf_spectacular',
+        ]
+    ]
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE if middleware not in [
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.middleware.csrf.CsrfViewMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+            'django.middleware.clickjacking.XFrameOptionsMiddleware',
+        ]
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'] = []
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'recipe.renderers.ORJSONRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = [
+        'user.authentication.CachedTokenAuthentication',
+    ]
+    # routers touch view schemas when building urls, the base inspector
+    # keeps that from importing the schema generator.
+    REST_FRAMEWORK['DEFAULT_SCHEMA_CLASS'] = (
+        'rest_framework.schemas.inspectors.ViewInspector'
+    )
+
+# Query budget settings
+
+# Opt in to logging requests that repeat one query shape, DEBUG only.
+if env.bool('QUERY_NPLUSONE_DETECTION', default=False):
+    MIDDLEWARE.append('recipe.queries.NPlusOneMiddleware')
+QUERY_NPLUSONE_THRESHOLD = env.int('QUERY_NPLUSONE_THRESHOLD', default=5)
+
+# Metrics settings
+
+# Clients allowed to scrape /metrics, by address or with the bearer token.
+# With neither set the endpoint is closed.
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', default=[])
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
+# Throttling settings
+
+THROTTLE_ENABLED = env.bool('THROTTLE_ENABLED', default=True)
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Background jobs settings
+
+# Attempts of a failing job before it is marked failed.
+JOBS_MAX_ATTEMPTS = env.int('JOBS_MAX_ATTEMPTS', default=3)
+# Seconds before the first retry, doubled after each attempt.
+JOBS_RETRY_BACKOFF = env.int('JOBS_RETRY_BACKOFF', default=10)
+JOBS_RETRY_BACKOFF_MAX = env.int('JOBS_RETRY_BACKOFF_MAX', default=600)
+# Seconds between heartbeats of a running job, 0 sends none. Workers
+# also look for stale jobs at most once per interval.
+JOBS_HEARTBEAT_INTERVAL = env.int('JOBS_HEARTBEAT_INTERVAL', default=60)
+# Seconds without a heartbeat after which a running job is assumed lost
+# with its worker.
+JOBS_LOCK_TIMEOUT = env.int('JOBS_LOCK_TIMEOUT', default=300)
+# Days finished jobs and their files are kept, see the prune_jobs command.
+JOBS_RETENTION_DAYS = env.int('JOBS_RETENTION_DAYS', default=7)
+# Defaults of the run_jobs command.
+JOBS_WORKER_PROCESSES = env.int('JOBS_WORKER_PROCESSES', default=1)
+JOBS_WORKER_THREADS = env.int('JOBS_WORKER_THREADS', default=4)
+JOBS_POLL_INTERVAL = env.float('JOBS_POLL_INTERVAL', default=1.0)
+
+# Recipes pagination settings
+
+RECIPES_PAGE_SIZE = env.int('RECIPES_PAGE_SIZE', default=50)
+RECIPES_MAX_PAGE_SIZE = env.int('RECIPES_MAX_PAGE_SIZE', default=200)
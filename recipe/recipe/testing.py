@@ -0,0 +1,47 @@
+"""
+Test helpers shared by the apps.
+"""
+
+from contextlib import contextmanager
+
+from rest_framework.test import APIClient
+
+from .queries import QueryRecorder, query_budget
+
+
+def count_queries(func, *args, **kwargs):
+    """Call func and return how many queries it ran."""
+
+    with QueryRecorder() as recorder:
+        func(*args, **kwargs)
+
+    return len(recorder.queries)
+
+
+class BudgetAPIClient(APIClient):
+    """API client failing any request over a query budget.
+
+    Every request may run at most `max_queries` queries and repeat one
+    query shape at most `max_repeats` times. Use `budget` to change the
+    limits for a block of requests.
+    """
+
+    max_queries = 10
+    max_repeats = 2
+
+    @contextmanager
+    def budget(self, max_queries, max_repeats=None):
+        """Apply other limits to the requests of the block."""
+
+        previous = self.max_queries, self.max_repeats
+        self.max_queries = max_queries
+        if max_repeats is not None:
+            self.max_repeats = max_repeats
+        try:
+            yield self
+        finally:
+            self.max_queries, self.max_repeats = previous
+
+    def request(self, **kwargs):
+        with query_budget(self.max_queries, self.max_repeats):
+            return super().request(**kwargs)
@@ -0,0 +1,44 @@
+"""
+Tests for executors built lazily from settings.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from ..executors import LazyExecutor
+
+
+@override_settings(TEST_EXECUTOR_WORKERS=1)
+class LazyExecutorTests(SimpleTestCase):
+    """Tests building and resetting a lazy executor."""
+
+    def setUp(self):
+        self.executor = LazyExecutor(
+            ['TEST_EXECUTOR_WORKERS'],
+            lambda: ThreadPoolExecutor(settings.TEST_EXECUTOR_WORKERS),
+        )
+        self.addCleanup(self.executor.reset)
+
+    def test_built_once(self):
+        """Test the executor is built on first use and then reused."""
+
+        first = self.executor.get()
+
+        self.assertIs(self.executor.get(), first)
+        self.assertEqual(first.submit(lambda: 'done').result(), 'done')
+
+    def test_rebuilt_after_setting_change(self):
+        """Test a change to its settings builds a new executor."""
+
+        first = self.executor.get()
+        with self.settings(TEST_EXECUTOR_WORKERS=2):
+            second = self.executor.get()
+        third = self.executor.get()
+        with self.settings(OTHER_SETTING=1):
+            self.assertIs(self.executor.get(), third)
+
+        self.assertIsNot(second, first)
+        self.assertEqual(second._max_workers, 2)
+        self.assertEqual(third._max_workers, 1)
@@ -0,0 +1,108 @@
+"""
+Tests for request instrumentation and the metrics endpoint.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import Recipes
+
+from ..metrics import HISTOGRAMS, Histogram
+
+
+RECIPES_URL = reverse('recipes:recipes-list')
+METRICS_URL = reverse('metrics')
+
+
+class HistogramTests(SimpleTestCase):
+    """Tests the histogram exposition."""
+
+    def test_expose_cumulative_buckets(self):
+        """Test buckets are cumulative and labels escaped."""
+
+        histogram = Histogram('test_seconds', 'Test.', ('route',), (1, 2))
+        histogram.observe(0.5, 'a"b')
+        histogram.observe(1.5, 'a"b')
+        histogram.observe(3, 'a"b')
+
+        lines = list(histogram.expose())
+
+        self.assertIn('# TYPE test_seconds histogram', lines)
+        self.assertIn('test_seconds_bucket{route="a\\"b",le="1"} 1', lines)
+        self.assertIn('test_seconds_bucket{route="a\\"b",le="2"} 2', lines)
+        self.assertIn('test_seconds_bucket{route="a\\"b",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_sum{route="a\\"b"} 5.0', lines)
+        self.assertIn('test_seconds_count{route="a\\"b"} 3', lines)
+
+
+class RequestMetricsTests(TestCase):
+    """Tests timings are reported per request and per route."""
+
+    def setUp(self):
+        cache.clear()
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipes.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=Decimal('2')
+        )
+
+    def test_server_timing_header(self):
+        """Test responses break down their time in `Server-Timing`."""
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timing = res['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+
+    def test_metrics_per_route(self):
+        """Test the metrics endpoint exposes histograms per route name."""
+
+        self.client.get(RECIPES_URL)
+
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        body = res.content.decode()
+        labels = 'route="recipes:recipes-list",method="GET"'
+        for name in [
+            'http_request_duration_seconds',
+            'http_request_db_queries',
+            'http_request_serialize_duration_seconds',
+            'http_request_render_duration_seconds',
+            'http_response_size_bytes',
+        ]:
+            self.assertIn(f'{name}_count{{{labels}}} 1', body)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'], METRICS_TOKEN='s3')
+    def test_metrics_restricted(self):
+        """Test only allowed addresses or the token can read metrics."""
+
+        self.client.force_authenticate(None)
+
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer no')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer s3')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
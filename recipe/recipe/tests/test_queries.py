@@ -0,0 +1,85 @@
+"""
+Tests for query budgets and N+1 detection.
+"""
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from recipes.models import Recipes
+
+from ..queries import (
+    NPlusOneMiddleware,
+    QueryBudgetExceeded,
+    query_budget,
+    sql_shape,
+)
+
+
+def query_per_row(rows=3):
+    """Run one identical query per row, like an N+1 bug."""
+
+    for pk in range(rows):
+        Recipes.objects.filter(pk=pk).exists()
+
+
+class QueryBudgetTests(TestCase):
+    """Tests the query budget context manager and decorator."""
+
+    def test_sql_shape_collapses_literals(self):
+        """Test IN lists and numbers do not change the shape."""
+
+        self.assertEqual(
+            sql_shape('SELECT 1 FROM t WHERE id IN (%s, %s) LIMIT 21'),
+            sql_shape('SELECT  1 FROM t WHERE id IN (%s) LIMIT 1'),
+        )
+
+    def test_within_budget(self):
+        """Test a block within its budget passes."""
+
+        with query_budget(3) as recorder:
+            query_per_row()
+
+        self.assertEqual(len(recorder.queries), 3)
+
+    def test_over_budget_raises(self):
+        """Test a block over its budget fails."""
+
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(2):
+                query_per_row()
+
+    def test_repeated_shape_raises(self):
+        """Test repeating one query shape fails within the budget."""
+
+        decorated = query_budget(10, max_repeats=2)(query_per_row)
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, '3x SELECT'):
+            decorated()
+
+
+class NPlusOneMiddlewareTests(TestCase):
+    """Tests the N+1 detection middleware."""
+
+    def get_response(self, request):
+        query_per_row(5)
+        return HttpResponse()
+
+    def test_unused_without_debug(self):
+        """Test the middleware disables itself outside debug mode."""
+
+        with self.assertRaises(MiddlewareNotUsed):
+            NPlusOneMiddleware(self.get_response)
+
+    @override_settings(DEBUG=True, QUERY_NPLUSONE_THRESHOLD=5)
+    def test_logs_repeated_queries(self):
+        """Test requests repeating a query shape are logged."""
+
+        middleware = NPlusOneMiddleware(self.get_response)
+        request = RequestFactory().get('/api/recipes/recipes/')
+
+        with self.assertLogs('recipe.queries', 'WARNING') as logs:
+            response = middleware(request)
+
+        self.assertIn('run 5 times', logs.output[0])
+        self.assertEqual(response['X-Query-Repeats'], '5')
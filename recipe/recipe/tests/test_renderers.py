@@ -0,0 +1,94 @@
+"""
+Tests for the JSON renderer and parser.
+"""
+
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from .. import renderers
+from ..renderers import ORJSONParser, ORJSONRenderer
+
+
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class ORJSONRendererTests(SimpleTestCase):
+    """Tests rendering JSON with orjson."""
+
+    def test_renders_like_json_renderer(self):
+        """Test output decodes to the same data as JSONRenderer."""
+
+        data = {
+            'price': Decimal('5.25'),
+            'created': datetime(2022, 12, 17, 8, 42, tzinfo=timezone.utc),
+            'updated': datetime(
+                2022, 12, 17, 8, 42, 1, 123456, tzinfo=timezone.utc
+            ),
+            'uuid': uuid.UUID(int=1),
+            'errors': {1: ['invalid']},
+            'title': 'Crème brûlée',
+        }
+
+        rendered = ORJSONRenderer().render(data)
+        expected = JSONRenderer().render(data)
+
+        self.assertEqual(json.loads(rendered), json.loads(expected))
+        # datetimes go through the same encoder, whatever its precision.
+        self.assertIn(JSONRenderer().render(data['updated']), rendered)
+
+    def test_indent_requested(self):
+        """Test the indent media type parameter pretty prints."""
+
+        rendered = ORJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=4'
+        )
+
+        self.assertIn(b'\n', rendered)
+
+    def test_none_renders_empty(self):
+        """Test None renders an empty body."""
+
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_parse(self):
+        """Test parsing a JSON body."""
+
+        data = ORJSONParser().parse(io.BytesIO(b'{"title": "Soup"}'))
+
+        self.assertEqual(data, {'title': 'Soup'})
+
+    def test_parse_error(self):
+        """Test invalid JSON raises a parse error."""
+
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"title": '))
+
+
+class StdlibFallbackTests(SimpleTestCase):
+    """Tests the classes without orjson installed."""
+
+    def test_render_fallback(self):
+        """Test rendering falls back to the standard library."""
+
+        data = {'price': Decimal('5.25')}
+
+        with patch.object(renderers, 'orjson', None):
+            rendered = ORJSONRenderer().render(data)
+
+        self.assertEqual(rendered, JSONRenderer().render(data))
+
+    def test_parse_fallback(self):
+        """Test parsing falls back to the standard library."""
+
+        with patch.object(renderers, 'orjson', None):
+            data = ORJSONParser().parse(io.BytesIO(b'[1, 2]'))
+
+        self.assertEqual(data, [1, 2])
@@ -0,0 +1,122 @@
+"""
+Tests for read replica routing.
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import Recipes
+
+from ..routers import ReplicaRouter, use_replicas
+
+
+RECIPES_URL = reverse('recipes:recipes-list')
+ME_URL = reverse('user:me')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Tests the router decisions."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_default_to_primary(self):
+        """Test reads go to the primary outside `use_replicas`."""
+
+        self.assertEqual(self.router.db_for_read(Recipes), 'default')
+
+    def test_reads_use_replica_when_enabled(self):
+        """Test reads go to a replica inside `use_replicas`."""
+
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Recipes), 'replica')
+            self.assertEqual(self.router.db_for_write(Recipes), 'default')
+
+        self.assertEqual(self.router.db_for_read(Recipes), 'default')
+
+    def test_replicas_not_migrated(self):
+        """Test migrations are not run on replicas."""
+
+        self.assertFalse(self.router.allow_migrate('replica', 'recipes'))
+        self.assertIsNone(self.router.allow_migrate('default', 'recipes'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaReadViewTests(TestCase):
+    """Tests views route safe reads to replicas."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # The test database stands in for the replica.
+        patcher = patch.object(
+            ReplicaRouter, 'choose_replica', return_value='default'
+        )
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_list_reads_from_replica(self):
+        """Test listing recipes reads from a replica."""
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.choose_replica.assert_called()
+
+    def test_reads_stick_to_primary_after_write(self):
+        """Test a user's reads stay on the primary after they write."""
+
+        payload = {'title': 'Soup', 'time_minutes': 5, 'price': '2.50'}
+        res = self.client.post(RECIPES_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.choose_replica.reset_mock()
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.choose_replica.assert_not_called()
+
+    def test_profile_update_pins_primary(self):
+        """Test updating the profile keeps later reads on the primary."""
+
+        self.client.patch(ME_URL, {'name': 'New name'})
+        self.client.get(RECIPES_URL)
+
+        self.choose_replica.assert_not_called()
+
+    def test_background_write_pins_primary(self):
+        """Test writes made outside requests, e.g. by jobs, pin reads."""
+
+        Recipes.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='2.50'
+        )
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.choose_replica.assert_not_called()
+
+    @override_settings(DATABASE_REPLICA_STICKY_SECONDS=-1)
+    def test_replica_used_after_sticky_window(self):
+        """Test reads return to replicas once the window has passed."""
+
+        payload = {'title': 'Soup', 'time_minutes': 5, 'price': '2.50'}
+        self.client.post(RECIPES_URL, payload)
+        self.choose_replica.reset_mock()
+
+        self.client.get(RECIPES_URL)
+
+        self.choose_replica.assert_called()
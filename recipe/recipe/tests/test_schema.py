@@ -0,0 +1,113 @@
+"""
+Tests the schema views and the API only settings profile.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+
+from ..schema import read_schema
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaViewTests(TestCase):
+    """Test serving the OpenAPI schema."""
+
+    def setUp(self):
+        read_schema.cache_clear()
+        self.addCleanup(read_schema.cache_clear)
+
+    def test_schema_generated_without_file(self):
+        """Test the schema is generated when none was built."""
+
+        with self.settings(API_SCHEMA_FILE=''):
+            res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            '/api/recipes/recipes/', json.loads(res.content)['paths']
+        )
+
+    def test_schema_documents_every_view(self):
+        """Test views spectacular cannot introspect are documented."""
+
+        with self.settings(API_SCHEMA_FILE=''):
+            res = self.client.get(SCHEMA_URL, {'format': 'json'})
+        paths = json.loads(res.content)['paths']
+
+        file_response = paths['/api/jobs/{id}/file/']['get']['responses']
+        self.assertEqual(
+            file_response['200']['content']['*/*']['schema']['format'],
+            'binary',
+        )
+        refresh = paths['/api/user/token/refresh/']['post']['responses']
+        self.assertEqual(
+            refresh['200']['content']['application/json']['schema'],
+            {'$ref': '#/components/schemas/Token'},
+        )
+        revoke = paths['/api/user/token/revoke/']['post']['responses']
+        self.assertEqual(list(revoke), ['204'])
+        image = json.loads(res.content)['components']['schemas'][
+            'RecipeDetail'
+        ]['properties']['image']
+        self.assertEqual(image['type'], 'object')
+        self.assertEqual(set(image['properties']), {'url', 'thumbnail'})
+
+    def test_prebuilt_schema_served(self):
+        """Test a prebuilt schema is served as is with an ETag."""
+
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            f.write(b'{"openapi": "3.0.3"}')
+        self.addCleanup(os.remove, f.name)
+
+        with self.settings(API_SCHEMA_FILE=f.name):
+            res = self.client.get(SCHEMA_URL)
+            cached = self.client.get(
+                SCHEMA_URL, HTTP_IF_NONE_MATCH=res['ETag']
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, b'{"openapi": "3.0.3"}')
+        self.assertEqual(
+            res['Content-Type'], 'application/vnd.oai.openapi+json'
+        )
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ApiOnlyProfileTests(SimpleTestCase):
+    """Test the API only settings profile."""
+
+    def test_profile_drops_unused_apps(self):
+        """Test the profile leaves out the admin, sessions and messages."""
+
+        code = (
+            'import django, json; django.setup(); '
+            'from django.conf import settings; '
+            'print(json.dumps([settings.INSTALLED_APPS, settings.MIDDLEWARE]))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            env={
+                **os.environ,
+                'API_ONLY': 'true',
+                'DJANGO_SETTINGS_MODULE': 'recipe.settings',
+            },
+        )
+        apps, middleware = json.loads(result.stdout)
+
+        self.assertNotIn('django.contrib.admin', apps)
+        self.assertNotIn('django.contrib.sessions', apps)
+        self.assertIn('recipes', apps)
+        self.assertNotIn(
+            'django.middleware.csrf.CsrfViewMiddleware', middleware
+        )
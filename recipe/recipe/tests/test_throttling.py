@@ -0,0 +1,151 @@
+"""
+Tests for sliding window rate limits.
+"""
+
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from ..throttling import RecipesRateThrottle
+
+
+RECIPES_URL = reverse('recipes:recipes-list')
+TOKEN_URL = reverse('user:token')
+
+
+def throttle_rates(**rates):
+    """Return REST framework settings with the given throttle rates."""
+
+    return {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates
+        },
+    }
+
+
+@override_settings(REST_FRAMEWORK=throttle_rates(recipes='10/min'))
+class SlidingWindowTests(SimpleTestCase):
+    """Tests the sliding window estimate."""
+
+    def setUp(self):
+        cache.clear()
+        self.request = APIRequestFactory().get(RECIPES_URL)
+        self.request.user = None
+
+    def hit(self, now):
+        """Make a request at time now and return the throttle."""
+
+        throttle = RecipesRateThrottle()
+        with patch.object(throttle, 'timer', return_value=now):
+            throttle.allowed = throttle.allow_request(self.request, None)
+
+        return throttle
+
+    def test_limit_within_window(self):
+        """Test requests over the limit in one window are rejected."""
+
+        for _ in range(10):
+            self.assertTrue(self.hit(60).allowed)
+
+        throttle = self.hit(70)
+
+        self.assertFalse(throttle.allowed)
+        self.assertEqual(throttle.wait(), 56)
+
+    def test_previous_window_weighted(self):
+        """Test the previous window counts by how much still overlaps."""
+
+        for _ in range(10):
+            self.hit(60)
+
+        # Half of the previous window overlaps: 10 * 0.5 + 6 > 10.
+        for _ in range(5):
+            self.assertTrue(self.hit(150).allowed)
+        throttle = self.hit(150)
+
+        self.assertFalse(throttle.allowed)
+        self.assertEqual(throttle.wait(), 6)
+        self.assertTrue(self.hit(180).allowed)
+
+
+@override_settings(REST_FRAMEWORK=throttle_rates(
+    recipes='2/min', login='3/min', login_email='2/min'
+))
+class ThrottledEndpointTests(TestCase):
+    """Tests throttles on the API endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.payload = {'email': 'user@example.com', 'password': 'pass1234'}
+        self.user = get_user_model().objects.create_user(**self.payload)
+        self.client = APIClient()
+
+    def test_recipes_throttled_per_user(self):
+        """Test recipe requests over the user's limit get a 429."""
+
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res['X-RateLimit-Limit'], '2')
+        self.assertEqual(res['X-RateLimit-Remaining'], '1')
+        self.client.get(RECIPES_URL)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        self.assertEqual(res['X-RateLimit-Remaining'], '0')
+
+        other = get_user_model().objects.create_user('other@example.com')
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_login_attempts_limited_per_account(self):
+        """Test attempts on one account are limited across addresses."""
+
+        payload = {**self.payload, 'password': 'wrong'}
+        for address in ['10.0.0.1', '10.0.0.2']:
+            res = self.client.post(TOKEN_URL, payload, REMOTE_ADDR=address)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, self.payload, REMOTE_ADDR='10.0.0.3')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    def test_successful_logins_not_limited_per_account(self):
+        """Test only failed attempts count towards the account's limit."""
+
+        for address in ['10.0.0.1', '10.0.0.2', '10.0.0.3']:
+            res = self.client.post(
+                TOKEN_URL, self.payload, REMOTE_ADDR=address
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_login_body_not_an_object(self):
+        """Test a login body that is not an object is rejected."""
+
+        res = self.client.post(TOKEN_URL, [1], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_attempts_limited_per_address(self):
+        """Test attempts from one address are limited across accounts."""
+
+        for index in range(3):
+            self.client.post(
+                TOKEN_URL,
+                {'email': f'{index}@example.com', 'password': 'wrong'},
+            )
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,260 @@
+"""
+Sliding window rate limits for the API.
+
+Each client has a counter per fixed window in the shared cache. The
+request rate is estimated from the current window's count plus the
+previous window's count weighted by how much of it still overlaps the
+sliding window, so a check costs three cache operations whatever the
+rate. Every request counts, including rejected ones, so a client that
+keeps hammering stays limited. The per account login limit is the
+exception, it counts failed attempts only.
+"""
+
+import hashlib
+import math
+from collections.abc import Mapping
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.decorators import sync_and_async_middleware
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def _record_limit(request, limit, remaining, reset):
+    """Remember the most restrictive rate limit applied to request."""
+
+    request = getattr(request, '_request', request)
+    current = getattr(request, 'rate_limit', None)
+    if current is None or remaining < current[1]:
+        request.rate_limit = (limit, remaining, reset)
+
+
+def add_rate_limit_headers(request, response):
+    """Add the `X-RateLimit-*` headers for the limit applied to request."""
+
+    rate_limit = getattr(request, 'rate_limit', None)
+    if rate_limit is not None:
+        limit, remaining, reset = rate_limit
+        response['X-RateLimit-Limit'] = limit
+        response['X-RateLimit-Remaining'] = remaining
+        response['X-RateLimit-Reset'] = reset
+
+    return response
+
+
+@sync_and_async_middleware
+def rate_limit_headers_middleware(get_response):
+    """Add rate limit headers to throttled responses."""
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = await get_response(request)
+            return add_rate_limit_headers(request, response)
+    else:
+        def middleware(request):
+            response = get_response(request)
+            return add_rate_limit_headers(request, response)
+
+    return middleware
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """Limits requests per client with a sliding window counter."""
+
+    # Throttles counting only some requests, e.g. failed ones, turn this
+    # off and call `count` for the requests they count.
+    count_requests = True
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def get_rate(self):
+        """Return the rate of the scope, read when the throttle is made."""
+
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            msg = f"No default throttle rate set for '{self.scope}' scope"
+            raise ImproperlyConfigured(msg)
+
+    def get_user_ident(self, request):
+        """Return the user id, or the client address when anonymous."""
+
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+
+        return self.get_ident(request)
+
+    def get_cache_key(self, request, view):
+        """Return the counter key of the user, or of the address."""
+
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_user_ident(request)
+        }
+
+    def window_keys(self):
+        """Return the cache keys of the current and previous window."""
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.elapsed = self.now - window * self.duration
+
+        return f'{self.key}:{window}', f'{self.key}:{window - 1}'
+
+    def evaluate(self, request, current, previous):
+        """Return whether the estimated rate is within the limit."""
+
+        overlap = 1 - self.elapsed / self.duration
+        self.current = current
+        self.previous = previous
+        self.estimate = previous * overlap + current
+
+        remaining = max(0, math.floor(self.num_requests - self.estimate))
+        reset = math.ceil(self.duration - self.elapsed)
+        _record_limit(request, self.num_requests, remaining, reset)
+
+        return self.estimate <= self.num_requests
+
+    def count(self, key):
+        """Add a request to the counter at key and return its count."""
+
+        timeout = self.duration * 2
+        cache = self.cache
+        if cache.add(key, 1, timeout):
+            return 1
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout)
+            return 1
+
+    async def acount(self, key):
+        """Async counterpart of `count`."""
+
+        timeout = self.duration * 2
+        cache = self.cache
+        if await cache.aadd(key, 1, timeout):
+            return 1
+        try:
+            return await cache.aincr(key)
+        except ValueError:
+            await cache.aset(key, 1, timeout)
+            return 1
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED or self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        current_key, previous_key = self.window_keys()
+        cache = self.cache
+        if self.count_requests:
+            current = self.count(current_key)
+        else:
+            # the request is checked as if it were the next one counted.
+            current = cache.get(current_key, 0) + 1
+
+        return self.evaluate(
+            request, current, cache.get(previous_key, 0)
+        )
+
+    async def aallow_request(self, request, view):
+        """Async counterpart of `allow_request`."""
+
+        if not settings.THROTTLE_ENABLED or self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        current_key, previous_key = self.window_keys()
+        cache = self.cache
+        if self.count_requests:
+            current = await self.acount(current_key)
+        else:
+            current = await cache.aget(current_key, 0) + 1
+
+        return self.evaluate(
+            request, current, await cache.aget(previous_key, 0)
+        )
+
+    def wait(self):
+        """Return the seconds until the estimate is back under the limit."""
+
+        limit = self.num_requests
+        remaining = self.duration - self.elapsed
+        if self.current > limit:
+            # The current window alone is over, wait for it to slide out.
+            wait = remaining + self.duration * (1 - limit / self.current)
+        else:
+            # The previous window has to slide out far enough.
+            needed = 1 - (limit - self.current) / self.previous
+            wait = self.duration * needed - self.elapsed
+
+        return max(1, math.ceil(wait))
+
+
+class RecipesRateThrottle(SlidingWindowRateThrottle):
+    """Limits recipe requests per user."""
+
+    scope = 'recipes'
+
+
+class AccountRateThrottle(SlidingWindowRateThrottle):
+    """Limits account requests per user, or per address when anonymous."""
+
+    scope = 'user'
+
+
+class LoginRateThrottle(SlidingWindowRateThrottle):
+    """Limits login attempts per client address."""
+
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request)
+        }
+
+
+class LoginEmailRateThrottle(SlidingWindowRateThrottle):
+    """Limits failed login attempts per account, whatever the address.
+
+    Stops attempts against one account spread over many addresses. Only
+    failures are counted, so nobody can lock the owner out by sending
+    requests with their email.
+    """
+
+    scope = 'login_email'
+    count_requests = False
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        email = data.get('email') if isinstance(data, Mapping) else None
+        if not isinstance(email, str) or not email:
+            return None
+
+        ident = hashlib.md5(
+            email.strip().lower().encode(), usedforsecurity=False
+        ).hexdigest()
+
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def count_failure(self, request):
+        """Count a failed login attempt on the account of request."""
+
+        if not settings.THROTTLE_ENABLED or self.rate is None:
+            return
+
+        self.key = self.get_cache_key(request, None)
+        if self.key is not None:
+            self.count(self.window_keys()[0])
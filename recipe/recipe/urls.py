@@ -13,19 +13,23 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from .metrics import metrics_view
+from .schema import docs_view, schema_view
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
-    path(
-        'api/docs/',
-        SpectacularSwaggerView.as_view(url_name='api-schema'),
-        name='api-docs'
-    ),
+    path('api/schema/', schema_view, name='api-schema'),
+    path('api/docs/', docs_view, name='api-docs'),
     path('api/user/', include('user.urls')),
     path('api/recipes/', include('recipes.urls')),
+    path('api/jobs/', include('jobs.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
+
+# the API only profile leaves the admin out.
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
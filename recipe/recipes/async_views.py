@@ -0,0 +1,265 @@
+"""
+ASGI native views for recipes app.
+
+Serve recipe list, detail and create with the async ORM so requests do
+not occupy a worker thread while waiting on the database. Requests these
+views do not handle natively, such as search, form encoded bodies,
+writes of tags and ingredients, updates and deletes, are passed to
+`RecipesViewSet` in a thread.
+Enabled with the `RECIPES_ASYNC_VIEWS` setting.
+"""
+
+import io
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    NotAuthenticated,
+    NotFound,
+    Throttled,
+)
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+
+from recipe.renderers import ORJSONParser, ORJSONRenderer
+from recipe.routers import ais_pinned, apin_primary, use_replicas
+from recipe.throttling import RecipesRateThrottle
+from user.authentication import CachedTokenAuthentication
+
+from .cache import abump_user_version, acached_response
+from .filters import RecipeFilterBackend
+from .models import RELATION_MODELS, Recipes
+from .pagination import RecipeCursorPagination
+from .serializers import (
+    RecipesSerializer,
+    RecipeDetailSerializer,
+    detail_columns,
+    parse_fields,
+)
+from .views import RecipesViewSet
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncRecipeView(View):
+    """Base view authenticating with tokens and rendering JSON."""
+
+    authentication = CachedTokenAuthentication()
+    throttle_class = RecipesRateThrottle
+    renderer = ORJSONRenderer()
+    sync_view = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Authenticate the request and call the handler."""
+
+        try:
+            result = await self.authentication.aauthenticate(request)
+            if result is None:
+                raise NotAuthenticated()
+            request.user, request.auth = result
+            throttle = self.throttle_class()
+            if not await throttle.aallow_request(request, self):
+                raise Throttled(throttle.wait())
+            return await self.route(request, *args, **kwargs)
+        except APIException as exc:
+            return self.error(exc)
+
+    async def route(self, request, *args, **kwargs):
+        """Call the handler, reading from a replica when it is safe.
+
+        Mirrors `ReplicaReadMixin` for the async handlers.
+        """
+
+        user_id = request.user.pk
+        if request.method not in SAFE_METHODS:
+            response = await super().dispatch(request, *args, **kwargs)
+            if response.status_code < 400:
+                await apin_primary(user_id)
+            return response
+
+        if settings.DATABASE_REPLICAS and not await ais_pinned(user_id):
+            with use_replicas():
+                return await super().dispatch(request, *args, **kwargs)
+
+        return await super().dispatch(request, *args, **kwargs)
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        """Return a JSON response holding data."""
+
+        response = HttpResponse(
+            self.renderer.render(data),
+            status=status_code,
+            content_type=self.renderer.media_type,
+        )
+        response.data = data
+
+        return response
+
+    def error(self, exc):
+        """Return the response REST framework would send for exc."""
+
+        data = exc.detail
+        if not isinstance(data, (list, dict)):
+            data = {'detail': data}
+        response = self.render(data, exc.status_code)
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            response['WWW-Authenticate'] = (
+                self.authentication.authenticate_header(request=None)
+            )
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+
+        return response
+
+    async def passthrough(self, request, *args, **kwargs):
+        """Handle the request with the sync view set in a thread.
+
+        The view set does not throttle again, `dispatch` already did.
+        """
+
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    def get_queryset(self):
+        """Return the recipes of the authenticated user."""
+
+        return Recipes.objects.filter(user=self.request.user).order_by('-id')
+
+
+class AsyncRecipeListView(AsyncRecipeView):
+    """Lists and creates recipes."""
+
+    sync_view = staticmethod(RecipesViewSet.as_view(
+        {'get': 'list', 'post': 'create'}, throttle_classes=[]
+    ))
+    ordering_fields = RecipesViewSet.ordering_fields
+
+    async def get(self, request):
+        """List recipes, served from the response cache when fresh."""
+
+        if request.GET.get('search', '').strip():
+            return await self.passthrough(request)
+
+        return await acached_response(
+            request, request.user.pk,
+            lambda: self.list_values(Request(request)),
+            self.render,
+        )
+
+    async def list_values(self, request):
+        """List recipes built straight from `values()` rows."""
+
+        fields = parse_fields(
+            request.query_params.get('fields'), RecipesSerializer.Meta.fields
+        )
+        serializer = RecipesSerializer(fields=fields)
+        columns = serializer.values_columns()
+        if columns is None:
+            return await self.passthrough(request._request)
+
+        columns = set(columns) | set(self.ordering_fields)
+        queryset = RecipeFilterBackend().filter_queryset(
+            request, self.get_queryset(), self
+        )
+
+        paginator = RecipeCursorPagination()
+        page = await paginator.apaginate_queryset(
+            queryset.values(*columns), request, self
+        )
+        await serializer.afetch_relations(page)
+        data = paginator.get_paginated_response(
+            serializer.represent_values(page)
+        ).data
+
+        return self.render(data)
+
+    async def post(self, request):
+        """Create a recipe for the authenticated user."""
+
+        if request.content_type != ORJSONParser.media_type:
+            return await self.passthrough(request)
+
+        data = ORJSONParser().parse(
+            io.BytesIO(request.body), parser_context={'request': request}
+        )
+        # tags and ingredients are written by the view set.
+        if isinstance(data, dict) and data.keys() & RELATION_MODELS.keys():
+            return await self.passthrough(request)
+
+        serializer = RecipeDetailSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        recipe = await Recipes.objects.acreate(
+            user=request.user, **serializer.validated_data
+        )
+        await abump_user_version(request.user.pk)
+
+        # a new recipe has no tags or ingredients to fetch.
+        data = RecipeDetailSerializer(recipe, fields=[
+            name for name in RecipeDetailSerializer.Meta.fields
+            if name not in RELATION_MODELS
+        ], context={'request': request}).data
+        data.update({name: [] for name in RELATION_MODELS})
+
+        return self.render(data, status.HTTP_201_CREATED)
+
+
+class AsyncRecipeDetailView(AsyncRecipeView):
+    """Retrieves recipes, passing writes to the view set."""
+
+    sync_view = staticmethod(RecipesViewSet.as_view({
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy',
+    }, throttle_classes=[]))
+
+    async def get(self, request, pk):
+        """Retrieve a recipe, served from the response cache when fresh."""
+
+        return await acached_response(
+            request, request.user.pk,
+            lambda: self.retrieve(Request(request), pk),
+            self.render,
+        )
+
+    async def retrieve(self, request, pk):
+        """Return the recipe with pk."""
+
+        fields = parse_fields(
+            request.query_params.get('fields'),
+            RecipeDetailSerializer.Meta.fields,
+        )
+        queryset = self.get_queryset().with_relations(fields)
+        if fields is not None:
+            queryset = queryset.only(*detail_columns(fields))
+
+        recipe = await queryset.filter(pk=pk).afirst()
+        if recipe is None:
+            raise NotFound()
+
+        serializer = RecipeDetailSerializer(
+            recipe, fields=fields, context={'request': request}
+        )
+
+        return self.render(serializer.data)
+
+    async def put(self, request, pk):
+        """Update a recipe with the view set."""
+
+        return await self.passthrough(request, pk=pk)
+
+    async def patch(self, request, pk):
+        """Partially update a recipe with the view set."""
+
+        return await self.passthrough(request, pk=pk)
+
+    async def delete(self, request, pk):
+        """Delete a recipe with the view set."""
+
+        return await self.passthrough(request, pk=pk)
@@ -0,0 +1,200 @@
+"""
+Per-user versioned response cache for recipes app.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponseNotModified
+from django.utils.cache import (
+    parse_etags,
+    patch_cache_control,
+    patch_vary_headers,
+    quote_etag,
+)
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipe.routers import apin_primary, pin_primary
+
+
+def _cache():
+    """Return the cache used for recipe responses."""
+
+    return caches[settings.RECIPES_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    """Return the cache key holding a user's recipes version."""
+
+    return f'recipes:version:{user_id}'
+
+
+def _new_version():
+    """Return a fresh version number.
+
+    Versions start from the current time so a version evicted from the
+    cache never restarts at a value already used by stale responses.
+    """
+
+    return int(time.time() * 1000)
+
+
+def get_user_version(user_id):
+    """Return the current recipes version for a user."""
+
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+
+    return version
+
+
+def bump_user_version(user_id):
+    """Invalidate every cached recipe response of a user.
+
+    Also pins the user's reads to the primary, as the responses cached
+    under the new version must not be read from a lagging replica. This
+    covers writes made outside requests, e.g. by background jobs.
+    """
+
+    pin_primary(user_id)
+    cache = _cache()
+    key = _version_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _new_version()
+        cache.set(key, version, None)
+        return version
+
+
+async def aget_user_version(user_id):
+    """Return the current recipes version for a user, asynchronously."""
+
+    cache = _cache()
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = _new_version()
+        if not await cache.aadd(key, version, None):
+            version = await cache.aget(key, version)
+
+    return version
+
+
+async def abump_user_version(user_id):
+    """Invalidate every cached recipe response of a user, asynchronously."""
+
+    await apin_primary(user_id)
+    cache = _cache()
+    key = _version_key(user_id)
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        version = _new_version()
+        await cache.aset(key, version, None)
+        return version
+
+
+def response_digest(user_id, version, url):
+    """Return the digest naming a cached response and its ETag."""
+
+    return hashlib.md5(
+        f'{user_id}:{version}:{url}'.encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+def response_key(digest):
+    """Return the cache key of the response named by digest."""
+
+    return f'recipes:response:{digest}'
+
+
+def etag_matches(request, etag):
+    """Return whether the request already holds the ETag."""
+
+    return etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+
+def add_cache_headers(response, etag):
+    """Add the ETag and per-user caching headers to response."""
+
+    if response.status_code in (
+        status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+    ):
+        response['ETag'] = etag
+    patch_vary_headers(response, ['Authorization'])
+    patch_cache_control(response, private=True)
+
+    return response
+
+
+class VersionedCacheMixin:
+    """Serve safe reads from a cache keyed by user and recipes version.
+
+    Any write to a user's recipes bumps the version, so cached responses
+    are never stale. Responses carry an ETag so clients can revalidate
+    with `If-None-Match` and receive a 304.
+    """
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Return the cached response for request or call handler."""
+
+        user_id = request.user.pk
+        version = get_user_version(user_id)
+        digest = response_digest(
+            user_id, version, request.build_absolute_uri()
+        )
+        etag = quote_etag(digest)
+
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = response_key(digest)
+            data = _cache().get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    _cache().set(
+                        key, response.data, settings.RECIPES_CACHE_TTL
+                    )
+            else:
+                response = Response(data)
+
+        return add_cache_headers(response, etag)
+
+
+async def acached_response(request, user_id, handler, render):
+    """Async counterpart of `VersionedCacheMixin.cached_response`.
+
+    handler is awaited for a response whose `data` is cached, render
+    builds a response back from cached data.
+    """
+
+    version = await aget_user_version(user_id)
+    digest = response_digest(user_id, version, request.build_absolute_uri())
+    etag = quote_etag(digest)
+
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        key = response_key(digest)
+        data = await _cache().aget(key)
+        if data is None:
+            response = await handler()
+            if response.status_code == status.HTTP_200_OK:
+                await _cache().aset(
+                    key, response.data, settings.RECIPES_CACHE_TTL
+                )
+        else:
+            response = render(data)
+
+    return add_cache_headers(response, etag)
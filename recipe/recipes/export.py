@@ -0,0 +1,67 @@
+"""
+Streaming export of recipes.
+"""
+
+import csv
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = ['id', 'title', 'description', 'time_minutes', 'price', 'link']
+
+
+class _Echo:
+    """File-like object whose write returns the value written."""
+
+    def write(self, value):
+        """Return value instead of storing it."""
+
+        return value
+
+
+def _rows(queryset):
+    """Yield recipe rows as dicts using a chunked database cursor."""
+
+    return queryset.values(*EXPORT_FIELDS).iterator(
+        chunk_size=settings.RECIPES_EXPORT_CHUNK_SIZE
+    )
+
+
+def _buffered(lines):
+    """Group lines into chunks so each yield writes many rows."""
+
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= settings.RECIPES_EXPORT_CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_ndjson(queryset):
+    """Yield recipes as newline delimited JSON."""
+
+    encoder = DjangoJSONEncoder()
+
+    return _buffered(encoder.encode(row) + '\n' for row in _rows(queryset))
+
+
+def stream_csv(queryset):
+    """Yield recipes as CSV with a header row."""
+
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in _rows(queryset):
+            yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+    return _buffered(lines())
+
+
+EXPORTERS = {
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    'csv': (stream_csv, 'text/csv'),
+}
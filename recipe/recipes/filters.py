@@ -0,0 +1,74 @@
+"""
+Filter backends for recipes app.
+"""
+
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Recipes
+from .serializers import RecipeFilterSerializer
+
+FILTER_LOOKUPS = {
+    'min_price': 'price__gte',
+    'max_price': 'price__lte',
+    'min_time': 'time_minutes__gte',
+    'max_time': 'time_minutes__lte',
+    'title': 'title__startswith',
+}
+
+# Relations filtered by the ids of their related objects.
+RELATION_FILTERS = ['tags', 'ingredients']
+
+
+def related_to(name, ids):
+    """Return the ids of recipes linked to any of ids through name.
+
+    The subquery reads only the join table, through its index on the
+    related id, so no join or `DISTINCT` is added to the outer query.
+    """
+
+    field = Recipes._meta.get_field(name)
+
+    return field.remote_field.through.objects.filter(**{
+        f'{field.m2m_reverse_name()}__in': ids,
+    }).values(field.m2m_column_name())
+
+
+class RecipeFilterBackend(BaseFilterBackend):
+    """Filters recipes by price and time ranges, title prefix and tags.
+
+    The range filters are served by the `(user, price)` and
+    `(user, time_minutes)` indexes. `tags` and `ingredients` take
+    comma separated ids and match recipes having any of them.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """Return queryset filtered by the query parameters."""
+
+        serializer = RecipeFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = {
+            FILTER_LOOKUPS[name]: value
+            for name, value in serializer.validated_data.items()
+            if name in FILTER_LOOKUPS
+        }
+        queryset = queryset.filter(**filters)
+
+        for name in RELATION_FILTERS:
+            ids = serializer.validated_data.get(name)
+            if ids:
+                queryset = queryset.filter(id__in=related_to(name, ids))
+
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        """Describe the filter query parameters for the schema."""
+
+        return [
+            {
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'schema': {'type': 'string'},
+            }
+            for name in [*FILTER_LOOKUPS, *RELATION_FILTERS]
+        ]
@@ -0,0 +1,180 @@
+"""
+Storage and serving of recipe images.
+
+Uploads are copied to the image storage chunk by chunk, so they are
+never held in memory whole, and their thumbnail is rendered by a job.
+Files are handed to the web server with `X-Sendfile` or
+`X-Accel-Redirect` when `RECIPES_IMAGE_SENDFILE` is set. Otherwise they
+are returned as file responses, which WSGI servers send with their
+`wsgi.file_wrapper`, e.g. `sendfile()`, rather than Python reads.
+"""
+
+import hashlib
+import os
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import quote_etag
+
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from jobs.queue import enqueue
+
+from .cache import add_cache_headers, bump_user_version, etag_matches
+from .models import Recipes
+
+# Leading bytes, extension and content type of accepted image formats.
+IMAGE_FORMATS = [
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png', 'image/png'),
+    (b'GIF87a', 'gif', 'image/gif'),
+    (b'GIF89a', 'gif', 'image/gif'),
+]
+CONTENT_TYPES = {
+    extension: content_type
+    for _, extension, content_type in IMAGE_FORMATS
+}
+CONTENT_TYPES['webp'] = 'image/webp'
+
+
+class ImageContentNegotiation(DefaultContentNegotiation):
+    """Content negotiation of the image endpoint.
+
+    Images are returned whatever the `Accept` header asks for, errors
+    fall back to the first renderer when none is acceptable.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(
+                request, renderers, format_suffix
+            )
+        except NotAcceptable:
+            return renderers[0], renderers[0].media_type
+
+
+def get_image_storage():
+    """Return the storage instance of the recipe image fields.
+
+    It is built once, when the fields are, by `models.image_storage`.
+    """
+
+    return Recipes._meta.get_field('image').storage
+
+
+def image_format(upload):
+    """Return the extension of upload, or None if not a known image.
+
+    Only the first bytes are read, decoding is left to the thumbnail.
+    """
+
+    upload.seek(0)
+    head = upload.read(12)
+    upload.seek(0)
+
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension, _ in IMAGE_FORMATS:
+        if head.startswith(signature):
+            return extension
+
+    return None
+
+
+def delete_files(*names):
+    """Delete the named image files once the transaction commits."""
+
+    names = [name for name in names if name]
+    if names:
+        storage = get_image_storage()
+        transaction.on_commit(
+            lambda: [storage.delete(name) for name in names]
+        )
+
+
+def save_image(recipe, upload, extension, user=None):
+    """Store upload as the image of recipe and queue its thumbnail.
+
+    The previous image and thumbnail are deleted. Returns the job
+    rendering the thumbnail. Raises `Recipes.DoesNotExist` when the
+    recipe was deleted meanwhile, after deleting the stored upload.
+    """
+
+    storage = get_image_storage()
+    name = storage.save(
+        f'recipes/{recipe.user_id}/{recipe.pk}/{uuid.uuid4().hex}'
+        f'.{extension}',
+        upload,
+    )
+    updated = Recipes.objects.filter(pk=recipe.pk).update(
+        image=name, thumbnail=None
+    )
+    if not updated:
+        storage.delete(name)
+        raise Recipes.DoesNotExist()
+    delete_files(recipe.image.name, recipe.thumbnail.name)
+    bump_user_version(recipe.user_id)
+
+    return enqueue(
+        'recipes.thumbnail', user=user, recipe=recipe.pk, image=name
+    )
+
+
+def delete_image(recipe):
+    """Remove the image and thumbnail of recipe."""
+
+    Recipes.objects.filter(pk=recipe.pk).update(image=None, thumbnail=None)
+    delete_files(recipe.image.name, recipe.thumbnail.name)
+    bump_user_version(recipe.user_id)
+
+
+def thumbnail_name(name):
+    """Return the name of the thumbnail of the image named name."""
+
+    return f'{os.path.splitext(name)[0]}-thumbnail.jpg'
+
+
+def image_response(request, name):
+    """Return the response sending the image file named name.
+
+    Names are never reused, so the ETag derived from the name lets
+    clients revalidate without the file being opened.
+    """
+
+    etag = quote_etag(
+        hashlib.md5(name.encode(), usedforsecurity=False).hexdigest()
+    )
+    if etag_matches(request, etag):
+        return add_cache_headers(HttpResponseNotModified(), etag)
+
+    storage = get_image_storage()
+    extension = os.path.splitext(name)[1].lstrip('.')
+    content_type = CONTENT_TYPES.get(extension, 'application/octet-stream')
+    mode = settings.RECIPES_IMAGE_SENDFILE
+
+    path = None
+    if mode == 'x-sendfile':
+        try:
+            path = storage.path(name)
+        except NotImplementedError:
+            # remote storages have no local path to hand over.
+            pass
+
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(
+            settings.RECIPES_IMAGE_ACCEL_PREFIX + name
+        )
+    elif path is not None:
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = FileResponse(
+            storage.open(name, 'rb'), content_type=content_type
+        )
+
+    return add_cache_headers(response, etag)
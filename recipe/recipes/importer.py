@@ -0,0 +1,111 @@
+"""
+Streaming import of recipes.
+"""
+
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext as _
+
+from rest_framework import serializers
+
+from .cache import bump_user_version
+from .models import Recipes
+from .serializers import (
+    RecipeDetailSerializer,
+    pop_relations,
+    save_relations,
+)
+from .stats import record_created
+
+
+def _ndjson_rows(lines):
+    """Yield a dict, or None for invalid JSON, per non blank line."""
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+def _csv_rows(lines):
+    """Yield a dict per CSV row, keyed by the header row."""
+
+    return csv.DictReader(lines)
+
+
+READERS = {
+    'ndjson': _ndjson_rows,
+    'csv': _csv_rows,
+}
+
+
+def import_recipes(user, upload, input_format):
+    """Import recipes for user from an uploaded file.
+
+    The file is read line by line and rows are inserted with one
+    `bulk_create` per batch, so memory use does not grow with the file.
+    Yields a progress dict after every batch and a final summary dict
+    with `done` set and the row errors, capped at
+    `RECIPES_IMPORT_MAX_ERRORS`. Tags and ingredients of a batch are
+    created and linked with a few bulk queries as well, in the
+    transaction of the batch.
+    """
+
+    batch_size = settings.RECIPES_IMPORT_BATCH_SIZE
+    serializer = RecipeDetailSerializer()
+    progress = {'processed': 0, 'created': 0, 'failed': 0}
+    errors = []
+    batch = []
+    relations = []
+
+    def add_error(row_number, detail):
+        progress['failed'] += 1
+        if len(errors) < settings.RECIPES_IMPORT_MAX_ERRORS:
+            errors.append({'row': row_number, 'errors': detail})
+
+    def flush():
+        # a batch is saved with its relations and stats, or not at all.
+        with transaction.atomic():
+            Recipes.objects.bulk_create(batch, batch_size=batch_size)
+            save_relations(zip(batch, relations))
+            record_created(batch)
+        progress['created'] += len(batch)
+        batch.clear()
+        relations.clear()
+        bump_user_version(user.pk)
+
+    lines = codecs.iterdecode(upload, 'utf-8-sig')
+    try:
+        for row_number, row in enumerate(
+            READERS[input_format](lines), start=1
+        ):
+            progress['processed'] += 1
+            if row is None:
+                add_error(row_number, [_('Invalid JSON object.')])
+                continue
+            try:
+                attrs = serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                add_error(row_number, exc.detail)
+                continue
+
+            relations.append(pop_relations(attrs))
+            batch.append(Recipes(user=user, **attrs))
+            if len(batch) >= batch_size:
+                flush()
+                yield dict(progress)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        add_error(progress['processed'] + 1, [str(exc)])
+
+    if batch:
+        flush()
+
+    yield {**progress, 'done': True, 'errors': errors}
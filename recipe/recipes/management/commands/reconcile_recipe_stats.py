@@ -0,0 +1,26 @@
+"""
+Recomputes the recipe stats of every user.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.stats import reconcile_stats
+
+
+class Command(BaseCommand):
+    """Repairs drift of the incrementally maintained recipe stats."""
+
+    help = 'Recomputes the recipe stats of users from their recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.RECIPES_STATS_BATCH_SIZE,
+            help='Users whose stats are recomputed per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        corrected = sum(reconcile_stats(max(options['batch_size'], 1)))
+
+        self.stdout.write(f'Corrected the stats of {corrected} user(s).')
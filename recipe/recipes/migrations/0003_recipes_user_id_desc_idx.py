@@ -0,0 +1,19 @@
+# Generated by Django 4.1.3 on 2026-10-18 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_alter_recipes_options_alter_recipes_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['user', '-id'], name='recipes_user_id_desc_idx'),
+        ),
+    ]
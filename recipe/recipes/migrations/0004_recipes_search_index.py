@@ -0,0 +1,91 @@
+# Generated by Django 4.1.3 on 2026-10-18 10:05
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+GIN_INDEX_NAME = 'recipes_search_gin_idx'
+
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE recipes_fts USING fts5(
+        title, description,
+        content='recipes', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER recipes_fts_insert AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_fts_delete AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_fts_update AFTER UPDATE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO recipes_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER IF EXISTS recipes_fts_update',
+    'DROP TRIGGER IF EXISTS recipes_fts_delete',
+    'DROP TRIGGER IF EXISTS recipes_fts_insert',
+    'DROP TABLE IF EXISTS recipes_fts',
+]
+
+
+def search_index():
+    """Return the GIN index over the weighted search vector."""
+
+    vector = (
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('description', weight='B', config='english')
+    )
+
+    return GinIndex(vector, name=GIN_INDEX_NAME)
+
+
+def create_search_index(apps, schema_editor):
+    """Create the text search index for the current database."""
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        recipes = apps.get_model('recipes', 'Recipes')
+        schema_editor.add_index(recipes, search_index())
+    elif vendor == 'sqlite':
+        for sql in SQLITE_FORWARDS:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    """Drop the text search index for the current database."""
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        recipes = apps.get_model('recipes', 'Recipes')
+        schema_editor.remove_index(recipes, search_index())
+    elif vendor == 'sqlite':
+        for sql in SQLITE_BACKWARDS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipes_user_id_desc_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-18 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipes_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['user', 'time_minutes'], name='recipes_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['user', 'price'], name='recipes_user_price_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:25
+
+import recipes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_tags_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='image',
+            field=models.FileField(blank=True, editable=False, max_length=255, null=True, storage=recipes.models.image_storage, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='thumbnail',
+            field=models.FileField(blank=True, editable=False, max_length=255, null=True, storage=recipes.models.image_storage, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.1.3 on 2026-10-18 20:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_stats(apps, schema_editor):
+    """Create the stats of existing users from their recipes."""
+
+    db = schema_editor.connection.alias
+    user = apps.get_model(settings.AUTH_USER_MODEL)
+    recipes = apps.get_model('recipes', 'Recipes')
+    stats = apps.get_model('recipes', 'UserRecipeStats')
+    totals = {
+        row['user_id']: row
+        for row in recipes.objects.using(db).order_by().values(
+            'user_id'
+        ).annotate(
+            count=Count('id'), price=Sum('price'), minutes=Sum('time_minutes')
+        )
+    }
+    rows = []
+    for user_id in user.objects.using(db).values_list('pk', flat=True):
+        total = totals.get(user_id, {})
+        rows.append(stats(
+            user_id=user_id,
+            recipe_count=total.get('count', 0),
+            price_total=total.get('price') or 0,
+            time_minutes_total=total.get('minutes') or 0,
+        ))
+    stats.objects.using(db).bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipes_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.BigIntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('time_minutes_total', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'user recipe stats',
+                'verbose_name_plural': 'user recipe stats',
+                'db_table': 'user_recipe_stats',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,101 @@ Contains model for Recipes app.
 
 from django.conf import settings
 from django.db import models
+from django.utils.module_loading import import_string
+
+
+def image_storage():
+    """Return the storage recipe images are saved to.
+
+    The class and its options come from `RECIPES_IMAGE_STORAGE` and
+    `RECIPES_IMAGE_STORAGE_OPTIONS`, the local file system by default.
+    """
+
+    storage_class = import_string(settings.RECIPES_IMAGE_STORAGE)
+
+    return storage_class(**settings.RECIPES_IMAGE_STORAGE_OPTIONS)
+
+
+class Tag(models.Model):
+    """Tag a user files recipes under."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=255)
+
+    def __str__(self):
+        return str(self.name)
+
+    class Meta:
+        """Additional settings for model"""
+        db_table = 'tags'
+        ordering = ['name', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='tags_user_name_uniq'
+            ),
+        ]
+
+
+class Ingredient(models.Model):
+    """Ingredient a user's recipes are made of."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=255)
+
+    def __str__(self):
+        return str(self.name)
+
+    class Meta:
+        """Additional settings for model"""
+        db_table = 'ingredients'
+        ordering = ['name', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='ingredients_user_name_uniq'
+            ),
+        ]
+
+
+RELATION_MODELS = {
+    'tags': Tag,
+    'ingredients': Ingredient,
+}
+
+# Columns holding the file names of a recipe's image.
+IMAGE_COLUMNS = ['image', 'thumbnail']
+
+# Attributes of a recipe counted in the stats of its user.
+STATS_ATTNAMES = ['user_id', 'price', 'time_minutes']
+
+
+def relation_prefetches(fields=None):
+    """Return the `Prefetch` of each relation among fields, or all.
+
+    Each relation costs one query for a whole page of recipes, ordered
+    by name so the representation is stable.
+    """
+
+    return [
+        models.Prefetch(
+            name,
+            queryset=model.objects.only('id', 'name').order_by('name', 'id'),
+        )
+        for name, model in RELATION_MODELS.items()
+        if fields is None or name in fields
+    ]
+
+
+class RecipesQuerySet(models.QuerySet):
+    """Query set of recipes."""
+
+    def with_relations(self, fields=None):
+        """Prefetch the tags and ingredients among fields, or all."""
+
+        return self.prefetch_related(*relation_prefetches(fields))
 
 
 class Recipes(models.Model):
@@ -17,12 +112,101 @@ class Recipes(models.Model):
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
+    tags = models.ManyToManyField(Tag, blank=True, related_name='recipes')
+    ingredients = models.ManyToManyField(
+        Ingredient, blank=True, related_name='recipes'
+    )
+    # Null, unlike other text columns, so they are added in place rather
+    # than by rebuilding the table, which drops its search triggers.
+    image = models.FileField(
+        max_length=255, null=True, blank=True, editable=False,
+        storage=image_storage,
+    )
+    thumbnail = models.FileField(
+        max_length=255, null=True, blank=True, editable=False,
+        storage=image_storage,
+    )
+
+    objects = RecipesQuerySet.as_manager()
 
     def __str__(self):
         return str(self.title)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded values counted in the user's stats.
+
+        Updates then add the difference to the stats without reading the
+        recipe again.
+        """
+
+        instance = super().from_db(db, field_names, values)
+        if all(name in instance.__dict__ for name in STATS_ATTNAMES):
+            instance._stats_counted = tuple(
+                instance.__dict__[name] for name in STATS_ATTNAMES
+            )
+
+        return instance
+
     class Meta:
         """Additional settings for model"""
         db_table = 'recipes'
         verbose_name = 'recipe'
         verbose_name_plural = 'recipes'
+        indexes = [
+            models.Index(
+                fields=['user', '-id'], name='recipes_user_id_desc_idx'
+            ),
+            models.Index(
+                fields=['user', 'time_minutes'], name='recipes_user_time_idx'
+            ),
+            models.Index(
+                fields=['user', 'price'], name='recipes_user_price_idx'
+            ),
+        ]
+
+
+class UserRecipeStats(models.Model):
+    """Recipe count and totals of a user, kept in step with its recipes.
+
+    Totals rather than averages are stored, so every change of a recipe
+    is added with a single `F()` update.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        primary_key=True, related_name='recipe_stats',
+    )
+    recipe_count = models.BigIntegerField(default=0)
+    price_total = models.DecimalField(
+        max_digits=20, decimal_places=2, default=0
+    )
+    time_minutes_total = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.recipe_count} recipes'
+
+    @property
+    def average_price(self):
+        """Return the average recipe price, None without recipes."""
+
+        if not self.recipe_count:
+            return None
+
+        return self.price_total / self.recipe_count
+
+    @property
+    def average_time_minutes(self):
+        """Return the average recipe time, None without recipes."""
+
+        if not self.recipe_count:
+            return None
+
+        return self.time_minutes_total / self.recipe_count
+
+    class Meta:
+        """Additional settings for model"""
+        db_table = 'user_recipe_stats'
+        verbose_name = 'user recipe stats'
+        verbose_name_plural = 'user recipe stats'
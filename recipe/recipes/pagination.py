@@ -0,0 +1,204 @@
+"""
+Pagination classes for recipes app.
+"""
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils.translation import gettext as _
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+from rest_framework.utils.urls import replace_query_param
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination for recipes, newest first by default.
+
+    Each page is fetched with `WHERE user_id = ? AND (key) > (position)`
+    so that deep pages cost the same as the first one. The client may
+    order by any field in the view's `ordering_fields`; ties are broken
+    by id so the keyset is always unique. Cursors are signed so clients
+    cannot forge or tamper with the position.
+    """
+
+    ordering = '-id'
+    ordering_param = 'ordering'
+    page_size = settings.RECIPES_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.RECIPES_MAX_PAGE_SIZE
+    cursor_salt = 'recipes.pagination.cursor'
+
+    def get_ordering(self, request, queryset, view):
+        """Return the requested whitelisted ordering, ending with id."""
+
+        ordering = request.query_params.get(self.ordering_param)
+        if not ordering:
+            return (self.ordering,)
+
+        descending = ordering.startswith('-')
+        field = ordering[1:] if descending else ordering
+        if field not in getattr(view, 'ordering_fields', []):
+            msg = _('Cannot order by "{field}".').format(field=field)
+            raise ValidationError({self.ordering_param: [msg]})
+
+        if field == 'id':
+            return (ordering,)
+
+        return (ordering, '-id' if descending else 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the page of recipes following the cursor position."""
+
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+
+        return self.build_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Return the page of recipes using the async ORM."""
+
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+
+        return self.build_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """Return the unevaluated queryset of the requested page.
+
+        It holds one extra item to tell whether another page follows.
+        """
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.cursor is not None and self.cursor.reverse:
+            ordering = _reverse_ordering(ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self.keyset_filter(ordering, self.cursor.position)
+            )
+
+        return queryset[:self.page_size + 1]
+
+    def build_page(self, results):
+        """Return the page from the results of `page_queryset`."""
+
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if self.cursor is not None and self.cursor.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def keyset_filter(self, ordering, position):
+        """Return a filter for rows after position in ordering."""
+
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+
+        return condition
+
+    def get_position(self, instance):
+        """Return the keyset position of an instance or values() row."""
+
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(instance, dict):
+            return [str(instance[name]) for name in names]
+
+        return [str(getattr(instance, name)) for name in names]
+
+    def get_next_link(self):
+        """Return the url of the following page, if any."""
+
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False, position=self.get_position(self.page[-1])
+        ))
+
+    def get_previous_link(self):
+        """Return the url of the preceding page, if any."""
+
+        if not self.has_previous or not self.page:
+            return None
+
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True, position=self.get_position(self.page[0])
+        ))
+
+    def encode_cursor(self, cursor):
+        """Return a url with the signed cursor."""
+
+        tokens = {'s': ','.join(self.ordering), 'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = 1
+
+        encoded = signing.dumps(tokens, salt=self.cursor_salt)
+
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def decode_cursor(self, request):
+        """Return a Cursor from the signed cursor of the request."""
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = signing.loads(encoded, salt=self.cursor_salt)
+            ordering = tokens['s']
+            position = list(tokens['p'])
+            reverse = bool(tokens.get('r', 0))
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # a cursor is only valid for the ordering it was issued for.
+        if ordering != ','.join(self.ordering) or (
+            len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+
+class RecipeSearchPagination(PageNumberPagination):
+    """Page number pagination for ranked search results.
+
+    Search results are ordered by rank, which is not unique, so they
+    cannot be paged with a keyset cursor.
+    """
+
+    page_size = settings.RECIPES_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.RECIPES_MAX_PAGE_SIZE
@@ -0,0 +1,92 @@
+"""
+Full-text search over recipes.
+
+PostgreSQL uses a weighted `SearchVector` backed by a GIN expression
+index. SQLite uses the `recipes_fts` FTS5 table, kept in sync with the
+`recipes` table by triggers. Other databases fall back to `icontains`.
+"""
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'english'
+
+# Must stay identical to the expression indexed in migration 0004.
+SEARCH_VECTOR = (
+    SearchVector('title', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+)
+
+FTS_TABLE = 'recipes_fts'
+
+
+def _fts_query(terms):
+    """Return an FTS5 MATCH expression requiring every term."""
+
+    return ' '.join(
+        '"{}"'.format(term.replace('"', '""')) for term in terms.split()
+    )
+
+
+def _search_postgresql(queryset, terms):
+    """Search using the GIN indexed tsvector."""
+
+    query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+
+    return queryset.annotate(
+        search=SEARCH_VECTOR,
+        rank=SearchRank(SEARCH_VECTOR, query),
+    ).filter(search=query).order_by('-rank', '-id')
+
+
+def _search_sqlite(queryset, terms):
+    """Search using the FTS5 table ranked by bm25."""
+
+    match = _fts_query(terms)
+    if not match:
+        return queryset.none()
+
+    matching_ids = RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match],
+    )
+    table = queryset.model._meta.db_table
+    # bm25 is lower for better matches, negate it to rank descending.
+    rank = RawSQL(
+        f'SELECT -bm25({FTS_TABLE}, 2.0, 1.0) FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id',
+        [match],
+    )
+
+    return queryset.filter(id__in=matching_ids).annotate(
+        rank=rank
+    ).order_by('-rank', '-id')
+
+
+def _search_fallback(queryset, terms):
+    """Search with a substring scan when no text index is available."""
+
+    for term in terms.split():
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(description__icontains=term)
+        )
+
+    return queryset
+
+
+def search_recipes(queryset, terms):
+    """Filter queryset to recipes matching terms, best matches first."""
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return _search_postgresql(queryset, terms)
+    if vendor == 'sqlite':
+        return _search_sqlite(queryset, terms)
+
+    return _search_fallback(queryset, terms)
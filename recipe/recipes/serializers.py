@@ -2,21 +2,488 @@
 Serializers for recipes objects.
 """
 
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.utils.translation import gettext as _
+from drf_spectacular.utils import extend_schema_field
+
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+
+from recipe.metrics import timed
+
+from .models import (
+    IMAGE_COLUMNS,
+    RELATION_MODELS,
+    Ingredient,
+    Recipes,
+    Tag,
+    UserRecipeStats,
+    relation_prefetches,
+)
+from .stats import record_created, record_updated
+
+
+def pop_relations(attrs):
+    """Remove the tags and ingredients from validated attrs.
+
+    Returns the names of each relation present in attrs.
+    """
+
+    return {
+        name: [item['name'] for item in attrs.pop(name)]
+        for name in RELATION_MODELS
+        if name in attrs
+    }
+
+
+def get_or_create_named(model, user_id, names):
+    """Return the user's objects of model named names, creating any missing.
+
+    Costs one query when every name exists and three otherwise, however
+    many names are given.
+    """
+
+    names = set(names)
+    objects = list(model.objects.filter(user_id=user_id, name__in=names))
+    missing = names - {obj.name for obj in objects}
+    if missing:
+        # objects created concurrently are skipped, then fetched below.
+        model.objects.bulk_create(
+            [model(user_id=user_id, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        objects += model.objects.filter(user_id=user_id, name__in=missing)
+
+    return objects
+
+
+def save_relations(items, replace=False):
+    """Link recipes to their tags and ingredients with bulk queries.
+
+    items pairs each saved recipe with the names returned by
+    `pop_relations`. Relations absent from an item are left untouched;
+    with replace, those present overwrite the recipe's current links
+    instead of adding to them.
+    """
+
+    for name, model in RELATION_MODELS.items():
+        pending = [
+            (recipe, relations[name])
+            for recipe, relations in items
+            if name in relations
+        ]
+        if not pending:
+            continue
+
+        wanted = defaultdict(set)
+        for recipe, names in pending:
+            wanted[recipe.user_id].update(names)
+        ids = {}
+        for user_id, names in wanted.items():
+            for obj in get_or_create_named(model, user_id, names):
+                ids[user_id, obj.name] = obj.id
+
+        field = Recipes._meta.get_field(name)
+        through = field.remote_field.through
+        source = field.m2m_column_name()
+        target = field.m2m_reverse_name()
+        if replace:
+            through.objects.filter(**{
+                f'{source}__in': [recipe.id for recipe, names in pending]
+            }).delete()
+        through.objects.bulk_create(
+            [
+                through(**{
+                    source: recipe.id,
+                    target: ids[recipe.user_id, label],
+                })
+                for recipe, names in pending
+                for label in dict.fromkeys(names)
+            ],
+            batch_size=settings.RECIPES_BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def prefetch_relations(recipes):
+    """Load the tags and ingredients of saved recipes.
+
+    Costs one query per relation for all recipes, instead of one per
+    recipe when they are serialized.
+    """
+
+    for recipe in recipes:
+        recipe._prefetched_objects_cache = {}
+    prefetch_related_objects(recipes, *relation_prefetches())
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Validates many recipes and saves them with bulk queries.
+
+    For updates the instance is a mapping of recipe id to recipe and
+    every item of the data must carry the id of the recipe to update.
+    """
+
+    def to_internal_value(self, data):
+        """Reject lists over the bulk limit before validating items."""
+
+        if isinstance(data, list) and (
+            len(data) > settings.RECIPES_BULK_MAX_ITEMS
+        ):
+            msg = _('Ensure this list has at most {max} items.').format(
+                max=settings.RECIPES_BULK_MAX_ITEMS
+            )
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [msg]}, code='max_length'
+            )
+
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        """Validate an item against the recipe it updates."""
+
+        if self.instance is None:
+            return super().run_child_validation(data)
+
+        instance = None
+        if isinstance(data, dict):
+            try:
+                instance = self.instance.get(int(data.get('id')))
+            except (TypeError, ValueError):
+                pass
+        if instance is None:
+            raise serializers.ValidationError(
+                {'id': [_('Recipe not found.')]}, code='not_found'
+            )
+
+        self.child.instance = instance
+        self.child.initial_data = data
+        attrs = super().run_child_validation(data)
+        attrs['id'] = instance.id
+
+        return attrs
+
+    def create(self, validated_data):
+        """Create all recipes with batched INSERTs."""
+
+        relations = [pop_relations(attrs) for attrs in validated_data]
+        recipes = Recipes.objects.bulk_create(
+            [Recipes(**attrs) for attrs in validated_data],
+            batch_size=settings.RECIPES_BULK_BATCH_SIZE,
+        )
+        save_relations(zip(recipes, relations))
+        record_created(recipes)
+        prefetch_relations(recipes)
+
+        return recipes
+
+    def update(self, instance, validated_data):
+        """Update all recipes with batched UPDATEs."""
+
+        recipes = []
+        relations = []
+        fields = set()
+        for attrs in validated_data:
+            recipe = instance[attrs.pop('id')]
+            relations.append(pop_relations(attrs))
+            for attr, value in attrs.items():
+                setattr(recipe, attr, value)
+                fields.add(attr)
+            recipes.append(recipe)
+
+        if fields:
+            Recipes.objects.bulk_update(
+                recipes, fields, batch_size=settings.RECIPES_BULK_BATCH_SIZE
+            )
+            record_updated(recipes)
+        save_relations(zip(recipes, relations), replace=True)
+        prefetch_relations(recipes)
+
+        return recipes
+
+
+def parse_fields(param, available):
+    """Return the field names of a `fields` query parameter.
+
+    Returns None when no fields were requested and raises a validation
+    error for names not in available.
+    """
+
+    if not param:
+        return None
+
+    requested = [name.strip() for name in param.split(',')]
+    requested = [name for name in requested if name]
+    unknown = set(requested) - set(available)
+    if unknown:
+        msg = _('Unknown fields: {fields}.').format(
+            fields=', '.join(sorted(unknown))
+        )
+        raise serializers.ValidationError({'fields': [msg]})
+
+    return requested
+
+
+def detail_columns(fields):
+    """Return the model columns to load for the detail fields."""
+
+    columns = []
+    for name in fields:
+        if name == 'image':
+            columns += IMAGE_COLUMNS
+        elif name not in RELATION_MODELS:
+            columns.append(name)
+
+    return columns
+
+
+# Fields whose representation is the database value itself.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+)
+
+
+class SparseFieldsMixin:
+    """Lets callers restrict a serializer to a subset of its fields.
+
+    Also provides a fast read-only path building representations
+    directly from `values()` rows.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def values_columns(self):
+        """Return the columns to fetch with `values()`.
+
+        Returns None when a field is not a plain model column and the
+        fast path cannot be used.
+        """
+
+        model = self.Meta.model
+        concrete = {field.name for field in model._meta.concrete_fields}
+        relations = self.values_relations()
+        columns = [
+            field.source for field in self.fields.values()
+            if field.source not in relations
+        ]
+        if not set(columns) <= concrete:
+            return None
+
+        # rows are matched to their relations by primary key.
+        if relations and model._meta.pk.name not in columns:
+            columns.append(model._meta.pk.name)
+
+        return columns
+
+    def values_relations(self):
+        """Return the many-to-many relations among the fields.
 
-from .models import Recipes
+        `fetch_relations` adds them to `values()` rows as lists of
+        `{'id', 'name'}` dicts.
+        """
 
+        model = self.Meta.model
+        many = {field.name for field in model._meta.many_to_many}
 
-class RecipesSerializer(serializers.ModelSerializer):
-    """Serializer for recipes."""
+        return [
+            field.source for field in self.fields.values()
+            if field.source in many
+        ]
+
+    def relation_rows(self, name, ids):
+        """Return `(row id, id, name)` of the relation name for ids."""
+
+        field = self.Meta.model._meta.get_field(name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+
+        return field.remote_field.through.objects.filter(**{
+            f'{source}__in': ids,
+        }).order_by(f'{target}__name', target).values_list(
+            source, target, f'{target}__name'
+        )
+
+    def fetch_relations(self, rows):
+        """Add the relations to `values()` rows, one query each."""
+
+        ids = [row['id'] for row in rows]
+        for name in self.values_relations():
+            related = list(self.relation_rows(name, ids)) if ids else []
+            self._attach_relation(rows, name, related)
+
+    async def afetch_relations(self, rows):
+        """Add the relations to `values()` rows using the async ORM."""
+
+        ids = [row['id'] for row in rows]
+        for name in self.values_relations():
+            related = []
+            if ids:
+                related = [
+                    item async for item in self.relation_rows(name, ids)
+                ]
+            self._attach_relation(rows, name, related)
+
+    @staticmethod
+    def _attach_relation(rows, name, related):
+        """Set name on every row to its items among related."""
+
+        by_id = {}
+        for row in rows:
+            row[name] = []
+            by_id[row['id']] = row[name]
+        for row_id, pk, label in related:
+            by_id[row_id].append({'id': pk, 'name': label})
+
+    def to_representation(self, instance):
+        """Return the representation of instance, timed as serialization."""
+
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+    def represent_values(self, rows):
+        """Return representations of `values()` rows.
+
+        Only fields whose representation differs from the database
+        value, such as decimals, go through the serializer field.
+        """
+
+        with timed('serialize'):
+            return self._represent_values(rows)
+
+    def _represent_values(self, rows):
+        """Build the representations for `represent_values`."""
+
+        names = [(name, field.source) for name, field in self.fields.items()]
+        relations = self.values_relations()
+        converters = [
+            (name, field.to_representation)
+            for name, field in self.fields.items()
+            if not isinstance(field, PASSTHROUGH_FIELDS)
+            and field.source not in relations
+        ]
+
+        data = []
+        for row in rows:
+            item = {name: row[source] for name, source in names}
+            for name, convert in converters:
+                if item[name] is not None:
+                    item[name] = convert(item[name])
+            data.append(item)
+
+        return data
+
+
+class TagSerializer(serializers.ModelSerializer):
+    """Serializer for tags."""
+
+    class Meta:
+        """Contains settings for serializer class"""
+
+        model = Tag
+        fields = ['id', 'name']
+        read_only_fields = ['id']
+
+
+class IngredientSerializer(serializers.ModelSerializer):
+    """Serializer for ingredients."""
+
+    class Meta:
+        """Contains settings for serializer class"""
+
+        model = Ingredient
+        fields = ['id', 'name']
+        read_only_fields = ['id']
+
+
+class RecipesSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Serializer for recipes.
+
+    Tags and ingredients are written by name. Missing ones are created
+    for the recipe's user, and given ones replace the recipe's current
+    ones on update.
+    """
+
+    tags = TagSerializer(many=True, required=False)
+    ingredients = IngredientSerializer(many=True, required=False)
 
     class Meta:
         """Contains settings for serializer class"""
 
         model = Recipes
-        fields = ['id', 'title', 'time_minutes', 'price', 'link']
+        fields = [
+            'id', 'title', 'time_minutes', 'price', 'link',
+            'tags', 'ingredients',
+        ]
         read_only_fields = ['id']
 
+    def create(self, validated_data):
+        """Create a recipe with its tags and ingredients."""
+
+        relations = pop_relations(validated_data)
+        recipe = super().create(validated_data)
+        save_relations([(recipe, relations)])
+
+        return recipe
+
+    def update(self, instance, validated_data):
+        """Update a recipe, replacing the tags and ingredients given."""
+
+        relations = pop_relations(validated_data)
+        recipe = super().update(instance, validated_data)
+        save_relations([(recipe, relations)], replace=True)
+        # relations prefetched before the update are stale.
+        recipe._prefetched_objects_cache = {}
+
+        return recipe
+
+
+@extend_schema_field({
+    'type': 'object',
+    'nullable': True,
+    'readOnly': True,
+    'properties': {
+        'url': {'type': 'string', 'format': 'uri'},
+        'thumbnail': {'type': 'string', 'format': 'uri', 'nullable': True},
+    },
+    'required': ['url', 'thumbnail'],
+})
+class RecipeImageField(serializers.Field):
+    """URLs of the image of a recipe and of its thumbnail.
+
+    Null for recipes without an image, the thumbnail is null until it
+    has been rendered.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value.image:
+            return None
+
+        url = reverse(
+            'recipes:recipes-image', args=[value.pk],
+            request=self.context.get('request'),
+        )
+
+        return {
+            'url': url,
+            'thumbnail': f'{url}?size=thumbnail' if value.thumbnail else None,
+        }
+
 
 class RecipeDetailSerializer(RecipesSerializer):
     """Serializes Recipe details.
@@ -24,7 +491,78 @@ class RecipeDetailSerializer(RecipesSerializer):
     Extends RecipesSerializer
     """
 
+    image = RecipeImageField()
+
     class Meta(RecipesSerializer.Meta):
         """Contains settings for serializer class"""
 
-        fields = RecipesSerializer.Meta.fields + ['description']
+        fields = RecipesSerializer.Meta.fields + ['description', 'image']
+        list_serializer_class = RecipeListSerializer
+
+
+class UserRecipeStatsSerializer(serializers.ModelSerializer):
+    """Serializes the recipe stats of a user."""
+
+    average_price = serializers.DecimalField(
+        max_digits=20, decimal_places=2, read_only=True
+    )
+    average_time_minutes = serializers.FloatField(read_only=True)
+
+    class Meta:
+        """Contains settings for serializer class"""
+
+        model = UserRecipeStats
+        fields = [
+            'recipe_count',
+            'average_price',
+            'average_time_minutes',
+            'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class RecipeBulkDeleteSerializer(serializers.Serializer):
+    """Serializes the ids of recipes to delete."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPES_BULK_MAX_ITEMS,
+    )
+
+
+class IdListField(serializers.CharField):
+    """Comma separated list of positive ids."""
+
+    default_error_messages = {
+        'invalid': _('Enter a comma separated list of ids.'),
+    }
+
+    def to_internal_value(self, data):
+        """Return the ids of data as a sorted list without duplicates."""
+
+        value = super().to_internal_value(data)
+        try:
+            ids = {int(item) for item in value.split(',') if item.strip()}
+        except ValueError:
+            self.fail('invalid')
+        if not ids or min(ids) < 1:
+            self.fail('invalid')
+
+        return sorted(ids)
+
+
+class RecipeFilterSerializer(serializers.Serializer):
+    """Validates the filter query parameters of the recipes list."""
+
+    min_price = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=0, required=False
+    )
+    max_price = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=0, required=False
+    )
+    min_time = serializers.IntegerField(min_value=0, required=False)
+    max_time = serializers.IntegerField(min_value=0, required=False)
+    title = serializers.CharField(max_length=255, required=False)
+    tags = IdListField(required=False)
+    ingredients = IdListField(required=False)
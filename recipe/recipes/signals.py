@@ -0,0 +1,90 @@
+"""
+Signal handlers for recipes app.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.deletion import user_purging
+
+from .cache import bump_user_version
+from .images import delete_files, get_image_storage
+from .models import IMAGE_COLUMNS, Recipes, UserRecipeStats
+from .stats import record_created, record_deleted, record_updated
+
+# Fields whose changes are counted in the stats of the user.
+STATS_FIELDS = {'user', 'user_id', 'price', 'time_minutes'}
+
+
+@receiver(post_save, sender=Recipes)
+@receiver(post_delete, sender=Recipes)
+def recipe_changed(sender, instance, origin=None, **kwargs):
+    """Invalidate cached responses of the recipe owner.
+
+    Recipes deleted with a queryset are invalidated by the caller, once
+    per request rather than once per recipe.
+    """
+
+    if not isinstance(origin, QuerySet):
+        bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_created_stats(sender, instance, created, raw, **kwargs):
+    """Create the empty stats of a new user.
+
+    Recipe writes then always find the row to add to.
+    """
+
+    if created and not raw:
+        UserRecipeStats.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Recipes)
+def recipe_saved_stats(sender, instance, created, update_fields, **kwargs):
+    """Add a saved recipe to the stats of its user.
+
+    Recipes saved with `bulk_create` and `bulk_update` send no signal,
+    their callers record them.
+    """
+
+    if created:
+        record_created([instance])
+    elif update_fields is None or STATS_FIELDS & set(update_fields):
+        record_updated([instance])
+
+
+@receiver(post_delete, sender=Recipes)
+def recipe_deleted(sender, instance, origin=None, **kwargs):
+    """Delete the image files of a deleted recipe and uncount it.
+
+    Recipes deleted with a queryset are uncounted by the caller, with
+    one query per user rather than one per recipe.
+    """
+
+    delete_files(instance.image.name, instance.thumbnail.name)
+    if not isinstance(origin, QuerySet):
+        record_deleted([instance])
+
+
+@receiver(user_purging)
+def user_purging_images(sender, user_id, **kwargs):
+    """Delete the image files of a user whose recipes are purged.
+
+    The recipes are deleted without signals, so without
+    `recipe_deleted`.
+    """
+
+    storage = get_image_storage()
+    names = Recipes.objects.filter(
+        user_id=user_id, image__isnull=False
+    ).values_list(*IMAGE_COLUMNS).iterator(
+        chunk_size=settings.USER_PURGE_BATCH_SIZE
+    )
+    for row in names:
+        for name in row:
+            if name:
+                storage.delete(name)
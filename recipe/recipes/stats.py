@@ -0,0 +1,205 @@
+"""
+Per-user recipe statistics maintained incrementally.
+
+Every write to recipes adds its difference to the `UserRecipeStats` row
+of the owner with `F()` expressions, so concurrent writes are summed by
+the database instead of overwriting each other, and dashboards read one
+row instead of aggregating the recipes table. `reconcile_stats`
+recomputes the rows from the recipes, repairing drift from writes that
+bypass the ORM.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import STATS_ATTNAMES, Recipes, UserRecipeStats
+
+
+def counted(recipe):
+    """Return the values of recipe counted in its user's stats.
+
+    Values are converted as they are stored, e.g. a price given as a
+    string.
+    """
+
+    return tuple(
+        Recipes._meta.get_field(name).to_python(getattr(recipe, name))
+        for name in STATS_ATTNAMES
+    )
+
+
+def counted_totals(stats):
+    """Return the count and totals of a `UserRecipeStats` row."""
+
+    return (stats.recipe_count, stats.price_total, stats.time_minutes_total)
+
+
+def add_stats(user_id, count, price, time_minutes):
+    """Add the changes to the stats of a user, creating its row if needed.
+
+    Costs one UPDATE once the row exists.
+    """
+
+    queryset = UserRecipeStats.objects.filter(user_id=user_id)
+    changes = {
+        'recipe_count': F('recipe_count') + count,
+        'price_total': F('price_total') + price,
+        'time_minutes_total': F('time_minutes_total') + time_minutes,
+        'updated_at': timezone.now(),
+    }
+    if queryset.update(**changes):
+        return
+
+    try:
+        with transaction.atomic():
+            UserRecipeStats.objects.create(
+                user_id=user_id,
+                recipe_count=count,
+                price_total=price,
+                time_minutes_total=time_minutes,
+            )
+    except IntegrityError:
+        # created meanwhile by another write of the same user.
+        queryset.update(**changes)
+
+
+class StatsChanges:
+    """Sums the changes of many recipes, then adds them per user."""
+
+    def __init__(self):
+        self.users = {}
+
+    def add(self, values, sign=1):
+        """Count the recipe values, or uncount them with sign -1."""
+
+        user_id, price, time_minutes = values
+        totals = self.users.setdefault(user_id, [0, Decimal(0), 0])
+        totals[0] += sign
+        totals[1] += sign * price
+        totals[2] += sign * time_minutes
+
+    def save(self):
+        """Add the summed changes to the stats, one query per user."""
+
+        for user_id, (count, price, time_minutes) in self.users.items():
+            if count or price or time_minutes:
+                add_stats(user_id, count, price, time_minutes)
+
+
+def record_created(recipes):
+    """Count new recipes in the stats of their users."""
+
+    changes = StatsChanges()
+    for recipe in recipes:
+        recipe._stats_counted = counted(recipe)
+        changes.add(recipe._stats_counted)
+    changes.save()
+
+
+def record_updated(recipes):
+    """Add the changes of updated recipes to the stats of their users.
+
+    Recipes not loaded from the database with their counted values are
+    skipped, they are repaired by `reconcile_stats`.
+    """
+
+    changes = StatsChanges()
+    for recipe in recipes:
+        before = getattr(recipe, '_stats_counted', None)
+        if before is None:
+            continue
+        after = counted(recipe)
+        if after != before:
+            changes.add(before, -1)
+            changes.add(after)
+        recipe._stats_counted = after
+    changes.save()
+
+
+def record_deleted(recipes):
+    """Remove deleted recipes from the stats of their users."""
+
+    changes = StatsChanges()
+    for recipe in recipes:
+        before = getattr(recipe, '_stats_counted', None)
+        changes.add(before or counted(recipe), -1)
+    changes.save()
+
+
+def reconcile_stats(batch_size=None):
+    """Recompute the stats of every user from their recipes.
+
+    Users are handled in batches of `RECIPES_STATS_BATCH_SIZE`, each
+    with one aggregate query in its own transaction. Yields the number
+    of rows corrected by every batch.
+    """
+
+    batch_size = batch_size or settings.RECIPES_STATS_BATCH_SIZE
+    users = get_user_model().objects.order_by('pk')
+    last = None
+    while True:
+        if last is not None:
+            users = users.filter(pk__gt=last)
+        ids = list(users.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        last = ids[-1]
+
+        with transaction.atomic():
+            corrected = reconcile_users(ids)
+        yield corrected
+
+
+def reconcile_users(ids):
+    """Recompute the stats of the users with ids, within a transaction.
+
+    The rows are locked first, so increments of concurrent writes wait
+    and are added to the recomputed totals. Returns the number of rows
+    corrected.
+    """
+
+    stats = {
+        row.user_id: row
+        for row in UserRecipeStats.objects.select_for_update().filter(
+            user_id__in=ids
+        )
+    }
+    actual = {
+        row['user_id']: row
+        for row in Recipes.objects.filter(user_id__in=ids).order_by().values(
+            'user_id'
+        ).annotate(
+            count=Count('id'), price=Sum('price'), minutes=Sum('time_minutes')
+        )
+    }
+
+    stale = []
+    missing = []
+    for user_id in ids:
+        row = actual.get(user_id, {})
+        values = {
+            'recipe_count': row.get('count', 0),
+            'price_total': row.get('price') or Decimal(0),
+            'time_minutes_total': row.get('minutes') or 0,
+        }
+        current = stats.get(user_id)
+        if current is None:
+            missing.append(UserRecipeStats(user_id=user_id, **values))
+            continue
+        if counted_totals(current) != tuple(values.values()):
+            for name, value in values.items():
+                setattr(current, name, value)
+            current.updated_at = timezone.now()
+            stale.append(current)
+
+    UserRecipeStats.objects.bulk_create(missing, ignore_conflicts=True)
+    UserRecipeStats.objects.bulk_update(stale, [
+        'recipe_count', 'price_total', 'time_minutes_total', 'updated_at',
+    ])
+
+    return len(missing) + len(stale)
@@ -0,0 +1,93 @@
+"""
+Background tasks of recipes app.
+"""
+
+import tempfile
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from jobs.queue import task
+
+from .cache import bump_user_version
+from .export import EXPORTERS
+from .images import get_image_storage, thumbnail_name
+from .importer import import_recipes
+from .models import Recipes
+from .thumbnails import make_thumbnail
+
+
+@task('recipes.import', max_attempts=1)
+def import_file(job):
+    """Import the file saved by the import endpoint, then delete it.
+
+    The progress of each batch is saved on the job. Not retried, since
+    batches already saved would be imported twice.
+    """
+
+    name = job.payload['file']
+    try:
+        summary = None
+        if job.user is not None:
+            with default_storage.open(name, 'rb') as upload:
+                for summary in import_recipes(
+                    job.user, upload, job.payload['input']
+                ):
+                    job.report(summary)
+    finally:
+        default_storage.delete(name)
+
+    return summary
+
+
+@task('recipes.export')
+def export_file(job):
+    """Write every recipe of the job's user to a file in storage.
+
+    The file is spooled to a temporary file as it is generated, so
+    memory use does not grow with the number of recipes.
+    """
+
+    output = job.payload['output']
+    exporter, content_type = EXPORTERS[output]
+    queryset = Recipes.objects.filter(user_id=job.user_id).order_by('id')
+
+    with tempfile.TemporaryFile() as spool:
+        for chunk in exporter(queryset):
+            spool.write(chunk.encode())
+        spool.seek(0)
+        name = default_storage.save(
+            f'jobs/{job.id}/recipes.{output}', File(spool)
+        )
+
+    return {'file': name, 'content_type': content_type}
+
+
+@task('recipes.thumbnail')
+def thumbnail_recipe_image(job):
+    """Render the thumbnail of a recipe image, stored next to it.
+
+    Nothing is done when the recipe was deleted or its image replaced
+    since the job was queued.
+    """
+
+    name = job.payload['image']
+    current = Recipes.objects.filter(pk=job.payload['recipe'], image=name)
+    recipe = current.only('id', 'user_id').first()
+    if recipe is None:
+        return None
+
+    storage = get_image_storage()
+    with storage.open(name, 'rb') as image:
+        data = image.read()
+    thumbnail = storage.save(
+        thumbnail_name(name), ContentFile(make_thumbnail(data))
+    )
+
+    if not current.update(thumbnail=thumbnail):
+        storage.delete(thumbnail)
+        return None
+    bump_user_version(recipe.user_id)
+
+    return {'thumbnail': thumbnail}
@@ -0,0 +1,193 @@
+"""
+Tests for the ASGI native recipe views.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from user.authentication import local_token_cache
+
+from recipe.tests.test_throttling import throttle_rates
+
+from ..async_views import AsyncRecipeDetailView, AsyncRecipeListView
+from ..models import Recipes
+from ..serializers import RecipeDetailSerializer, RecipesSerializer
+
+from .test_recipes_api import create_recipe
+
+RECIPES_URL = '/async/recipes/'
+
+urlpatterns = [
+    path('async/recipes/', AsyncRecipeListView.as_view()),
+    path('async/recipes/<int:pk>/', AsyncRecipeDetailView.as_view()),
+]
+
+
+def recipe_detail_url(recipe_id):
+    """Return the async recipe details url."""
+
+    return f'{RECIPES_URL}{recipe_id}/'
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncRecipeApiTests(TestCase):
+    """Test the async recipe views."""
+
+    def setUp(self):
+        cache.clear()
+        local_token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        token = Token.objects.create(user=self.user)
+        self.headers = {'Authorization': f'Token {token.key}'}
+
+    async def test_auth_required(self):
+        """Test auth is required to call the async views."""
+
+        res = await self.async_client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    async def test_list_recipes(self):
+        """Test listing matches the serializer output."""
+
+        await Recipes.objects.acreate(
+            user=self.user, title='One', time_minutes=5, price=Decimal('1')
+        )
+        await Recipes.objects.acreate(
+            user=self.user, title='Two', time_minutes=5, price=Decimal('2')
+        )
+
+        res = await self.async_client.get(RECIPES_URL, headers=self.headers)
+
+        recipes = [
+            recipe async for recipe in
+            Recipes.objects.with_relations().order_by('-id')
+        ]
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.json()['results'],
+            RecipesSerializer(recipes, many=True).data
+        )
+
+    async def test_list_paginated_and_filtered(self):
+        """Test async list supports filters and keyset pages."""
+
+        for minutes in [5, 10, 15, 60]:
+            await Recipes.objects.acreate(
+                user=self.user, title='Recipe', time_minutes=minutes,
+                price=Decimal('1')
+            )
+
+        res = await self.async_client.get(
+            RECIPES_URL,
+            {'max_time': 30, 'ordering': 'time_minutes', 'page_size': 2},
+            headers=self.headers,
+        )
+        first = res.json()
+        res = await self.async_client.get(
+            first['next'], headers=self.headers
+        )
+
+        self.assertEqual(
+            [item['time_minutes'] for item in first['results']], [5, 10]
+        )
+        self.assertEqual(
+            [item['time_minutes'] for item in res.json()['results']], [15]
+        )
+
+    async def test_list_throttled(self):
+        """Test the async views apply the recipe rate limit."""
+
+        with self.settings(REST_FRAMEWORK=throttle_rates(recipes='1/min')):
+            await self.async_client.get(RECIPES_URL, headers=self.headers)
+            res = await self.async_client.get(
+                RECIPES_URL, headers=self.headers
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        self.assertEqual(res['X-RateLimit-Remaining'], '0')
+
+    async def test_create_recipe(self):
+        """Test creating a recipe with the async ORM."""
+
+        payload = {'title': 'Soup', 'time_minutes': 3, 'price': '3.00'}
+
+        res = await self.async_client.post(
+            RECIPES_URL, payload, content_type='application/json',
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = await Recipes.objects.aget(id=res.json()['id'])
+        self.assertEqual(recipe.user_id, self.user.id)
+        self.assertEqual(recipe.price, Decimal('3.00'))
+
+    async def test_create_invalid_recipe(self):
+        """Test validation errors are returned as bad request."""
+
+        payload = {'title': 'Soup', 'time_minutes': 'soon', 'price': '3'}
+
+        res = await self.async_client.post(
+            RECIPES_URL, payload, content_type='application/json',
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('time_minutes', res.json())
+
+    def test_get_recipe_detail(self):
+        """Test retrieving a recipe and revalidating its ETag."""
+
+        recipe = create_recipe(user=self.user)
+        url = recipe_detail_url(recipe.id)
+
+        res = self.client.get(url, headers=self.headers)
+        not_modified = self.client.get(
+            url, headers={**self.headers, 'If-None-Match': res['ETag']}
+        )
+
+        self.assertEqual(res.json(), RecipeDetailSerializer(recipe).data)
+        self.assertEqual(
+            not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+
+    def test_other_users_recipe_not_found(self):
+        """Test another user's recipe is not found."""
+
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'password@123'
+        )
+        recipe = create_recipe(user=other_user)
+
+        res = self.client.get(
+            recipe_detail_url(recipe.id), headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_passed_to_view_set(self):
+        """Test updates are handled by the sync view set."""
+
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.patch(
+            recipe_detail_url(recipe.id), {'title': 'Updated'},
+            content_type='application/json', headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Updated')
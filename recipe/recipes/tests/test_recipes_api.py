@@ -2,21 +2,48 @@
 Tests recipe apis.
 """
 
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
 from decimal import Decimal
+from importlib.util import find_spec
+from unittest import skipUnless
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
 
-from ..models import Recipes
+from jobs.models import Job
+from jobs.queue import run_pending
+from recipe.testing import BudgetAPIClient, count_queries
 
-from ..serializers import RecipesSerializer, RecipeDetailSerializer
+from ..images import get_image_storage, save_image
+from ..models import Ingredient, Recipes, Tag, UserRecipeStats
+from ..pagination import RecipeCursorPagination
+from ..thumbnails import render_thumbnail
+
+from ..serializers import (
+    RecipesSerializer,
+    RecipeDetailSerializer,
+    get_or_create_named,
+)
 
 
 RECIPES_URL = reverse('recipes:recipes-list')
+RECIPES_BULK_URL = reverse('recipes:recipes-bulk')
+RECIPES_EXPORT_URL = reverse('recipes:recipes-export')
+RECIPES_IMPORT_URL = reverse('recipes:recipes-import')
 
 
 def recipe_detail_url(recipe_id):
@@ -25,6 +52,33 @@ def recipe_detail_url(recipe_id):
     return reverse('recipes:recipes-detail', args=[recipe_id])
 
 
+def recipe_image_url(recipe_id):
+    """Return the image url of a recipe."""
+
+    return reverse('recipes:recipes-image', args=[recipe_id])
+
+
+def use_temporary_media(test):
+    """Store the files of test in a directory removed after it."""
+
+    media = tempfile.mkdtemp()
+    override = test.settings(MEDIA_ROOT=media)
+    override.enable()
+    test.addCleanup(override.disable)
+    test.addCleanup(shutil.rmtree, media, ignore_errors=True)
+
+
+def run_job(test, res):
+    """Run the job queued by the 202 response res and return its state."""
+
+    test.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+    run_pending()
+    res = test.client.get(res['Location'])
+    test.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    return res.data
+
+
 def create_recipe(user, **params):
     """Create and return a sample recipe."""
 
@@ -45,7 +99,7 @@ class PublicRecipeApiTests(TestCase):
     """Test unauthenticated API requests."""
 
     def setUp(self):
-        self.client = APIClient()
+        self.client = BudgetAPIClient()
 
     def test_auth_required(self):
         """Test auth is required to call API."""
@@ -60,7 +114,8 @@ class PrivateRecipeApiTests(TestCase):
 
     # set up user and force authenticate it.
     def setUp(self):
-        self.client = APIClient()
+        cache.clear()
+        self.client = BudgetAPIClient()
         self.user = get_user_model().objects.create_user(
             'user@example.com',
             'testpass@123'
@@ -79,7 +134,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipesSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_limited_to_user(self):
         """Test list of recipes is limited to authenticated user."""
@@ -92,11 +147,11 @@ class PrivateRecipeApiTests(TestCase):
         create_recipe(user=other_user)
 
         res = self.client.get(RECIPES_URL)
-        recipes = Recipes.objects.filter(user=self.user)
+        recipes = Recipes.objects.filter(user=self.user).order_by('-id')
         serializer = RecipesSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """Tests GET request for a recipe details."""
@@ -125,3 +180,1178 @@ class PrivateRecipeApiTests(TestCase):
         for key, val in payload.items():
             self.assertEqual(getattr(recipe, key), val)
         self.assertEqual(recipe.user, self.user)
+
+
+class RecipePaginationApiTests(TestCase):
+    """Test keyset pagination of the recipes list."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_pages_follow_cursor(self):
+        """Test walking every page with the next cursor."""
+
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+        expected_ids = [recipe.id for recipe in reversed(recipes)]
+
+        seen_ids = []
+        url = RECIPES_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen_ids += [item['id'] for item in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(seen_ids, expected_ids)
+
+    def test_page_size_capped(self):
+        """Test requested page size cannot exceed the maximum."""
+
+        for _ in range(3):
+            create_recipe(user=self.user)
+
+        with patch.object(RecipeCursorPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPES_URL, {'page_size': 100})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_tampered_cursor_rejected(self):
+        """Test a forged cursor returns not found."""
+
+        for _ in range(3):
+            create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 1})
+        cursor = parse_qs(urlparse(res.data['next']).query)['cursor'][0]
+
+        res = self.client.get(RECIPES_URL, {'cursor': cursor + 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecipeResponseCacheTests(TestCase):
+    """Test the versioned response cache of recipe reads."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list does not query the database."""
+
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_create_invalidates_list(self):
+        """Test creating a recipe shows up in the next list."""
+
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        payload = {'title': 'New', 'time_minutes': 3, 'price': Decimal(3)}
+        self.client.post(RECIPES_URL, payload)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_update_invalidates_detail(self):
+        """Test updating a recipe shows up in the next retrieve."""
+
+        recipe = create_recipe(user=self.user)
+        url = recipe_detail_url(recipe.id)
+        self.client.get(url)
+
+        self.client.patch(url, {'title': 'Updated'})
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['title'], 'Updated')
+
+    def test_if_none_match_returns_not_modified(self):
+        """Test a matching ETag returns 304."""
+
+        recipe = create_recipe(user=self.user)
+        url = recipe_detail_url(recipe.id)
+        res = self.client.get(url)
+        etag = res['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_after_write(self):
+        """Test a stale ETag gets the full response after a write."""
+
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(RECIPES_URL)['ETag']
+        self.client.delete(recipe_detail_url(recipe.id))
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+
+class RecipeBulkApiTests(TestCase):
+    """Test the bulk recipe endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create(self):
+        """Test creating many recipes in one request."""
+
+        payload = [
+            {'title': f'Recipe {i}', 'time_minutes': i, 'price': '1.50'}
+            for i in range(1, 4)
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        recipes = Recipes.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+
+    def test_bulk_create_item_errors(self):
+        """Test an invalid item rejects the whole batch with its error."""
+
+        payload = [
+            {'title': 'Good', 'time_minutes': 5, 'price': '1.50'},
+            {'title': 'Bad', 'time_minutes': 5, 'price': '12345.00'},
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price', res.data[1])
+        self.assertFalse(Recipes.objects.filter(user=self.user).exists())
+
+    def test_bulk_update(self):
+        """Test partially updating many recipes in one request."""
+
+        first = create_recipe(user=self.user)
+        second = create_recipe(user=self.user)
+        payload = [
+            {'id': first.id, 'title': 'First'},
+            {'id': second.id, 'time_minutes': 42},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.title, 'First')
+        self.assertEqual(second.time_minutes, 42)
+
+    def test_bulk_update_other_users_recipe(self):
+        """Test updating another user's recipe reports it as not found."""
+
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'password@123'
+        )
+        recipe = create_recipe(user=other_user)
+        payload = [{'id': recipe.id, 'title': 'Stolen'}]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'sample title')
+
+    def test_bulk_delete(self):
+        """Test deleting many recipes in one request."""
+
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        ids = [recipe.id for recipe in recipes[:2]] + [999999]
+
+        res = self.client.delete(
+            RECIPES_BULK_URL, {'ids': ids}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 2)
+        self.assertEqual(res.data['not_found'], [999999])
+        remaining = Recipes.objects.filter(user=self.user)
+        self.assertEqual(list(remaining), [recipes[2]])
+
+    @patch('recipes.views.bump_user_version')
+    @patch('recipes.signals.bump_user_version')
+    def test_bulk_delete_bumps_version_once(self, per_recipe, per_request):
+        """Test a bulk delete invalidates the cache once, not per recipe."""
+
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        per_recipe.reset_mock()
+
+        self.client.delete(
+            RECIPES_BULK_URL,
+            {'ids': [recipe.id for recipe in recipes]},
+            format='json',
+        )
+
+        per_recipe.assert_not_called()
+        per_request.assert_called_once_with(self.user.pk)
+
+
+class RecipeExportApiTests(TestCase):
+    """Test background export of recipes."""
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'password@123'
+        )
+        self.recipes = [create_recipe(user=self.user) for _ in range(3)]
+        create_recipe(user=other_user)
+
+    def export(self, **params):
+        """Export recipes and return the downloaded file response."""
+
+        job = run_job(self, self.client.get(RECIPES_EXPORT_URL, params))
+        self.assertEqual(job['status'], Job.Status.SUCCEEDED)
+
+        res = self.client.get(reverse('jobs:job-file', args=[job['id']]))
+        self.addCleanup(res.close)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as NDJSON."""
+
+        res = self.export()
+        content = b''.join(res.streaming_content).decode()
+        rows = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [recipe.id for recipe in self.recipes]
+        )
+        self.assertEqual(rows[0]['price'], '5.25')
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV."""
+
+        res = self.export(output='csv')
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['title'], 'sample title')
+
+    def test_export_unknown_format(self):
+        """Test an unsupported export format is rejected."""
+
+        res = self.client.get(RECIPES_EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+
+class RecipeImportApiTests(TestCase):
+    """Test background import of recipes."""
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def import_file(self, name, content, **params):
+        """Upload content, run the import and return its summary."""
+
+        upload = SimpleUploadedFile(name, content.encode())
+        url = RECIPES_IMPORT_URL
+        if params:
+            url += '?' + '&'.join(f'{k}={v}' for k, v in params.items())
+        res = self.client.post(url, {'file': upload}, format='multipart')
+        job = run_job(self, res)
+        self.assertEqual(job['status'], Job.Status.SUCCEEDED)
+
+        return job['result']
+
+    def test_import_ndjson(self):
+        """Test importing recipes from NDJSON with row errors."""
+
+        lines = [
+            {'title': 'One', 'time_minutes': 5, 'price': '1.50'},
+            {'title': 'Two', 'time_minutes': 'soon', 'price': '1.50'},
+            {'title': 'Three', 'time_minutes': 7, 'price': '2.00'},
+        ]
+        content = '\n'.join(json.dumps(line) for line in lines) + '\nnope\n'
+
+        summary = self.import_file('recipes.ndjson', content)
+
+        self.assertTrue(summary['done'])
+        self.assertEqual(summary['processed'], 4)
+        self.assertEqual(summary['created'], 2)
+        self.assertEqual(summary['failed'], 2)
+        self.assertEqual([error['row'] for error in summary['errors']], [2, 4])
+        self.assertIn('time_minutes', summary['errors'][0]['errors'])
+        self.assertEqual(
+            Recipes.objects.filter(user=self.user).count(), 2
+        )
+
+    def test_import_csv_in_batches(self):
+        """Test importing recipes from CSV reports progress per batch."""
+
+        rows = ['title,time_minutes,price,description']
+        rows += [f'Recipe {i},{i},1.25,Tasty' for i in range(5)]
+
+        with self.settings(RECIPES_IMPORT_BATCH_SIZE=2), patch.object(
+            Job, 'report', autospec=True
+        ) as report:
+            self.import_file('upload.txt', '\n'.join(rows), input='csv')
+
+        self.assertEqual(
+            [call.args[1]['created'] for call in report.call_args_list],
+            [2, 4, 5]
+        )
+        recipe = Recipes.objects.filter(user=self.user).first()
+        self.assertEqual(recipe.description, 'Tasty')
+        self.assertEqual(recipe.price, Decimal('1.25'))
+
+    def test_import_batch_saved_atomically(self):
+        """Test a batch failing partway leaves none of its recipes."""
+
+        rows = ['title,time_minutes,price']
+        rows += [f'Recipe {i},{i},1.25' for i in range(3)]
+        upload = SimpleUploadedFile('recipes.csv', '\n'.join(rows).encode())
+
+        with self.settings(RECIPES_IMPORT_BATCH_SIZE=2), patch(
+            'recipes.importer.save_relations',
+            side_effect=[None, RuntimeError('boom')],
+        ):
+            res = self.client.post(
+                RECIPES_IMPORT_URL, {'file': upload}, format='multipart'
+            )
+            job = run_job(self, res)
+
+        self.assertEqual(job['status'], Job.Status.FAILED)
+        self.assertEqual(Recipes.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            UserRecipeStats.objects.get(user=self.user).recipe_count, 2
+        )
+
+    def test_import_price_too_large(self):
+        """Test prices over the field precision are rejected."""
+
+        content = 'title,time_minutes,price\nPricey,5,123456\n'
+
+        summary = self.import_file('recipes.csv', content)
+
+        self.assertEqual(summary['created'], 0)
+        self.assertIn('price', summary['errors'][0]['errors'])
+
+    def test_import_unknown_format(self):
+        """Test an unsupported import format is rejected."""
+
+        upload = SimpleUploadedFile('recipes.xml', b'<recipes/>')
+
+        res = self.client.post(
+            RECIPES_IMPORT_URL, {'file': upload}, format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeImageApiTests(TestCase):
+    """Test uploading and serving recipe images."""
+
+    # the signature of a PNG file, all the upload checks read.
+    PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.url = recipe_image_url(self.recipe.id)
+
+    def upload(self, content=PNG, name='photo.png'):
+        """Upload content as the image of the recipe."""
+
+        return self.client.post(
+            self.url,
+            {'image': SimpleUploadedFile(name, content)},
+            format='multipart',
+        )
+
+    def test_upload_image(self):
+        """Test an uploaded image is stored and linked from the detail."""
+
+        res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['name'], 'recipes.thumbnail')
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+        with get_image_storage().open(self.recipe.image.name) as stored:
+            self.assertEqual(stored.read(), self.PNG)
+
+        res = self.client.get(recipe_detail_url(self.recipe.id))
+
+        self.assertEqual(
+            res.data['image'],
+            {'url': f'http://testserver{self.url}', 'thumbnail': None},
+        )
+
+    def test_recipe_without_image(self):
+        """Test recipes without an image have none to serve."""
+
+        res = self.client.get(recipe_detail_url(self.recipe.id))
+
+        self.assertIsNone(res.data['image'])
+        self.assertEqual(
+            self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND
+        )
+
+    def test_upload_rejects_non_images(self):
+        """Test files other than images are refused."""
+
+        res = self.upload(b'title,price\n', name='photo.png')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+    def test_upload_rejects_large_images(self):
+        """Test images over the size limit are refused."""
+
+        with self.settings(RECIPES_IMAGE_MAX_SIZE=32):
+            res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_serve_image(self):
+        """Test the image is streamed with an ETag to revalidate."""
+
+        self.upload()
+
+        res = self.client.get(self.url, HTTP_ACCEPT='image/*')
+        self.addCleanup(res.close)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/png')
+        self.assertEqual(b''.join(res.streaming_content), self.PNG)
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_serve_image_with_web_server(self):
+        """Test images are handed to the web server when configured."""
+
+        self.upload()
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+
+        with self.settings(RECIPES_IMAGE_SENDFILE='x-sendfile'):
+            res = self.client.get(self.url)
+        self.assertEqual(res['X-Sendfile'], get_image_storage().path(name))
+        self.assertEqual(res.content, b'')
+
+        with self.settings(
+            RECIPES_IMAGE_SENDFILE='x-accel-redirect',
+            RECIPES_IMAGE_ACCEL_PREFIX='/protected/',
+        ):
+            res = self.client.get(self.url)
+        self.assertEqual(res['X-Accel-Redirect'], f'/protected/{name}')
+
+    @patch('recipes.tasks.make_thumbnail', return_value=b'thumbnail')
+    def test_thumbnail_rendered_by_job(self, make_thumbnail):
+        """Test the job stores the thumbnail and the detail links it."""
+
+        job = run_job(self, self.upload())
+
+        self.assertEqual(job['status'], Job.Status.SUCCEEDED)
+        make_thumbnail.assert_called_once_with(self.PNG)
+        res = self.client.get(recipe_detail_url(self.recipe.id))
+        self.assertEqual(
+            res.data['image']['thumbnail'],
+            f'http://testserver{self.url}?size=thumbnail',
+        )
+
+        res = self.client.get(self.url, {'size': 'thumbnail'})
+        self.addCleanup(res.close)
+
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(b''.join(res.streaming_content), b'thumbnail')
+
+    @patch('recipes.tasks.make_thumbnail', return_value=b'thumbnail')
+    def test_replaced_image_not_thumbnailed(self, make_thumbnail):
+        """Test a replaced image is deleted and not thumbnailed."""
+
+        self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+        self.recipe.refresh_from_db()
+
+        run_pending()
+
+        make_thumbnail.assert_called_once()
+        name = os.path.basename(self.recipe.image.name)
+        directory = os.path.dirname(get_image_storage().path(
+            self.recipe.image.name
+        ))
+        self.assertEqual(sorted(os.listdir(directory)), [
+            name.replace('.png', '-thumbnail.jpg'), name,
+        ])
+
+    def test_upload_to_deleted_recipe_not_kept(self):
+        """Test the upload is deleted when the recipe went meanwhile."""
+
+        Recipes.objects.filter(pk=self.recipe.pk).delete()
+        upload = SimpleUploadedFile('photo.png', self.PNG)
+
+        with self.assertRaises(Recipes.DoesNotExist):
+            save_image(self.recipe, upload, 'png')
+
+        directory = get_image_storage().path(
+            f'recipes/{self.user.id}/{self.recipe.id}'
+        )
+        self.assertEqual(os.listdir(directory), [])
+
+    def test_delete_image(self):
+        """Test removing the image deletes its file."""
+
+        self.upload()
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(get_image_storage().exists(name))
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_delete_recipe_deletes_image(self):
+        """Test the image file goes with its recipe."""
+
+        self.upload()
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(recipe_detail_url(self.recipe.id))
+
+        self.assertFalse(get_image_storage().exists(name))
+
+    @skipUnless(find_spec('PIL'), 'Pillow is not installed')
+    def test_render_thumbnail(self):
+        """Test thumbnails are JPEG images fitting the size."""
+
+        from PIL import Image
+
+        source = io.BytesIO()
+        Image.new('RGBA', (800, 400), 'red').save(source, 'PNG')
+
+        data = render_thumbnail(source.getvalue(), 100, 85)
+
+        with Image.open(io.BytesIO(data)) as thumbnail:
+            self.assertEqual(thumbnail.format, 'JPEG')
+            self.assertEqual(thumbnail.size, (100, 50))
+
+
+class RecipeSearchApiTests(TestCase):
+    """Test full-text search of recipes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, terms):
+        """Search recipes and return the ids of the results."""
+
+        res = self.client.get(RECIPES_URL, {'search': terms})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [item['id'] for item in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """Test matches in title and description are found."""
+
+        soup = create_recipe(user=self.user, title='Tomato soup')
+        salad = create_recipe(
+            user=self.user, title='Salad', description='Fresh tomatoes'
+        )
+        create_recipe(user=self.user, title='Pancakes')
+
+        ids = self.search('tomato')
+
+        self.assertEqual(ids, [soup.id, salad.id])
+
+    def test_search_requires_every_term(self):
+        """Test every search term must match."""
+
+        soup = create_recipe(user=self.user, title='Tomato soup')
+        create_recipe(user=self.user, title='Tomato salad')
+
+        self.assertEqual(self.search('tomato soup'), [soup.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are not searched."""
+
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'password@123'
+        )
+        create_recipe(user=other_user, title='Tomato soup')
+
+        self.assertEqual(self.search('tomato'), [])
+
+    def test_search_index_follows_writes(self):
+        """Test updated, bulk created and deleted recipes are reindexed."""
+
+        recipe = create_recipe(user=self.user, title='Pancakes')
+        recipe.title = 'Waffles'
+        recipe.save()
+        payload = [{'title': 'Waffles deluxe', 'time_minutes': 5,
+                    'price': '2.00'}]
+        self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(self.search('pancakes'), [])
+        self.assertEqual(len(self.search('waffles')), 2)
+
+        recipe.delete()
+        self.assertEqual(len(self.search('waffles')), 1)
+
+    def test_search_quotes_user_input(self):
+        """Test FTS syntax in search terms is treated as text."""
+
+        create_recipe(user=self.user, title='Tomato soup')
+
+        self.assertEqual(self.search('"tomato OR ('), [])
+
+    def test_search_with_ordering_rejected(self):
+        """Test search cannot be combined with another ordering."""
+
+        res = self.client.get(
+            RECIPES_URL, {'search': 'tomato', 'ordering': 'price'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', res.data)
+
+
+class RecipeFilterApiTests(TestCase):
+    """Test filtering and ordering of the recipes list."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def list_ids(self, **params):
+        """List recipes and return the ids of every page."""
+
+        ids = []
+        res = self.client.get(RECIPES_URL, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [item['id'] for item in res.data['results']]
+            if not res.data['next']:
+                return ids
+            res = self.client.get(res.data['next'])
+
+    def test_filter_price_and_time(self):
+        """Test filtering by price and time ranges."""
+
+        quick_cheap = create_recipe(
+            user=self.user, time_minutes=20, price=Decimal('8.00')
+        )
+        create_recipe(user=self.user, time_minutes=45, price=Decimal('8.00'))
+        create_recipe(user=self.user, time_minutes=20, price=Decimal('15.00'))
+
+        ids = self.list_ids(max_time=30, max_price='10')
+
+        self.assertEqual(ids, [quick_cheap.id])
+
+    def test_filter_title_prefix(self):
+        """Test filtering by title prefix."""
+
+        soup = create_recipe(user=self.user, title='Soup of the day')
+        create_recipe(user=self.user, title='Daily soup')
+
+        self.assertEqual(self.list_ids(title='Soup'), [soup.id])
+
+    def test_invalid_filter_rejected(self):
+        """Test invalid filter values return bad request."""
+
+        res = self.client.get(RECIPES_URL, {'max_time': 'soon'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_order_by_price_across_pages(self):
+        """Test keyset pages ordered by price with tied prices."""
+
+        prices = ['3.00', '1.00', '2.00', '1.00', '2.00', '1.00']
+        recipes = [
+            create_recipe(user=self.user, price=Decimal(price))
+            for price in prices
+        ]
+        expected = [
+            recipe.id for recipe in
+            sorted(recipes, key=lambda recipe: (recipe.price, recipe.id))
+        ]
+
+        ids = self.list_ids(ordering='price', page_size=2)
+
+        self.assertEqual(ids, expected)
+
+    def test_previous_page_link(self):
+        """Test following the previous link returns the earlier page."""
+
+        for minutes in [5, 10, 15, 20]:
+            create_recipe(user=self.user, time_minutes=minutes)
+        first = self.client.get(
+            RECIPES_URL, {'ordering': '-time_minutes', 'page_size': 2}
+        )
+        second = self.client.get(first.data['next'])
+
+        res = self.client.get(second.data['previous'])
+
+        self.assertEqual(res.data['results'], first.data['results'])
+        self.assertEqual(
+            [item['time_minutes'] for item in second.data['results']],
+            [10, 5]
+        )
+
+    def test_ordering_not_whitelisted(self):
+        """Test ordering by a field not whitelisted is rejected."""
+
+        res = self.client.get(RECIPES_URL, {'ordering': 'description'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_with_double_dash(self):
+        """Test only one leading dash is accepted in the ordering."""
+
+        for ordering in ['--price', '--id']:
+            res = self.client.get(RECIPES_URL, {'ordering': ordering})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_bound_to_ordering(self):
+        """Test a cursor cannot be reused with another ordering."""
+
+        for _ in range(3):
+            create_recipe(user=self.user)
+        res = self.client.get(
+            RECIPES_URL, {'ordering': 'price', 'page_size': 1}
+        )
+        cursor = parse_qs(urlparse(res.data['next']).query)['cursor'][0]
+
+        res = self.client.get(
+            RECIPES_URL, {'ordering': 'time_minutes', 'cursor': cursor}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def explain_list_query(self, **params):
+        """Return the query plan of the recipes list query."""
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sql = next(
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "recipes"' in query['sql']
+        )
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            return str(cursor.fetchall())
+
+    def test_price_filter_uses_index(self):
+        """Test price filtering and ordering use the price index."""
+
+        create_recipe(user=self.user)
+
+        plan = self.explain_list_query(max_price='10', ordering='price')
+
+        self.assertIn('recipes_user_price_idx', plan)
+
+    def test_time_filter_uses_index(self):
+        """Test time filtering and ordering use the time index."""
+
+        create_recipe(user=self.user)
+
+        plan = self.explain_list_query(max_time=30, ordering='time_minutes')
+
+        self.assertIn('recipes_user_time_idx', plan)
+
+
+class RecipeSparseFieldsApiTests(TestCase):
+    """Test sparse fieldsets of recipe responses."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_requested_fields(self):
+        """Test listing returns and fetches only requested fields."""
+
+        recipe = create_recipe(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,price'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'], [{'id': recipe.id, 'price': '5.25'}]
+        )
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"link"', sql)
+
+    def test_detail_requested_fields(self):
+        """Test retrieving returns only requested fields."""
+
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(
+            recipe_detail_url(recipe.id), {'fields': 'title,description'}
+        )
+
+        self.assertEqual(res.data, {
+            'title': recipe.title,
+            'description': recipe.description,
+        })
+
+    def test_unknown_field_rejected(self):
+        """Test requesting a field the endpoint lacks is rejected."""
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id,description'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_values_path_matches_serializer(self):
+        """Test the values() path matches the model serializer output."""
+
+        recipes = [
+            create_recipe(user=self.user, price=Decimal(price))
+            for price in ['3', '4.5', '999.99']
+        ]
+        recipes[0].tags.create(user=self.user, name='Vegan')
+        rows = list(Recipes.objects.filter(
+            id__in=[recipe.id for recipe in recipes]
+        ).order_by('id').values())
+
+        # the image is not a plain column.
+        fields = [
+            name for name in RecipeDetailSerializer.Meta.fields
+            if name != 'image'
+        ]
+        serializer = RecipeDetailSerializer(fields=fields)
+        serializer.fetch_relations(rows)
+        data = serializer.represent_values(rows)
+
+        self.assertEqual(data, RecipeDetailSerializer(
+            recipes, many=True, fields=fields
+        ).data)
+
+
+class RecipeRelationsApiTests(TestCase):
+    """Test tags and ingredients of recipes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_create_with_tags_and_ingredients(self):
+        """Test creating a recipe creates missing tags and reuses others."""
+
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        payload = {
+            'title': 'Salad',
+            'time_minutes': 10,
+            'price': '4.00',
+            'tags': [{'name': 'Vegan'}, {'name': 'Quick'}],
+            'ingredients': [{'name': 'Lettuce'}, {'name': 'Lettuce'}],
+        }
+
+        # three queries for each relation with names to create.
+        with self.client.budget(12):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['tags']], ['Quick', 'Vegan']
+        )
+        self.assertEqual(len(res.data['ingredients']), 1)
+        recipe = Recipes.objects.get(id=res.data['id'])
+        self.assertIn(vegan, recipe.tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_update_replaces_given_relations(self):
+        """Test updating tags replaces them and keeps ingredients."""
+
+        recipe = create_recipe(user=self.user)
+        recipe.tags.create(user=self.user, name='Old')
+        recipe.ingredients.create(user=self.user, name='Salt')
+
+        res = self.client.patch(
+            recipe_detail_url(recipe.id),
+            {'tags': [{'name': 'New'}]},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['tags']], ['New']
+        )
+        self.assertEqual(
+            [item['name'] for item in res.data['ingredients']], ['Salt']
+        )
+
+    def test_tags_limited_to_user(self):
+        """Test another user's tag of the same name is not reused."""
+
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass@123'
+        )
+        theirs = Tag.objects.create(user=other, name='Vegan')
+        payload = {
+            'title': 'Salad', 'time_minutes': 10, 'price': '4.00',
+            'tags': [{'name': 'Vegan'}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(res.data['tags'][0]['id'], theirs.id)
+
+    def test_get_or_create_named_queries(self):
+        """Test names are fetched and created with bulk queries."""
+
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        with self.assertNumQueries(1):
+            get_or_create_named(Ingredient, self.user.id, ['Salt'])
+        with self.assertNumQueries(3):
+            objects = get_or_create_named(
+                Ingredient, self.user.id, ['Salt', 'Flour', 'Egg', 'Milk']
+            )
+
+        self.assertEqual(
+            sorted(obj.name for obj in objects),
+            ['Egg', 'Flour', 'Milk', 'Salt'],
+        )
+
+    def test_bulk_create_queries_constant(self):
+        """Test bulk creating with tags does not query per recipe."""
+
+        def request(count):
+            payload = [
+                {
+                    'title': f'Recipe {i}', 'time_minutes': 5,
+                    'price': '1.00', 'tags': [{'name': f'Tag {i}'}],
+                    'ingredients': [{'name': 'Salt'}],
+                }
+                for i in range(count)
+            ]
+            res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return res
+
+        one = count_queries(lambda: request(1))
+        many = count_queries(lambda: request(20))
+
+        self.assertEqual(one, many)
+        self.assertEqual(
+            Recipes.objects.filter(tags__name='Tag 19').count(), 1
+        )
+
+    def test_filter_by_tags_and_ingredients(self):
+        """Test filtering by tag and ingredient ids."""
+
+        soup = create_recipe(user=self.user, title='Soup')
+        stew = create_recipe(user=self.user, title='Stew')
+        create_recipe(user=self.user, title='Cake')
+        vegan = soup.tags.create(user=self.user, name='Vegan')
+        quick = stew.tags.create(user=self.user, name='Quick')
+        stew.tags.add(vegan)
+        salt = stew.ingredients.create(user=self.user, name='Salt')
+
+        res = self.client.get(
+            RECIPES_URL, {'tags': f'{vegan.id},{quick.id}'}
+        )
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [stew.id, soup.id]
+        )
+
+        res = self.client.get(
+            RECIPES_URL, {'tags': vegan.id, 'ingredients': salt.id}
+        )
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [stew.id]
+        )
+
+    def test_invalid_id_filter_rejected(self):
+        """Test filtering by ids that are not numbers is rejected."""
+
+        res = self.client.get(RECIPES_URL, {'tags': '1,two'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_includes_relations(self):
+        """Test the list shows tags and ingredients sorted by name."""
+
+        recipe = create_recipe(user=self.user)
+        recipe.tags.create(user=self.user, name='Quick')
+        recipe.tags.create(user=self.user, name='Cheap')
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id,tags'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results'][0]['tags']],
+            ['Cheap', 'Quick'],
+        )
+        self.assertNotIn('ingredients', res.data['results'][0])
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test read endpoints run a constant number of queries."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user, title='Tomato soup')
+
+    def assertConstantQueries(self, url, params=None):
+        """Assert url runs as many queries with 1 and with 25 recipes."""
+
+        def request():
+            cache.clear()
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        one = count_queries(request)
+        for _ in range(24):
+            create_recipe(user=self.user, title='Tomato soup')
+        many = count_queries(request)
+
+        self.assertEqual(one, many)
+        # the page, its count when searching and one per relation.
+        self.assertLessEqual(many, 4)
+
+    def test_list_queries_constant(self):
+        """Test listing does not query per recipe."""
+
+        self.assertConstantQueries(RECIPES_URL)
+
+    def test_list_instances_queries_constant(self):
+        """Test the serializer path of the list does not query per row."""
+
+        with patch.object(
+            RecipesSerializer, 'values_columns', return_value=None
+        ):
+            self.assertConstantQueries(RECIPES_URL)
+
+    def test_filtered_list_queries_constant(self):
+        """Test filtering and ordering do not query per recipe."""
+
+        self.assertConstantQueries(
+            RECIPES_URL, {'max_price': 10, 'ordering': 'price'}
+        )
+
+    def test_search_queries_constant(self):
+        """Test searching does not query per recipe."""
+
+        self.assertConstantQueries(RECIPES_URL, {'search': 'tomato'})
+
+    def test_list_with_relations_queries_constant(self):
+        """Test listing tagged recipes does not query per recipe."""
+
+        def request():
+            cache.clear()
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        one = count_queries(request)
+        for i in range(24):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.create(user=self.user, name=f'Tag {i}')
+            recipe.ingredients.create(user=self.user, name=f'Item {i}')
+        many = count_queries(request)
+
+        self.assertEqual(one, many)
+
+    def test_detail_queries_constant(self):
+        """Test retrieving a recipe does not depend on the recipe count."""
+
+        self.assertConstantQueries(recipe_detail_url(self.recipe.id))
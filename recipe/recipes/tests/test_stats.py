@@ -0,0 +1,173 @@
+"""
+Tests the per-user recipe stats.
+"""
+
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+
+from recipe.testing import BudgetAPIClient
+
+from ..models import Recipes, UserRecipeStats
+from ..stats import add_stats, reconcile_stats
+
+RECIPES_URL = reverse('recipes:recipes-list')
+RECIPES_BULK_URL = reverse('recipes:recipes-bulk')
+STATS_URL = reverse('user:me-stats')
+
+
+def recipe_detail_url(recipe_id):
+    """Return the detail url of a recipe."""
+
+    return reverse('recipes:recipes-detail', args=[recipe_id])
+
+
+class UserRecipeStatsTests(TestCase):
+    """Test keeping recipe stats in step with recipes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = BudgetAPIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def stats(self):
+        """Return the count and totals stored for the user."""
+
+        stats = UserRecipeStats.objects.get(user=self.user)
+
+        return (
+            stats.recipe_count, stats.price_total, stats.time_minutes_total
+        )
+
+    def create(self, price, time_minutes):
+        """Create a recipe with the API and return its id."""
+
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Soup', 'price': price, 'time_minutes': time_minutes,
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        return res.data['id']
+
+    def test_new_user_has_empty_stats(self):
+        """Test users start with a stats row and no averages."""
+
+        with self.client.budget(1):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 0)
+        self.assertIsNone(res.data['average_price'])
+        self.assertIsNone(res.data['average_time_minutes'])
+
+    def test_stats_follow_writes(self):
+        """Test creating, updating and deleting recipes update the stats."""
+
+        first = self.create('2.00', 10)
+        second = self.create('5.00', 30)
+        self.assertEqual(self.stats(), (2, Decimal('7.00'), 40))
+
+        self.client.patch(
+            recipe_detail_url(first), {'price': '4.00'}, format='json'
+        )
+        self.client.patch(
+            recipe_detail_url(first), {'title': 'Stew'}, format='json'
+        )
+        self.assertEqual(self.stats(), (2, Decimal('9.00'), 40))
+
+        self.client.delete(recipe_detail_url(second))
+        self.assertEqual(self.stats(), (1, Decimal('4.00'), 10))
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.assertEqual(res.data['average_price'], '4.00')
+        self.assertEqual(res.data['average_time_minutes'], 10.0)
+
+    def test_stats_follow_bulk_writes(self):
+        """Test bulk writes update the stats with one query per user."""
+
+        res = self.client.post(RECIPES_BULK_URL, [
+            {'title': f'Recipe {i}', 'price': '1.50', 'time_minutes': 10}
+            for i in range(4)
+        ], format='json')
+        ids = [item['id'] for item in res.data]
+        self.assertEqual(self.stats(), (4, Decimal('6.00'), 40))
+
+        self.client.patch(RECIPES_BULK_URL, [
+            {'id': recipe_id, 'time_minutes': 20} for recipe_id in ids[:2]
+        ], format='json')
+        self.assertEqual(self.stats(), (4, Decimal('6.00'), 60))
+
+        self.client.delete(
+            RECIPES_BULK_URL, {'ids': ids[1:]}, format='json'
+        )
+        self.assertEqual(self.stats(), (1, Decimal('1.50'), 20))
+
+    def test_stats_limited_to_user(self):
+        """Test the recipes of other users are not counted."""
+
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass@123'
+        )
+        Recipes.objects.create(
+            user=other, title='Other', time_minutes=5, price=Decimal('9')
+        )
+        self.create('1.00', 5)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.assertEqual(res.data['average_price'], '1.00')
+
+    def test_add_stats_creates_missing_row(self):
+        """Test changes of a user without a row create it."""
+
+        UserRecipeStats.objects.filter(user=self.user).delete()
+
+        add_stats(self.user.id, 1, Decimal('2.50'), 15)
+        add_stats(self.user.id, 1, Decimal('2.50'), 15)
+
+        self.assertEqual(self.stats(), (2, Decimal('5.00'), 30))
+
+    def test_reconcile_repairs_drift(self):
+        """Test reconciling recomputes rows from the recipes."""
+
+        self.create('3.00', 10)
+        # writes bypassing the ORM signals leave the stats stale.
+        Recipes.objects.filter(user=self.user).update(price=Decimal('8'))
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass@123'
+        )
+        UserRecipeStats.objects.filter(user=other).delete()
+
+        self.assertEqual(sum(reconcile_stats(batch_size=1)), 2)
+        self.assertEqual(self.stats(), (1, Decimal('8.00'), 10))
+        self.assertEqual(
+            UserRecipeStats.objects.get(user=other).recipe_count, 0
+        )
+
+    def test_reconcile_command(self):
+        """Test the command reports the corrected rows."""
+
+        self.create('3.00', 10)
+        UserRecipeStats.objects.update(recipe_count=5)
+        out = StringIO()
+
+        call_command('reconcile_recipe_stats', stdout=out)
+
+        self.assertIn('1 user(s)', out.getvalue())
+        self.assertEqual(self.stats(), (1, Decimal('3.00'), 10))
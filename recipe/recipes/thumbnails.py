@@ -0,0 +1,74 @@
+"""
+Pool of worker processes rendering recipe thumbnails.
+
+Decoding and resizing images is CPU bound. Run on the threads of a job
+worker it would hold the GIL from every other job of the process, so
+thumbnails are rendered by a fixed number of separate processes
+instead. Pillow is imported by those processes only, it is not needed
+to serve the API.
+"""
+
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from recipe.executors import LazyExecutor
+
+
+
+def render_thumbnail(data, size, quality):
+    """Return the JPEG thumbnail of data, the bytes of an image.
+
+    The image is turned upright as its EXIF orientation asks and fits
+    in a size by size square, keeping its aspect ratio.
+    """
+
+    from PIL import Image, ImageOps
+
+    output = io.BytesIO()
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEG images are decoded straight at a reduced scale.
+        image.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        image.convert('RGB').save(
+            output, 'JPEG', quality=quality, optimize=True
+        )
+
+    return output.getvalue()
+
+
+# spawned processes do not inherit the locks and database connections
+# of the threads of the job worker.
+pool = LazyExecutor(
+    ['RECIPES_THUMBNAIL_WORKERS'],
+    lambda: ProcessPoolExecutor(
+        max_workers=settings.RECIPES_THUMBNAIL_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+    ),
+)
+
+
+def make_thumbnail(data):
+    """Render the thumbnail of data in the pool and return its bytes.
+
+    Renders in the calling thread when the pool is disabled.
+    """
+
+    args = (
+        data,
+        settings.RECIPES_THUMBNAIL_SIZE,
+        settings.RECIPES_THUMBNAIL_QUALITY,
+    )
+    if settings.RECIPES_THUMBNAIL_WORKERS <= 0:
+        return render_thumbnail(*args)
+
+    try:
+        return pool.get().submit(render_thumbnail, *args).result()
+    except BrokenProcessPool:
+        # a process died, e.g. out of memory, start afresh next time.
+        pool.reset()
+        raise
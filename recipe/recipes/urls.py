@@ -2,6 +2,7 @@
 Contains urls for recipes app.
 """
 
+from django.conf import settings
 from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
@@ -16,3 +17,19 @@ app_name = 'recipes'
 urlpatterns = [
     path('', include(router.urls))
 ]
+
+if settings.RECIPES_ASYNC_VIEWS:
+    from .async_views import AsyncRecipeDetailView, AsyncRecipeListView
+
+    urlpatterns = [
+        path(
+            'recipes/',
+            AsyncRecipeListView.as_view(),
+            name='recipes-list'
+        ),
+        path(
+            'recipes/<int:pk>/',
+            AsyncRecipeDetailView.as_view(),
+            name='recipes-detail'
+        ),
+    ] + urlpatterns
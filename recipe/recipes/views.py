@@ -2,28 +2,132 @@
 Contains views for recipes app.
 """
 
-from rest_framework.authentication import TokenAuthentication
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.translation import gettext as _
+
+from rest_framework import generics, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
-from .models import Recipes
-from .serializers import RecipesSerializer, RecipeDetailSerializer
+from jobs.queue import enqueue
+from jobs.views import job_accepted
+from recipe.routers import ReplicaReadMixin
+from recipe.throttling import AccountRateThrottle, RecipesRateThrottle
+from user.authentication import CachedTokenAuthentication
+
+from .cache import VersionedCacheMixin, bump_user_version
+from .export import EXPORTERS
+from .filters import RecipeFilterBackend
+from .images import (
+    ImageContentNegotiation,
+    delete_image,
+    image_format,
+    image_response,
+    save_image,
+)
+from .importer import READERS
+from .models import IMAGE_COLUMNS, Recipes, UserRecipeStats
+from .pagination import RecipeCursorPagination, RecipeSearchPagination
+from .search import search_recipes
+from .serializers import (
+    RecipesSerializer,
+    RecipeDetailSerializer,
+    RecipeBulkDeleteSerializer,
+    UserRecipeStatsSerializer,
+    detail_columns,
+    parse_fields,
+)
+from .stats import record_deleted
 
 
-class RecipesViewSet(ModelViewSet):
+class RecipesViewSet(ReplicaReadMixin, VersionedCacheMixin, ModelViewSet):
     """View set to manage recipes APIs."""
 
     queryset = Recipes.objects.all()
     serializer_class = RecipeDetailSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_classes = [RecipesRateThrottle]
+    pagination_class = RecipeCursorPagination
+    filter_backends = [RecipeFilterBackend]
+    ordering_fields = ['id', 'price', 'time_minutes']
 
     def get_queryset(self):
         """Retrieve recipes for authenticated user.
 
         Only retrieve recipe associated with that particular user.
+        When listing with a `search` parameter, only matching recipes are
+        returned, best matches first. Tags and ingredients are
+        prefetched with one query each.
+        """
+        queryset = self.queryset.filter(
+            user=self.request.user
+        ).order_by('-id')
+
+        terms = self.search_terms()
+        if terms:
+            queryset = search_recipes(queryset, terms)
+
+        fields = self.requested_fields()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.with_relations(fields)
+        if self.action == 'retrieve' and fields is not None:
+            queryset = queryset.only(*detail_columns(fields))
+        if self.action == 'image':
+            queryset = queryset.only('id', 'user_id', *IMAGE_COLUMNS)
+
+        return queryset
+
+    def requested_fields(self):
+        """Return the fields requested with `fields`, or None for all."""
+
+        if self.action not in ('list', 'retrieve'):
+            return None
+
+        return parse_fields(
+            self.request.query_params.get('fields'),
+            self.get_serializer_class().Meta.fields,
+        )
+
+    def search_terms(self):
+        """Return the search terms of a list request, if any.
+
+        Search results are ordered by rank, asking for another ordering
+        as well is rejected.
         """
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+
+        if self.action != 'list':
+            return ''
+
+        params = self.request.query_params
+        terms = params.get('search', '').strip()
+        ordering_param = RecipeCursorPagination.ordering_param
+        if terms and params.get(ordering_param):
+            msg = _('Search results are ordered by rank.')
+            raise ValidationError({ordering_param: [msg]})
+
+        return terms
+
+    @property
+    def paginator(self):
+        """Use page numbers for ranked search results."""
+
+        if not hasattr(self, '_paginator'):
+            if self.search_terms():
+                self._paginator = RecipeSearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+
+        return self._paginator
 
     def get_serializer_class(self):
         """Return the right serializer class for the request."""
@@ -31,8 +135,66 @@ class RecipesViewSet(ModelViewSet):
         if self.action == 'list':
             return RecipesSerializer
 
+        if self.action == 'bulk_destroy':
+            return RecipeBulkDeleteSerializer
+
         return self.serializer_class
 
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer limited to the requested fields."""
+
+        if self.action in ('list', 'retrieve'):
+            kwargs.setdefault('fields', self.requested_fields())
+
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        """List recipes, served from the response cache when fresh.
+
+        `ordering` sorts by one of `ordering_fields`, `search` returns the
+        best matches first and cannot be combined with `ordering`.
+        """
+
+        return self.cached_response(
+            self.list_values, request, *args, **kwargs
+        )
+
+    def list_values(self, request, *args, **kwargs):
+        """List recipes built straight from `values()` rows.
+
+        Skips model instances and per-object serializer machinery, tags
+        and ingredients cost one query each for the whole page. Falls
+        back to the regular list when a field is not a plain column.
+        """
+
+        serializer = self.get_serializer()
+        columns = serializer.values_columns()
+        if columns is None:
+            return super().list(request, *args, **kwargs)
+
+        # ordering columns are needed to compute the keyset position,
+        # relations are added to the page rows by `fetch_relations`.
+        columns = set(columns) | set(self.ordering_fields)
+        queryset = self.filter_queryset(
+            self.get_queryset()
+        ).prefetch_related(None).values(*columns)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            page = list(queryset)
+            serializer.fetch_relations(page)
+            return Response(serializer.represent_values(page))
+
+        serializer.fetch_relations(page)
+
+        return self.get_paginated_response(serializer.represent_values(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, served from the response cache when fresh."""
+
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
     def perform_create(self, serializer):
         """Creates a new recipe.
 
@@ -40,3 +202,214 @@ class RecipesViewSet(ModelViewSet):
         """
 
         serializer.save(user=self.request.user)
+        bump_user_version(self.request.user.pk)
+
+    def perform_update(self, serializer):
+        """Updates a recipe and invalidates cached responses."""
+
+        serializer.save()
+        bump_user_version(self.request.user.pk)
+
+    def perform_destroy(self, instance):
+        """Deletes a recipe and invalidates cached responses."""
+
+        instance.delete()
+        bump_user_version(self.request.user.pk)
+
+    @action(detail=False, methods=['post'], url_path='bulk', url_name='bulk')
+    def bulk_create(self, request):
+        """Creates many recipes in a single transaction."""
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            serializer.save(user=request.user)
+        bump_user_version(request.user.pk)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """Partially updates many recipes in a single transaction."""
+
+        ids = []
+        if isinstance(request.data, list):
+            for item in request.data:
+                try:
+                    ids.append(int(item.get('id')))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+        recipes = self.get_queryset().in_bulk(ids)
+
+        serializer = self.get_serializer(
+            recipes, data=request.data, many=True, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            serializer.save()
+        bump_user_version(request.user.pk)
+
+        return Response(serializer.data)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        """Deletes many recipes in a single transaction."""
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
+
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(id__in=ids)
+            deleted = list(queryset.only('user', 'price', 'time_minutes'))
+            queryset.delete()
+            record_deleted(deleted)
+        bump_user_version(request.user.pk)
+        found = {recipe.id for recipe in deleted}
+
+        return Response({
+            'deleted': len(found),
+            'not_found': sorted(ids - found),
+        })
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Queues an export of every recipe of the user.
+
+        The format is chosen with the `output` query parameter. Returns
+        202 with the job, whose file is downloaded once it succeeded.
+        """
+
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORTERS:
+            msg = _('Unsupported export format. Choose one of: {choices}.')
+            return Response(
+                {'output': [msg.format(choices=', '.join(EXPORTERS))]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        job = enqueue('recipes.export', user=request.user, output=output)
+
+        return job_accepted(request, job)
+
+    @action(
+        detail=False, methods=['post'], url_path='import', url_name='import'
+    )
+    def import_file(self, request):
+        """Queues an import of recipes from an uploaded NDJSON or CSV file.
+
+        The format is taken from the `input` query parameter or the file
+        extension. The file is saved to storage and 202 is returned with
+        the job, which reports the progress per batch and ends with a
+        summary holding the row errors.
+        """
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'file': [_('No file was submitted.')]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        extension = os.path.splitext(upload.name)[1].lstrip('.').lower()
+        input_format = request.query_params.get('input', extension)
+        if input_format not in READERS:
+            msg = _('Unsupported import format. Choose one of: {choices}.')
+            return Response(
+                {'input': [msg.format(choices=', '.join(READERS))]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        name = default_storage.save(
+            f'jobs/imports/{uuid.uuid4().hex}.{input_format}', upload
+        )
+        job = enqueue(
+            'recipes.import', user=request.user,
+            file=name, input=input_format,
+        )
+
+        return job_accepted(request, job)
+
+    @action(
+        detail=True, methods=['get', 'post', 'delete'],
+        parser_classes=[MultiPartParser],
+        content_negotiation_class=ImageContentNegotiation,
+    )
+    def image(self, request, pk=None):
+        """Serves, uploads or removes the image of a recipe.
+
+        GET returns the image, or its thumbnail with `size=thumbnail`.
+        POST stores the `image` file of a multipart upload, replacing
+        any previous image, and returns 202 with the job rendering the
+        thumbnail. DELETE removes the image and its thumbnail.
+        """
+
+        recipe = self.get_object()
+
+        if request.method == 'GET':
+            if request.query_params.get('size') == 'thumbnail':
+                name = recipe.thumbnail.name
+            else:
+                name = recipe.image.name
+            if not name:
+                raise NotFound()
+            return image_response(request, name)
+
+        if request.method == 'DELETE':
+            delete_image(recipe)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        max_size = settings.RECIPES_IMAGE_MAX_SIZE
+        msg = _('Submit an image file of at most {size} bytes.')
+        invalid = Response(
+            {'image': [msg.format(size=max_size)]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+        # oversized uploads are refused before their body is read, with
+        # room left for the multipart envelope.
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > max_size + 64 * 1024:
+            return invalid
+
+        upload = request.FILES.get('image')
+        if upload is None or upload.size > max_size:
+            return invalid
+
+        extension = image_format(upload)
+        if extension is None:
+            return Response(
+                {'image': [_('Upload a JPEG, PNG, GIF or WebP image.')]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            job = save_image(recipe, upload, extension, user=request.user)
+        except Recipes.DoesNotExist:
+            raise NotFound()
+
+        return job_accepted(request, job)
+
+
+class UserRecipeStatsView(ReplicaReadMixin, generics.RetrieveAPIView):
+    """Report the recipe count and averages of the authenticated user."""
+
+    serializer_class = UserRecipeStatsSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [AccountRateThrottle]
+
+    def get_object(self):
+        """Return the stats row of the user, read with one query.
+
+        Users who never had a recipe have no row and get empty stats.
+        """
+
+        user = self.request.user
+        stats = UserRecipeStats.objects.filter(user=user).first()
+
+        return stats or UserRecipeStats(user=user)
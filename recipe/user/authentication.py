@@ -0,0 +1,335 @@
+"""
+Cached token authentication for the API.
+
+Accepts both database tokens and stateless signed tokens, see
+`user.tokens`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+
+from .tokens import is_signed_token, load_signed_token
+
+
+class LocalTokenCache:
+    """Bounded, thread safe LRU with a time to live per entry.
+
+    Entries are tuples of plain values, see `_user_entry`, so hits can
+    be shared between requests.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key or None."""
+
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+
+        return value
+
+    def set(self, key, value):
+        """Store value for key, evicting the least recently used entry."""
+
+        if self.max_size <= 0:
+            return
+        item = (time.monotonic() + self.ttl, value)
+        with self._lock:
+            self._data[key] = item
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key from the cache."""
+
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+
+        with self._lock:
+            self._data.clear()
+
+
+local_token_cache = LocalTokenCache(
+    settings.TOKEN_AUTH_LOCAL_CACHE_SIZE,
+    settings.TOKEN_AUTH_LOCAL_CACHE_TTL,
+)
+
+
+def _shared_cache():
+    """Return the shared cache used for tokens."""
+
+    return caches[settings.TOKEN_AUTH_CACHE_ALIAS]
+
+
+def _cache_key(key):
+    """Return the shared cache key for a token key."""
+
+    return f'auth:token:{key}'
+
+
+def _user_cache_key(user_id):
+    """Return the cache key for a user authenticated by signed tokens."""
+
+    return f'auth:user:{user_id}'
+
+
+# The user fields kept in the caches, all authentication checks need.
+# Other fields, the password hash among them, are loaded on access.
+USER_CACHE_FIELDS = ('id', 'is_active', 'token_version')
+
+
+def _user_entry(user):
+    """Return the cache entry of user."""
+
+    return tuple(getattr(user, name) for name in USER_CACHE_FIELDS)
+
+
+def _user_from_entry(entry):
+    """Return a user with only the fields of a cache entry loaded."""
+
+    user_model = get_user_model()
+    values = dict(zip(USER_CACHE_FIELDS, entry))
+    names = [
+        field.attname for field in user_model._meta.concrete_fields
+        if field.attname in values
+    ]
+
+    return user_model.from_db(None, names, [values[name] for name in names])
+
+
+def _token_entry(token):
+    """Return the cache entry of a database token and its user."""
+
+    return (token.created, *_user_entry(token.user))
+
+
+def _token_from_entry(key, entry):
+    """Return the database token of key from its cache entry."""
+
+    created, *user = entry
+
+    return Token(key=key, user=_user_from_entry(user), created=created)
+
+
+def invalidate_token(key):
+    """Drop a token from both cache tiers."""
+
+    local_token_cache.delete(key)
+    _shared_cache().delete(_cache_key(key))
+
+
+def invalidate_user_tokens(user_id):
+    """Drop every token belonging to a user from both cache tiers."""
+
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+    key = _user_cache_key(user_id)
+    local_token_cache.delete(key)
+    _shared_cache().delete(key)
+
+
+def revoke_user_tokens(user):
+    """Revoke every database and signed token of user."""
+
+    get_user_model().objects.filter(pk=user.pk).update(
+        token_version=F('token_version') + 1
+    )
+    user.refresh_from_db(fields=['token_version'])
+    invalidate_user_tokens(user.pk)
+    Token.objects.filter(user=user).delete()
+
+
+def token_expired(token):
+    """Return whether a database token is older than its ttl."""
+
+    ttl = settings.TOKEN_AUTH_DB_TTL
+    if not ttl:
+        return False
+
+    return token.created < timezone.now() - timezone.timedelta(seconds=ttl)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches token to user resolution.
+
+    Lookups go to an in-process LRU first, then to the shared Django
+    cache and only then to the database. Signed tokens are verified
+    from their signature; only the user behind them is looked up, through
+    the same caches. The caches hold `USER_CACHE_FIELDS` only, so the
+    user returned has every other field deferred.
+    """
+
+    def authenticate_credentials(self, key):
+        """Return the user and token for key, using the caches."""
+
+        if is_signed_token(key):
+            token = self.load_signed(key)
+            return (self.check_signed(token, self.get_user(token)), token)
+
+        entry = local_token_cache.get(key)
+        if entry is None:
+            entry = _shared_cache().get(_cache_key(key))
+            if entry is None:
+                token = super().authenticate_credentials(key)[1]
+                entry = _token_entry(token)
+                _shared_cache().set(
+                    _cache_key(key), entry, settings.TOKEN_AUTH_CACHE_TTL
+                )
+            local_token_cache.set(key, entry)
+        token = _token_from_entry(key, entry)
+
+        return (self.check_user(token.user, token), token)
+
+    def check_user(self, user, token):
+        """Return user if it may authenticate with the database token."""
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        if token_expired(token):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        return user
+
+    def load_signed(self, key):
+        """Return the verified `SignedToken` for key."""
+
+        try:
+            return load_signed_token(key)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    def check_signed(self, token, user):
+        """Return user if it may authenticate with the signed token."""
+
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        if user.token_version != token.version:
+            raise exceptions.AuthenticationFailed(
+                _('Token has been revoked.')
+            )
+
+        return user
+
+    def get_user(self, token):
+        """Return the user of a signed token, using the caches."""
+
+        key = _user_cache_key(token.user_id)
+        entry = local_token_cache.get(key)
+        if entry is None:
+            entry = _shared_cache().get(key)
+            if entry is None:
+                entry = get_user_model().objects.filter(
+                    pk=token.user_id
+                ).values_list(*USER_CACHE_FIELDS).first()
+                if entry is None:
+                    return None
+                _shared_cache().set(key, entry, settings.TOKEN_AUTH_CACHE_TTL)
+            local_token_cache.set(key, entry)
+
+        return _user_from_entry(entry)
+
+    async def aget_user(self, token):
+        """Async counterpart of `get_user`."""
+
+        key = _user_cache_key(token.user_id)
+        entry = local_token_cache.get(key)
+        if entry is None:
+            entry = await _shared_cache().aget(key)
+            if entry is None:
+                entry = await get_user_model().objects.filter(
+                    pk=token.user_id
+                ).values_list(*USER_CACHE_FIELDS).afirst()
+                if entry is None:
+                    return None
+                await _shared_cache().aset(
+                    key, entry, settings.TOKEN_AUTH_CACHE_TTL
+                )
+            local_token_cache.set(key, entry)
+
+        return _user_from_entry(entry)
+
+    async def aauthenticate(self, request):
+        """Async counterpart of `authenticate` for async views."""
+
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            msg = _('Invalid token header.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header. '
+                    'Token string should not contain invalid characters.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        """Return the user and token for key using the async ORM."""
+
+        if is_signed_token(key):
+            token = self.load_signed(key)
+            user = await self.aget_user(token)
+            return (self.check_signed(token, user), token)
+
+        entry = local_token_cache.get(key)
+        if entry is None:
+            entry = await _shared_cache().aget(_cache_key(key))
+            if entry is None:
+                try:
+                    token = await self.get_model().objects.select_related(
+                        'user'
+                    ).aget(key=key)
+                except self.get_model().DoesNotExist:
+                    raise exceptions.AuthenticationFailed(_('Invalid token.'))
+                entry = _token_entry(token)
+                await _shared_cache().aset(
+                    _cache_key(key), entry, settings.TOKEN_AUTH_CACHE_TTL
+                )
+            local_token_cache.set(key, entry)
+        token = _token_from_entry(key, entry)
+
+        return (self.check_user(token.user, token), token)
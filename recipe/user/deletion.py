@@ -0,0 +1,159 @@
+"""
+Deactivate-then-purge deletion of users.
+
+Deleting a user with `delete()` makes Django collect every recipe in
+memory and delete them in one long transaction. Instead the account is
+disabled at once and a background job deletes the rows it owns in
+batches of `USER_PURGE_BATCH_SIZE`, each in its own short transaction,
+with plain `DELETE` statements that load no rows.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models, router, transaction
+from django.dispatch import Signal
+
+from jobs.queue import enqueue
+
+from .authentication import revoke_user_tokens
+
+# Sent with user_id before the rows of a user are purged, for apps to
+# release what raw deletes skip, such as stored files.
+user_purging = Signal()
+
+
+def _reverse_relations(model):
+    """Return the relations of rows referencing model.
+
+    Includes the hidden ones of auto-created many-to-many join tables.
+    """
+
+    return [
+        field for field in model._meta.get_fields(include_hidden=True)
+        if field.auto_created and not field.concrete
+        and (field.one_to_many or field.one_to_one)
+    ]
+
+
+# on_delete behaviours `delete_rows` applies itself.
+RAW_ON_DELETE = (models.CASCADE, models.SET_NULL, models.DO_NOTHING)
+
+
+def can_raw_delete(model, seen=()):
+    """Return whether `delete_rows` handles every relation of model.
+
+    Rows referencing model must cascade, be set null or be ignored on
+    delete, whether or not their foreign key has a database constraint.
+    Other relations, such as protected ones, need Django's collector.
+    """
+
+    for relation in _reverse_relations(model):
+        related = relation.related_model
+        if relation.on_delete not in RAW_ON_DELETE:
+            return False
+        if relation.on_delete is models.CASCADE and related not in seen:
+            if not can_raw_delete(related, (*seen, model)):
+                return False
+
+    return True
+
+
+def delete_rows(queryset):
+    """Delete the rows of queryset without loading them.
+
+    Rows referencing them are deleted or set null first, as their
+    `on_delete` asks, so foreign key constraints hold and keys without
+    one leave no orphans. Signals are not sent.
+    """
+
+    model = queryset.model
+    pks = queryset.values(model._meta.pk.name)
+    for relation in _reverse_relations(model):
+        field = relation.field
+        related = relation.related_model._base_manager.using(
+            queryset.db
+        ).filter(**{f'{field.name}__in': pks})
+        if relation.on_delete is models.CASCADE:
+            delete_rows(related)
+        elif relation.on_delete is models.SET_NULL:
+            related.update(**{field.name: None})
+
+    # `_raw_delete` issues a single DELETE, without the collector.
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_in_batches(queryset, batch_size=None):
+    """Delete the rows of queryset in batches of bounded size.
+
+    Each batch is deleted in its own transaction, so locks are held
+    briefly and memory does not grow with the number of rows. Yields
+    the number of rows deleted so far after every batch.
+    """
+
+    batch_size = batch_size or settings.USER_PURGE_BATCH_SIZE
+    model = queryset.model
+    pk = model._meta.pk.name
+    raw = can_raw_delete(model)
+    using = router.db_for_write(model)
+    deleted = 0
+    while True:
+        with transaction.atomic(using=using):
+            ids = list(queryset.using(using).order_by(pk).values_list(
+                pk, flat=True
+            )[:batch_size])
+            if not ids:
+                return
+            batch = model._base_manager.using(using).filter(pk__in=ids)
+            if raw:
+                delete_rows(batch)
+            else:
+                batch.delete()
+        deleted += len(ids)
+        yield deleted
+
+
+def deactivate_user(user):
+    """Disable the account of user and queue the deletion of its data.
+
+    The user can no longer log in and every token is revoked before
+    this returns. Returns the purge job.
+    """
+
+    user.is_active = False
+    user.save(update_fields=['is_active'])
+    revoke_user_tokens(user)
+
+    return enqueue('user.purge', user=user, user_id=user.pk)
+
+
+def purge_user(user_id):
+    """Delete the rows owned by a deactivated user, then the user.
+
+    Every model referencing the user with a cascading foreign key is
+    deleted with `delete_in_batches`. Yields the rows deleted so far per
+    model label after every batch, and a final dict with `done` set.
+    Nothing is deleted if the user was reactivated meanwhile.
+    """
+
+    user_model = get_user_model()
+    deleted = {}
+    if user_model.objects.filter(pk=user_id, is_active=True).exists():
+        yield {'deleted': deleted, 'done': False}
+        return
+
+    user_purging.send(sender=user_model, user_id=user_id)
+    for relation in _reverse_relations(user_model):
+        if relation.on_delete is not models.CASCADE:
+            continue
+        label = relation.related_model._meta.label
+        for count in delete_in_batches(
+            relation.related_model._base_manager.filter(
+                **{relation.field.name: user_id}
+            )
+        ):
+            deleted[label] = count
+            yield {'deleted': dict(deleted)}
+
+    user_model.objects.filter(pk=user_id).delete()
+
+    yield {'deleted': deleted, 'done': True}
@@ -0,0 +1,101 @@
+"""
+Password hashers with configurable cost.
+
+Each hasher keeps the algorithm name of the Django hasher it extends, so
+existing hashes keep verifying. When the configured cost or the
+preferred hasher changes, Django rehashes the password on the next
+successful login.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .hashing import run_hashing
+
+
+class PooledHasherMixin:
+    """Computes hashes in the bounded hashing pool."""
+
+    def encode(self, password, salt, *args, **kwargs):
+        """Hash password in the hashing pool."""
+
+        return run_hashing(super().encode, password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        """Check password against encoded in the hashing pool."""
+
+        return run_hashing(super().verify, password, encoded)
+
+    def harden_runtime(self, password, encoded):
+        """Run the extra hardening iterations in the hashing pool."""
+
+        return run_hashing(super().harden_runtime, password, encoded)
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher with `PASSWORD_PBKDF2_ITERATIONS` iterations."""
+
+    @property
+    def iterations(self):
+        return (
+            settings.PASSWORD_PBKDF2_ITERATIONS
+            or hashers.PBKDF2PasswordHasher.iterations
+        )
+
+
+class ScryptPasswordHasher(PooledHasherMixin, hashers.ScryptPasswordHasher):
+    """Scrypt hasher with `PASSWORD_SCRYPT_*` cost parameters."""
+
+    @property
+    def work_factor(self):
+        return (
+            settings.PASSWORD_SCRYPT_WORK_FACTOR
+            or hashers.ScryptPasswordHasher.work_factor
+        )
+
+    @property
+    def block_size(self):
+        return (
+            settings.PASSWORD_SCRYPT_BLOCK_SIZE
+            or hashers.ScryptPasswordHasher.block_size
+        )
+
+    @property
+    def parallelism(self):
+        return (
+            settings.PASSWORD_SCRYPT_PARALLELISM
+            or hashers.ScryptPasswordHasher.parallelism
+        )
+
+    @property
+    def maxmem(self):
+        # scrypt needs about 128 * n * r bytes, leave room above it.
+        return 256 * self.work_factor * self.block_size
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """Argon2 hasher with `PASSWORD_ARGON2_*` cost parameters.
+
+    Needs the `argon2-cffi` package.
+    """
+
+    @property
+    def time_cost(self):
+        return (
+            settings.PASSWORD_ARGON2_TIME_COST
+            or hashers.Argon2PasswordHasher.time_cost
+        )
+
+    @property
+    def memory_cost(self):
+        return (
+            settings.PASSWORD_ARGON2_MEMORY_COST
+            or hashers.Argon2PasswordHasher.memory_cost
+        )
+
+    @property
+    def parallelism(self):
+        return (
+            settings.PASSWORD_ARGON2_PARALLELISM
+            or hashers.Argon2PasswordHasher.parallelism
+        )
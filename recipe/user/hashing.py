@@ -0,0 +1,72 @@
+"""
+Bounded worker pool for password hashing.
+
+Hashing is deliberately slow, so a burst of logins could take every CPU
+of the process. Running it in a fixed size pool caps how many hashes are
+computed at once, leaving CPU for other requests, and turns away work
+that cannot start in time instead of queueing it without limit.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from recipe.executors import LazyExecutor
+
+_local = threading.local()
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing pool cannot take more work in time.
+
+    The API answers it with a 503, see `user.serializers`.
+    """
+
+
+def _mark_worker():
+    """Flag the current thread as a pool worker."""
+
+    _local.worker = True
+
+
+class HashingExecutor(ThreadPoolExecutor):
+    """Thread pool whose slots bound the work running or queued on it."""
+
+    def __init__(self, workers, backlog):
+        super().__init__(
+            max_workers=workers,
+            thread_name_prefix='password-hashing',
+            initializer=_mark_worker,
+        )
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+
+
+pool = LazyExecutor(
+    ['PASSWORD_HASHING_WORKERS', 'PASSWORD_HASHING_BACKLOG'],
+    lambda: HashingExecutor(
+        settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_BACKLOG
+    ),
+)
+
+
+def run_hashing(func, *args, **kwargs):
+    """Run func in the hashing pool and return its result.
+
+    Runs inline when the pool is disabled or when already called from a
+    pool worker, e.g. verify calling encode.
+    """
+
+    if settings.PASSWORD_HASHING_WORKERS <= 0 or getattr(
+        _local, 'worker', False
+    ):
+        return func(*args, **kwargs)
+
+    executor = pool.get()
+    if not executor.slots.acquire(timeout=settings.PASSWORD_HASHING_TIMEOUT):
+        raise PasswordHashingBusy()
+
+    try:
+        return executor.submit(func, *args, **kwargs).result()
+    finally:
+        executor.slots.release()
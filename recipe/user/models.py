@@ -18,6 +18,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Bumped to revoke every signed token issued to the user.
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
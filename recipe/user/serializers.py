@@ -2,11 +2,37 @@
 Serializer for the user model.
 """
 
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model, authenticate
 
-from django.utils.translation import gettext as _
+from django.utils.translation import gettext as _, gettext_lazy
+
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from .hashing import PasswordHashingBusy
+
+
+class PasswordHashingUnavailable(APIException):
+    """Answers requests the hashing pool has no room for."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = gettext_lazy(
+        'Too many sign in attempts, please retry shortly.'
+    )
+    default_code = 'password_hashing_busy'
+    wait = 1
 
-from rest_framework import serializers
+
+@contextmanager
+def hashing_unavailable_as_503():
+    """Turn a full hashing pool within the block into a 503."""
+
+    try:
+        yield
+    except PasswordHashingBusy as exc:
+        raise PasswordHashingUnavailable() from exc
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -21,7 +47,8 @@ class UserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """Create and return a user with encrypted data."""
 
-        return get_user_model().objects.create_user(**validated_data)
+        with hashing_unavailable_as_503():
+            return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
         """Update an existing user and return the values."""
@@ -30,7 +57,8 @@ class UserSerializer(serializers.ModelSerializer):
         user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
+            with hashing_unavailable_as_503():
+                user.set_password(password)
             user.save()
 
         return user
@@ -50,11 +78,12 @@ class AuthTokenSerializer(serializers.Serializer):
 
         email = attrs['email']
         password = attrs['password']
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password
-        )
+        with hashing_unavailable_as_503():
+            user = authenticate(
+                request=self.context.get('request'),
+                username=email,
+                password=password
+            )
 
         if not user:
             msg = _(
@@ -64,3 +93,13 @@ class AuthTokenSerializer(serializers.Serializer):
         attrs['user'] = user
 
         return attrs
+
+
+class TokenSerializer(serializers.Serializer):
+    """Serialize an issued token."""
+
+    token = serializers.CharField()
+    expires_in = serializers.IntegerField(
+        required=False,
+        help_text=_('Seconds the token is valid, set for signed tokens.'),
+    )
@@ -0,0 +1,26 @@
+"""
+Signal handlers for the user app.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user_tokens
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Drop a deleted token from the auth caches."""
+
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    """Drop cached tokens when a user is updated or deactivated."""
+
+    if not created:
+        invalidate_user_tokens(instance.pk)
@@ -0,0 +1,21 @@
+"""
+Background tasks of the user app.
+"""
+
+from jobs.queue import task
+
+from .deletion import purge_user
+
+
+@task('user.purge')
+def purge(job):
+    """Delete the data of a deactivated user in batches.
+
+    Safe to retry, batches already deleted are not found again.
+    """
+
+    progress = None
+    for progress in purge_user(job.payload['user_id']):
+        job.report(progress)
+
+    return progress
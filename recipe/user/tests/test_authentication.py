@@ -0,0 +1,284 @@
+"""
+Tests for cached token authentication.
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..authentication import LocalTokenCache, local_token_cache
+from ..tokens import issue_signed_token
+
+
+ME_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+RECIPES_URL = reverse('recipes:recipes-list')
+
+
+class LocalTokenCacheTests(TestCase):
+    """Tests the in-process token cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry is evicted when full."""
+
+        lru = LocalTokenCache(max_size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_expired_entry_missing(self):
+        """Test entries are dropped after their ttl."""
+
+        lru = LocalTokenCache(max_size=2, ttl=-1)
+        lru.set('a', 1)
+
+        self.assertIsNone(lru.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Tests token authentication through the caches."""
+
+    def setUp(self):
+        local_token_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+            name='Test User'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_lookup_skips_database(self):
+        """Test repeated requests only query the profile."""
+
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_shared_cache_used_after_local_miss(self):
+        """Test the shared cache serves lookups missing locally."""
+
+        self.client.get(ME_URL)
+        local_token_cache.clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_cache_holds_no_credentials(self):
+        """Test only the fields authentication needs are cached."""
+
+        self.client.get(ME_URL)
+
+        entry = cache.get(f'auth:token:{self.token.key}')
+
+        self.assertEqual(
+            entry,
+            (self.token.created, self.user.pk, True, 0),
+        )
+        self.assertNotIn(self.user.password, entry)
+
+    def test_profile_update_invalidates_cache(self):
+        """Test updating the profile serves fresh user data."""
+
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'updated name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'updated name')
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user cannot use a cached token."""
+
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token cannot be used."""
+
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_DB_TTL=60)
+    def test_expired_token_rejected(self):
+        """Test a database token older than its ttl is rejected."""
+
+        Token.objects.filter(pk=self.token.pk).update(
+            created=timezone.now() - timedelta(seconds=120)
+        )
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_token(self):
+        """Test refreshing replaces the database token."""
+
+        res = self.client.post(REFRESH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], self.token.key)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+        self.assertEqual(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+
+@override_settings(TOKEN_AUTH_MODE='signed')
+class SignedTokenAuthenticationTests(TestCase):
+    """Tests stateless signed tokens."""
+
+    def setUp(self):
+        local_token_cache.clear()
+        cache.clear()
+        self.payload = {'email': 'test@example.com', 'password': 'pass1234'}
+        self.user = get_user_model().objects.create_user(**self.payload)
+        self.client = APIClient()
+
+    def authenticate(self, token):
+        """Send token with the following requests."""
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def test_login_issues_signed_token_without_writes(self):
+        """Test logging in issues a signed token and stores nothing."""
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('expires_in', res.data)
+        self.assertFalse(Token.objects.exists())
+
+        self.authenticate(res.data['token'])
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_verified_without_database(self):
+        """Test a signed token is verified from the caches.
+
+        The one query reads the profile.
+        """
+
+        self.authenticate(issue_signed_token(self.user))
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_accepted_by_recipes(self):
+        """Test the recipes API accepts signed tokens."""
+
+        self.authenticate(issue_signed_token(self.user))
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tampered_token_rejected(self):
+        """Test a token with a forged payload is rejected."""
+
+        token = issue_signed_token(self.user)
+        self.authenticate('x' + token[1:])
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_SIGNED_TTL=60)
+    def test_expired_token_rejected(self):
+        """Test a token older than its ttl is rejected."""
+
+        token = issue_signed_token(self.user)
+        self.authenticate(token)
+        later = timezone.now().timestamp() + 120
+
+        with mock.patch('time.time', return_value=later):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke_rejects_issued_tokens(self):
+        """Test revoking bumps the counter and rejects older tokens."""
+
+        self.authenticate(issue_signed_token(self.user))
+        self.client.get(ME_URL)
+
+        res = self.client.post(REVOKE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 1)
+        self.assertEqual(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+        self.authenticate(issue_signed_token(self.user))
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_refresh_issues_new_token(self):
+        """Test refreshing a signed token returns a new signed token."""
+
+        self.authenticate(issue_signed_token(self.user))
+
+        res = self.client.post(REFRESH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.authenticate(res.data['token'])
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_rotated_key_still_accepted(self):
+        """Test tokens signed with a fallback key are still accepted."""
+
+        with self.settings(TOKEN_AUTH_SIGNING_KEY='old-key'):
+            token = issue_signed_token(self.user)
+
+        with self.settings(
+            TOKEN_AUTH_SIGNING_KEY='new-key',
+            TOKEN_AUTH_SIGNING_FALLBACK_KEYS=['old-key'],
+        ):
+            self.authenticate(token)
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,163 @@
+"""
+Tests deactivate-then-purge deletion of users.
+"""
+
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from jobs.queue import run_pending
+from recipes.images import get_image_storage
+from recipes.models import Recipes, Tag
+
+from ..deletion import can_raw_delete, deactivate_user, purge_user
+
+ME_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+
+
+def create_recipes(user, count):
+    """Create count tagged recipes for user."""
+
+    tag = Tag.objects.create(user=user, name='Tag')
+    recipes = Recipes.objects.bulk_create([
+        Recipes(
+            user=user, title=f'Recipe {i}', time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        for i in range(count)
+    ])
+    for recipe in recipes:
+        recipe.tags.add(tag)
+
+    return recipes
+
+
+class UserDeletionTests(TestCase):
+    """Test deleting users and their data."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass@123'
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass@123'
+        )
+
+    def test_delete_me_deactivates_at_once(self):
+        """Test deleting the account disables it and queues the purge."""
+
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['name'], 'user.purge')
+        self.assertNotIn('url', res.data)
+        self.assertFalse(res.has_header('Location'))
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'user@example.com', 'password': 'testpass@123'},
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_purge_deletes_user_data(self):
+        """Test the purge job deletes the user and only their rows."""
+
+        create_recipes(self.user, 3)
+        kept = create_recipes(self.other, 1)[0]
+        job = deactivate_user(self.user)
+
+        run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result['deleted']['recipes.Recipes'], 3)
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertEqual(list(Recipes.objects.all()), [kept])
+        self.assertEqual(list(Tag.objects.all()), list(kept.tags.all()))
+        self.assertEqual(Recipes.tags.through.objects.count(), 1)
+
+    def test_purge_deletes_image_files(self):
+        """Test the image files of purged recipes are deleted."""
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        recipe = create_recipes(self.user, 1)[0]
+        deactivate_user(self.user)
+
+        with self.settings(MEDIA_ROOT=media):
+            name = get_image_storage().save('image.png', ContentFile(b'png'))
+            Recipes.objects.filter(id=recipe.id).update(image=name)
+            list(purge_user(self.user.id))
+
+            self.assertFalse(get_image_storage().exists(name))
+
+    def test_purge_in_batches(self):
+        """Test recipes are deleted by bounded raw DELETE statements."""
+
+        create_recipes(self.user, 5)
+        deactivate_user(self.user)
+
+        with self.settings(USER_PURGE_BATCH_SIZE=2), (
+            CaptureQueriesContext(connection)
+        ) as queries:
+            progress = list(purge_user(self.user.id))
+
+        deletes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('DELETE FROM "recipes" ')
+        ]
+        self.assertEqual(len(deletes), 3)
+        self.assertIn(
+            2, [item['deleted'].get('recipes.Recipes') for item in progress]
+        )
+        self.assertEqual(progress[-1]['deleted']['recipes.Recipes'], 5)
+        self.assertTrue(progress[-1]['done'])
+
+    def test_purge_skips_reactivated_user(self):
+        """Test nothing is deleted for a user reactivated meanwhile."""
+
+        create_recipes(self.user, 1)
+        deactivate_user(self.user)
+        get_user_model().objects.filter(id=self.user.id).update(
+            is_active=True
+        )
+
+        progress = list(purge_user(self.user.id))
+
+        self.assertFalse(progress[-1]['done'])
+        self.assertEqual(Recipes.objects.filter(user=self.user).count(), 1)
+
+    def test_can_raw_delete(self):
+        """Test recipes and their join rows are deleted without signals."""
+
+        self.assertTrue(can_raw_delete(Recipes))
+        self.assertTrue(can_raw_delete(Tag))
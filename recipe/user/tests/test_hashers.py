@@ -0,0 +1,137 @@
+"""
+Tests for tunable password hashing.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    PBKDF2SHA1PasswordHasher,
+    identify_hasher,
+    make_password,
+)
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.test import APIClient
+
+from ..hashers import PBKDF2PasswordHasher
+from ..hashing import PasswordHashingBusy, pool, run_hashing
+
+
+TOKEN_URL = reverse('user:token')
+
+PBKDF2 = 'user.hashers.PBKDF2PasswordHasher'
+SCRYPT = 'user.hashers.ScryptPasswordHasher'
+
+
+@override_settings(
+    PASSWORD_HASHERS=[PBKDF2, SCRYPT], PASSWORD_PBKDF2_ITERATIONS=1000
+)
+class PasswordHasherTests(TestCase):
+    """Tests hashing cost settings and rehashing on login."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.payload = {
+            'email': 'hasher@example.com', 'password': 'hasherpass123'
+        }
+        self.user = get_user_model().objects.create_user(**self.payload)
+
+    def login(self):
+        """Log in with the user's credentials and reload the user."""
+
+        res = self.client.post(TOKEN_URL, self.payload)
+        self.user.refresh_from_db()
+
+        return res
+
+    def test_iterations_from_settings(self):
+        """Test the pbkdf2 iterations come from the settings."""
+
+        self.assertEqual(PBKDF2PasswordHasher().iterations, 1000)
+        self.assertIn('$1000$', self.user.password)
+
+    def test_login_rehashes_on_cost_change(self):
+        """Test logging in rehashes a password hashed at the old cost."""
+
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('$2000$', self.user.password)
+
+    def test_login_rehashes_on_profile_change(self):
+        """Test logging in moves the password to the preferred hasher."""
+
+        with self.settings(
+            PASSWORD_HASHERS=[SCRYPT, PBKDF2],
+            PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10,
+        ):
+            res = self.login()
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                identify_hasher(self.user.password).algorithm, 'scrypt'
+            )
+            self.assertIn('$1024$', self.user.password)
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_login_busy_pool(self):
+        """Test a full hashing pool answers 503 with Retry-After."""
+
+        with self.settings(
+            PASSWORD_HASHING_WORKERS=1,
+            PASSWORD_HASHING_BACKLOG=0,
+            PASSWORD_HASHING_TIMEOUT=0,
+        ):
+            slots = pool.get().slots
+            slots.acquire()
+            try:
+                res = self.login()
+            finally:
+                slots.release()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', res)
+
+    def test_busy_pool_outside_api(self):
+        """Test a full pool raises a plain error outside the API."""
+
+        with self.settings(
+            PASSWORD_HASHING_WORKERS=1,
+            PASSWORD_HASHING_BACKLOG=0,
+            PASSWORD_HASHING_TIMEOUT=0,
+        ):
+            slots = pool.get().slots
+            slots.acquire()
+            try:
+                with self.assertRaises(PasswordHashingBusy) as raised:
+                    self.user.check_password(self.payload['password'])
+            finally:
+                slots.release()
+
+        self.assertNotIsInstance(raised.exception, APIException)
+
+    def test_nested_hashing_runs_inline(self):
+        """Test hashing called from a pool worker does not deadlock."""
+
+        with self.settings(PASSWORD_HASHING_WORKERS=1):
+            result = run_hashing(run_hashing, lambda: 'done')
+
+        self.assertEqual(result, 'done')
+
+
+class DefaultHasherTests(TestCase):
+    """Tests hashes of Django's other hashers still verify."""
+
+    def test_pbkdf2_sha1_hash_verifies(self):
+        """Test a PBKDF2 SHA1 hash made before the profiles verifies."""
+
+        user = get_user_model().objects.create_user('old@example.com')
+        user.password = make_password(
+            'oldpass123', hasher=PBKDF2SHA1PasswordHasher()
+        )
+
+        self.assertTrue(user.check_password('oldpass123'))
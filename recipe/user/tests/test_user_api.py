@@ -3,11 +3,13 @@ Tests for user API.
 """
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
+
+from recipe.testing import BudgetAPIClient
 
 
 CREATE_USER_URL = reverse('user:create')
@@ -33,7 +35,8 @@ class PublicUserAPITests(TestCase):
     """
 
     def setUp(self):
-        self.client = APIClient()
+        cache.clear()
+        self.client = BudgetAPIClient()
 
     def test_create_user_success(self):
         """Tests creation of user successful"""
@@ -162,7 +165,7 @@ class PrivateUserAPITest(TestCase):
             password='password123',
             name='Test User'
         )
-        self.client = APIClient()
+        self.client = BudgetAPIClient()
         self.client.force_authenticate(user=self.user)
 
     def test_retrieve_profile_success(self):
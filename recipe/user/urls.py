@@ -4,12 +4,23 @@ Contains urls for the user API.
 
 from django.urls import path
 
-from .views import CreateUserView, CreateTokenView, ManageUserView
+from recipes.views import UserRecipeStatsView
+
+from .views import (
+    CreateUserView,
+    CreateTokenView,
+    ManageUserView,
+    RefreshTokenView,
+    RevokeTokensView,
+)
 
 app_name = 'user'
 
 urlpatterns = [
     path('create/', CreateUserView.as_view(), name='create'),
     path('token/', CreateTokenView.as_view(), name='token'),
+    path('token/refresh/', RefreshTokenView.as_view(), name='token-refresh'),
+    path('token/revoke/', RevokeTokensView.as_view(), name='token-revoke'),
     path('me/', ManageUserView.as_view(), name='me'),
+    path('me/stats/', UserRecipeStatsView.as_view(), name='me-stats'),
 ]
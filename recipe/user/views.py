@@ -2,17 +2,64 @@
 Contains views for the user API.
 """
 
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from drf_spectacular.utils import extend_schema
+
+from rest_framework import generics, permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from jobs.views import job_accepted
+from recipe.routers import ReplicaReadMixin
+from recipe.throttling import (
+    AccountRateThrottle,
+    LoginEmailRateThrottle,
+    LoginRateThrottle,
+)
+
+from .authentication import (
+    CachedTokenAuthentication,
+    revoke_user_tokens,
+    token_expired,
+)
+from .deletion import deactivate_user
+from .serializers import AuthTokenSerializer, TokenSerializer, UserSerializer
+from .tokens import SignedToken, issue_signed_token
+
+
+def signed_token_response(user):
+    """Return a response holding a new signed token for user."""
+
+    return Response({
+        'token': issue_signed_token(user),
+        'expires_in': settings.TOKEN_AUTH_SIGNED_TTL,
+    })
+
+
+def db_token_response(user):
+    """Return a response holding the database token of user.
+
+    An expired token is replaced with a new one.
+    """
 
-from .serializers import UserSerializer, AuthTokenSerializer
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token_expired(token):
+        token.delete()
+        token = Token.objects.create(user=user)
+
+    return Response({'token': token.key})
 
 
 class CreateUserView(generics.CreateAPIView):
     """Serializer for creating a user using the user object."""
 
     serializer_class = UserSerializer
+    throttle_classes = [AccountRateThrottle]
 
 
 class CreateTokenView(ObtainAuthToken):
@@ -20,20 +67,98 @@ class CreateTokenView(ObtainAuthToken):
 
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = [LoginRateThrottle, LoginEmailRateThrottle]
+
+    @extend_schema(request=AuthTokenSerializer, responses=TokenSerializer)
+    def post(self, request, *args, **kwargs):
+        """Return a token of the kind set by `TOKEN_AUTH_MODE`.
+
+        Signed tokens are issued without writing to the database. Failed
+        attempts count towards the per account limit.
+        """
+
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            LoginEmailRateThrottle().count_failure(request)
+            raise ValidationError(serializer.errors)
+        user = serializer.validated_data['user']
+
+        if settings.TOKEN_AUTH_MODE == 'signed':
+            return signed_token_response(user)
+
+        return db_token_response(user)
+
+
+class RefreshTokenView(APIView):
+    """Rotate the token used to authenticate the request."""
 
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AccountRateThrottle]
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+    @extend_schema(request=None, responses=TokenSerializer)
+    def post(self, request):
+        """Return a new token of the same kind as the current one.
+
+        A database token is replaced, a signed token stays valid until it
+        expires or is revoked.
+        """
+
+        if isinstance(request.auth, SignedToken):
+            return signed_token_response(request.user)
+
+        request.auth.delete()
+
+        return db_token_response(request.user)
+
+
+class RevokeTokensView(APIView):
+    """Revoke every token of the authenticated user."""
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AccountRateThrottle]
+
+    @extend_schema(request=None, responses={204: None})
+    def post(self, request):
+        """Revoke the user's database and signed tokens."""
+
+        revoke_user_tokens(request.user)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ManageUserView(
+    ReplicaReadMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """Manage authenticated users."""
 
     serializer_class = UserSerializer
     authentication_classes = [
-        authentication.TokenAuthentication
+        CachedTokenAuthentication
     ]
     permission_classes = [
         permissions.IsAuthenticated
     ]
+    throttle_classes = [AccountRateThrottle]
 
     def get_object(self):
-        """Retrieve and return authenticated users."""
+        """Retrieve and return authenticated users.
+
+        The authenticated user only has the cached fields loaded, the
+        profile is read in one query.
+        """
+
+        return get_user_model().objects.get(pk=self.request.user.pk)
+
+    def destroy(self, request, *args, **kwargs):
+        """Deactivate the user and queue the deletion of their data.
+
+        Returns 202 with the purge job, which deletes the recipes in
+        batches and then the user. The tokens of the user are revoked, so
+        the job has no status URL.
+        """
+
+        job = deactivate_user(self.get_object())
 
-        return self.request.user
+        return job_accepted(request, job, pollable=False)